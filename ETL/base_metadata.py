@@ -0,0 +1,338 @@
+"""
+Stockage indexé des métadonnées du data lake (SQLite embarqué).
+
+Remplace le parcours complet des fichiers entité-attribut-valeur
+metadata_technique.csv et metadata_descriptives.csv : mêmes colonnes
+logiques, mais dans une base DATALAKE/00_METADATA/metadata.sqlite indexée
+sur object_id, colonne et type_fichier. Les recherches du type « tous les
+fichiers cibles de type AVIS » ou « tous les attributs de l'objet N »
+deviennent des lectures d'index.
+
+Les CSV restent produits (exporter_csv_*) pour les outils qui les lisent
+encore ; au premier usage, une base absente est initialisée à partir des
+CSV existants pour conserver les object_id.
+
+Utilisation:
+  base = BaseMetadata.a_cote_de('./DATALAKE/00_METADATA/metadata_technique.csv')
+  base.ajouter_technique([(1, 'fichier_cible', '.../13546-INFO-EMP-LINKEDIN-FR-1599984246.html')])
+  base.fichiers_cibles('GLASSDOOR_AVIS')
+
+Le nom des pages encode des identifiants stables de la source
+(13728-INFO-SOC-GLASSDOOR-E200717_P1.html : crawl 13728, fiche société,
+Glassdoor, employeur E200717, page 1) ; ils sont décomposés par
+analyser_nom_fichier et conservés dans la table index_fichiers.
+
+La table contenus_pages associe chaque empreinte de contenu (ETL/empreinte_pages.py)
+au fichier qui la stocke ; une capture de même contenu est enregistrée comme
+alias (colonne alias_de des métadonnées techniques) sans nouveau fichier.
+"""
+from pathlib import Path
+import csv
+import fnmatch
+import re
+import sqlite3
+import pandas as pd
+
+NOM_BASE = 'metadata.sqlite'
+TAILLE_LOT = 10_000
+# Valeurs par requête ... IN (...) (limite du nombre de paramètres SQLite)
+TAILLE_LOT_IN = 500
+
+# Type de fichier (vocabulaire de metadata_descriptives) déduit du nom des pages
+MOTIFS_TYPE_FICHIER = [
+    ('*INFO-SOC-GLASSDOOR*.html', 'GLASSDOOR_SOC'),
+    ('*AVIS-SOC-GLASSDOOR*.html', 'GLASSDOOR_AVIS'),
+    ('*INFO-EMP-LINKEDIN*.html', 'LINKEDIN_EMP'),
+]
+
+# <id crawl>-<INFO|AVIS>-<SOC|EMP>-<SOURCE>-<id employeur ou offre>[_P<page>].html
+MOTIF_NOM_FICHIER = re.compile(r'^(?P<id_crawl>\d+)-(?P<type_document>(?:INFO|AVIS)-(?:SOC|EMP))-(?P<source>[A-Z]+)-'
+                               r'(?P<id_source>.+?)(?:_P(?P<page>\d+))?\.html$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata_technique (
+  object_id INTEGER NOT NULL,
+  colonne TEXT NOT NULL,
+  valeur TEXT,
+  type_fichier TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_technique_object_id ON metadata_technique(object_id);
+CREATE INDEX IF NOT EXISTS idx_technique_colonne ON metadata_technique(colonne);
+CREATE INDEX IF NOT EXISTS idx_technique_type_fichier ON metadata_technique(type_fichier, colonne);
+
+CREATE TABLE IF NOT EXISTS metadata_descriptives (
+  object_id INTEGER NOT NULL,
+  type_fichier TEXT NOT NULL,
+  colonne TEXT NOT NULL,
+  valeur TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_descriptives_object_id ON metadata_descriptives(object_id);
+CREATE INDEX IF NOT EXISTS idx_descriptives_colonne ON metadata_descriptives(colonne);
+CREATE INDEX IF NOT EXISTS idx_descriptives_type_fichier ON metadata_descriptives(type_fichier, colonne);
+
+CREATE TABLE IF NOT EXISTS index_fichiers (
+  object_id INTEGER NOT NULL,
+  fichier TEXT NOT NULL,
+  id_crawl INTEGER,
+  type_document TEXT,
+  source TEXT,
+  id_source TEXT,
+  page INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_index_fichiers_object_id ON index_fichiers(object_id);
+CREATE INDEX IF NOT EXISTS idx_index_fichiers_id_source ON index_fichiers(source, id_source);
+
+CREATE TABLE IF NOT EXISTS contenus_pages (
+  empreinte TEXT PRIMARY KEY,
+  object_id INTEGER NOT NULL,
+  fichier TEXT NOT NULL
+);
+"""
+
+
+def type_fichier_depuis_nom(chemin):
+    """Renvoie GLASSDOOR_SOC, GLASSDOOR_AVIS ou LINKEDIN_EMP selon le nom du fichier (None sinon)."""
+    nom = Path(str(chemin)).name
+    for motif, type_fichier in MOTIFS_TYPE_FICHIER:
+        if fnmatch.fnmatch(nom, motif):
+            return type_fichier
+    return None
+
+
+def analyser_nom_fichier(chemin):
+    """
+    Décompose le nom d'une page de la landing zone.
+    Args:
+        chemin (str): Chemin ou nom du fichier (ex. .../13552-AVIS-SOC-GLASSDOOR-E2131167_P1.html)
+    Returns:
+        dict | None: id_crawl, type_document (INFO-SOC, AVIS-SOC, INFO-EMP), source (GLASSDOOR, LINKEDIN),
+        id_source (E2131167, FR-1599984246) et page (None si absente) ; None si le nom ne suit pas le format.
+    """
+    correspondance = MOTIF_NOM_FICHIER.match(Path(str(chemin)).name)
+    if correspondance is None:
+        return None
+    champs = correspondance.groupdict()
+    champs['id_crawl'] = int(champs['id_crawl'])
+    champs['page'] = int(champs['page']) if champs['page'] else None
+    return champs
+
+
+def _par_lots(lignes, taille_lot=TAILLE_LOT):
+    lot = []
+    for ligne in lignes:
+        lot.append(ligne)
+        if len(lot) >= taille_lot:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+class BaseMetadata:
+    """Base SQLite des métadonnées techniques et descriptives."""
+
+    def __init__(self, chemin_base):
+        self.chemin_base = Path(chemin_base)
+        self.chemin_base.parent.mkdir(parents=True, exist_ok=True)
+        self.connexion = sqlite3.connect(self.chemin_base)
+        self.connexion.executescript(SCHEMA)
+
+    @classmethod
+    def a_cote_de(cls, chemin_csv):
+        """Ouvre la base située dans le même dossier qu'un CSV de métadonnées."""
+        return cls(Path(chemin_csv).with_name(NOM_BASE))
+
+    @staticmethod
+    def existe_a_cote_de(chemin_csv):
+        return Path(chemin_csv).with_name(NOM_BASE).exists()
+
+    def fermer(self):
+        self.connexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+    def nb_lignes(self, table):
+        return self.connexion.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+    #==========================================================================
+    #-- Ecritures (par lots, une transaction par appel)
+    #==========================================================================
+    def ajouter_technique(self, lignes):
+        """
+        Ajoute des lignes (object_id, colonne, valeur) aux métadonnées techniques.
+        Le type de fichier est déduit de la valeur pour fichier_source / fichier_cible ;
+        les fichiers cibles sont ajoutés à index_fichiers.
+        """
+        def avec_type(lignes):
+            for object_id, colonne, valeur in lignes:
+                type_fichier = type_fichier_depuis_nom(valeur) if colonne in ('fichier_source', 'fichier_cible') else None
+                yield int(object_id), colonne, valeur, type_fichier
+
+        lignes = list(avec_type(lignes))
+        with self.connexion:
+            for lot in _par_lots(lignes):
+                self.connexion.executemany(
+                    'INSERT INTO metadata_technique (object_id, colonne, valeur, type_fichier) VALUES (?, ?, ?, ?)', lot)
+            self._indexer_fichiers((object_id, valeur) for object_id, colonne, valeur, _ in lignes if colonne == 'fichier_cible')
+
+    def _indexer_fichiers(self, fichiers):
+        """Ajoute les (object_id, chemin) à index_fichiers (les noms hors format sont ignorés)."""
+        def entrees():
+            for object_id, chemin in fichiers:
+                champs = analyser_nom_fichier(chemin)
+                if champs is not None:
+                    yield (int(object_id), chemin, champs['id_crawl'], champs['type_document'], champs['source'],
+                           champs['id_source'], champs['page'])
+
+        for lot in _par_lots(entrees()):
+            self.connexion.executemany(
+                'INSERT INTO index_fichiers (object_id, fichier, id_crawl, type_document, source, id_source, page) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', lot)
+
+    def indexer_fichiers(self):
+        """Complète index_fichiers pour les fichiers cibles déjà présents (bases créées avant l'index)."""
+        with self.connexion:
+            manquants = self.connexion.execute(
+                "SELECT object_id, valeur FROM metadata_technique WHERE colonne = 'fichier_cible' "
+                "AND object_id NOT IN (SELECT object_id FROM index_fichiers) ORDER BY rowid").fetchall()
+            self._indexer_fichiers(manquants)
+        return len(manquants)
+
+    def ajouter_contenus(self, lignes):
+        """Ajoute des lignes (empreinte, object_id, fichier) : fichier qui stocke chaque contenu distinct."""
+        with self.connexion:
+            for lot in _par_lots(lignes):
+                self.connexion.executemany(
+                    'INSERT OR IGNORE INTO contenus_pages (empreinte, object_id, fichier) VALUES (?, ?, ?)', lot)
+
+    def ajouter_descriptives(self, lignes):
+        """Ajoute des lignes (object_id, type_fichier, colonne, valeur) aux métadonnées descriptives."""
+        with self.connexion:
+            for lot in _par_lots((int(o), t, c, None if v is None else str(v)) for o, t, c, v in lignes):
+                self.connexion.executemany(
+                    'INSERT INTO metadata_descriptives (object_id, type_fichier, colonne, valeur) VALUES (?, ?, ?, ?)', lot)
+
+    def remplacer_descriptives(self, df, object_ids=None):
+        """
+        Remplace les métadonnées descriptives par un DataFrame (OBJECT_ID, TYPE_FICHIER, colonne, valeur) :
+        toutes, ou seulement celles des objets object_ids (les autres objets du DataFrame sont ajoutés).
+        """
+        with self.connexion:
+            if object_ids is None:
+                self.connexion.execute('DELETE FROM metadata_descriptives')
+            else:
+                for lot in _par_lots((int(object_id),) for object_id in object_ids):
+                    self.connexion.executemany('DELETE FROM metadata_descriptives WHERE object_id = ?', lot)
+        self.ajouter_descriptives(df[['OBJECT_ID', 'TYPE_FICHIER', 'colonne', 'valeur']].itertuples(index=False, name=None))
+
+    def prochain_object_id(self, table='metadata_technique'):
+        return (self.connexion.execute(f'SELECT MAX(object_id) FROM {table}').fetchone()[0] or 0) + 1
+
+    #==========================================================================
+    #-- Lectures indexées
+    #==========================================================================
+    def fichiers_cibles(self, type_fichier=None, avec_alias=False, depuis_object_id=None):
+        """
+        Chemins des fichiers de la landing zone, dans l'ordre d'ingestion, éventuellement filtrés par type
+        (et limités aux objets ingérés à partir de depuis_object_id : un lot de l'ingestion continue).
+        Les alias (captures dont le contenu est déjà stocké sous un autre fichier) sont exclus sauf avec_alias.
+        """
+        requete, parametres = "SELECT valeur FROM metadata_technique WHERE colonne = 'fichier_cible'", ()
+        if type_fichier is not None:
+            requete += ' AND type_fichier = ?'
+            parametres += (type_fichier,)
+        if depuis_object_id is not None:
+            requete += ' AND object_id >= ?'
+            parametres += (int(depuis_object_id),)
+        if not avec_alias:
+            requete += " AND object_id NOT IN (SELECT object_id FROM metadata_technique WHERE colonne = 'alias_de')"
+        return [valeur for (valeur,) in self.connexion.execute(requete + ' ORDER BY rowid', parametres)]
+
+    def fichiers_employeurs(self, id_sources, type_document='AVIS-SOC'):
+        """Fichiers (hors alias) d'un type de document pour des identifiants employeur, dans l'ordre d'ingestion."""
+        fichiers = []
+        for lot in _par_lots(sorted({id_source for id_source in id_sources if id_source}), TAILLE_LOT_IN):
+            fichiers.extend(self.connexion.execute(
+                f"SELECT rowid, fichier FROM index_fichiers WHERE type_document = ? AND id_source IN ({', '.join('?' * len(lot))}) "
+                "AND object_id NOT IN (SELECT object_id FROM metadata_technique WHERE colonne = 'alias_de')",
+                (type_document, *lot)))
+        return [fichier for _, fichier in sorted(fichiers)]
+
+    def objets_par_id_source(self, type_fichier, id_sources):
+        """OBJECT_ID des objets descriptifs d'un type portant ces id_source : {id_source: object_id}."""
+        objets = {}
+        for lot in _par_lots(sorted({id_source for id_source in id_sources if id_source}), TAILLE_LOT_IN):
+            objets.update(self.connexion.execute(
+                f"SELECT valeur, object_id FROM metadata_descriptives WHERE type_fichier = ? AND colonne = 'id_source' "
+                f"AND valeur IN ({', '.join('?' * len(lot))})", (type_fichier, *lot)))
+        return objets
+
+    def fichiers_sources(self):
+        """Chemins des fichiers sources déjà ingérés (alias compris)."""
+        return [valeur for (valeur,) in self.connexion.execute(
+            "SELECT valeur FROM metadata_technique WHERE colonne = 'fichier_source' ORDER BY rowid")]
+
+    def contenus_pages(self):
+        """Empreinte de contenu -> fichier qui le stocke."""
+        return dict(self.connexion.execute('SELECT empreinte, fichier FROM contenus_pages'))
+
+    def index_fichiers(self, type_document=None):
+        """Index des noms de fichiers (object_id, fichier, id_crawl, type_document, source, id_source, page)."""
+        requete = 'SELECT object_id, fichier, id_crawl, type_document, source, id_source, page FROM index_fichiers'
+        parametres = ()
+        if type_document is not None:
+            requete += ' WHERE type_document = ?'
+            parametres = (type_document,)
+        return pd.read_sql_query(requete + ' ORDER BY rowid', self.connexion, params=parametres)
+
+    def attributs(self, object_id, table='metadata_descriptives'):
+        """Tous les attributs d'un objet : {colonne: valeur} (valeurs jointes par un espace si répétées)."""
+        attributs = {}
+        for colonne, valeur in self.connexion.execute(
+                f'SELECT colonne, valeur FROM {table} WHERE object_id = ? ORDER BY rowid', (int(object_id),)):
+            attributs[colonne] = valeur if colonne not in attributs else f'{attributs[colonne]} {valeur}'
+        return attributs
+
+    def lire_descriptives(self, type_fichier=None):
+        """Métadonnées descriptives au format de generate_data_globale.lire_metadata (colonnes en texte)."""
+        requete = 'SELECT object_id, type_fichier, colonne, valeur FROM metadata_descriptives'
+        parametres = ()
+        if type_fichier is not None:
+            requete += ' WHERE type_fichier = ?'
+            parametres = (type_fichier,)
+        df = pd.read_sql_query(requete + ' ORDER BY rowid', self.connexion, params=parametres)
+        df.columns = ['OBJECT_ID', 'TYPE_FICHIER', 'colonne', 'valeur']
+        df['OBJECT_ID'] = df['OBJECT_ID'].astype(str)
+        df['valeur'] = df['valeur'].fillna('').astype(str).str.strip()
+        return df
+
+    #==========================================================================
+    #-- Compatibilité CSV
+    #==========================================================================
+    def importer_csv_technique(self, chemin_csv):
+        """Initialise les métadonnées techniques depuis le CSV si la table est vide."""
+        if self.nb_lignes('metadata_technique') > 0 or not Path(chemin_csv).exists():
+            return 0
+        with open(chemin_csv, 'r', encoding='utf-8', errors='ignore') as f:
+            lecteur = csv.reader(f, delimiter=';')
+            next(lecteur, None)
+            lignes = [ligne[:3] for ligne in lecteur if len(ligne) >= 3 and ligne[0].isdigit()]
+        self.ajouter_technique(lignes)
+        return len(lignes)
+
+    def exporter_csv_technique(self, chemin_csv):
+        """Ecrit metadata_technique.csv au format historique (séparateur ;, toutes les valeurs entre guillemets)."""
+        with open(chemin_csv, 'w', encoding='utf-8', errors='ignore', newline='') as f:
+            writer = csv.writer(f, delimiter=';', quotechar='"', quoting=csv.QUOTE_ALL, lineterminator='\n')
+            writer.writerow(['object_id', 'colonne', 'valeur'])
+            writer.writerows(self.connexion.execute('SELECT object_id, colonne, valeur FROM metadata_technique ORDER BY rowid'))
+
+    def exporter_csv_descriptives(self, chemin_csv):
+        """Ecrit metadata_descriptives.csv au format historique (séparateur ;, sans guillemets, échappement \\)."""
+        df = pd.read_sql_query('SELECT object_id AS OBJECT_ID, type_fichier AS TYPE_FICHIER, colonne, valeur '
+                               'FROM metadata_descriptives ORDER BY rowid', self.connexion)
+        df.to_csv(chemin_csv, sep=';', index=False, encoding='utf-8', quoting=csv.QUOTE_NONE, escapechar='\\')
@@ -0,0 +1,142 @@
+"""
+Cache disque des enregistrements extraits des pages de la landing zone.
+
+Une page crawlée ne change plus une fois enregistrée : l'enregistrement
+produit par un extracteur (dict SOC / EMP / AVI) est donc conservé, indexé
+par (sha256 du contenu de la page, version de l'extracteur). Une nouvelle
+exécution de la curated zone ne réanalyse que les pages absentes du cache.
+
+Stockage : un dossier de 256 fragments JSON-lines (00.jsonl ... ff.jsonl,
+selon les deux premiers caractères de l'empreinte), une ligne compacte
+{"e": empreinte, "v": version, "r": enregistrement} par page. Un fragment
+n'est lu qu'au premier accès ; les nouvelles lignes sont ajoutées en fin de
+fichier à la fermeture du cache. Au-delà de taille_max octets, les fragments
+les moins récemment utilisés (mtime) sont supprimés.
+
+Utilisation:
+  with CacheExtraction('./DATALAKE/00_METADATA/cache_extraction') as cache:
+      empreinte = cache.empreinte_fichier(chemin)
+      enregistrement = cache.lire(empreinte, 'AVI-v1-regions')
+      if enregistrement is None:
+          enregistrement = extraire(chemin)
+          cache.ecrire(empreinte, 'AVI-v1-regions', enregistrement)
+"""
+from pathlib import Path
+import hashlib
+import json
+import os
+
+NOM_DOSSIER = 'cache_extraction'
+TAILLE_MAX = 512 * 1024 * 1024
+TAILLE_BLOC = 1024 * 1024
+
+
+class CacheExtraction:
+    """Cache (empreinte du contenu, version de l'extracteur) -> enregistrement extrait."""
+
+    def __init__(self, dossier, taille_max=TAILLE_MAX):
+        self.dossier = Path(dossier)
+        self.dossier.mkdir(parents=True, exist_ok=True)
+        self.taille_max = taille_max
+        self.fragments = {}     # nom du fragment -> {(empreinte, version): enregistrement}
+        self.a_ecrire = {}      # nom du fragment -> lignes JSON à ajouter
+        self.utilises = set()   # fragments lus avec succès (mtime rafraîchi à la fermeture)
+        self.nb_trouves = 0
+        self.nb_manquants = 0
+
+    @classmethod
+    def a_cote_de(cls, chemin_csv, taille_max=TAILLE_MAX):
+        """Ouvre le cache situé dans le même dossier qu'un CSV de métadonnées."""
+        return cls(Path(chemin_csv).with_name(NOM_DOSSIER), taille_max)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+    @staticmethod
+    def empreinte_flux(flux):
+        """sha256 du contenu d'un flux binaire (le flux est fermé)."""
+        h = hashlib.sha256()
+        with flux:
+            for bloc in iter(lambda: flux.read(TAILLE_BLOC), b''):
+                h.update(bloc)
+        return h.hexdigest()
+
+    @staticmethod
+    def empreinte_fichier(chemin):
+        return CacheExtraction.empreinte_flux(open(chemin, 'rb'))
+
+    def _fragment(self, empreinte):
+        nom = empreinte[:2]
+        if nom not in self.fragments:
+            entrees = {}
+            chemin = self.dossier / f'{nom}.jsonl'
+            if chemin.exists():
+                with open(chemin, 'r', encoding='utf-8') as f:
+                    for ligne in f:
+                        try:
+                            entree = json.loads(ligne)
+                            entrees[(entree['e'], entree['v'])] = entree['r']
+                        except (ValueError, KeyError):
+                            # ligne tronquée (exécution interrompue) : ignorée
+                            continue
+            self.fragments[nom] = entrees
+        return nom, self.fragments[nom]
+
+    #==========================================================================
+    #-- Lecture / écriture
+    #==========================================================================
+    def lire(self, empreinte, version):
+        """Enregistrement en cache pour (empreinte, version), None s'il est absent."""
+        nom, entrees = self._fragment(empreinte)
+        enregistrement = entrees.get((empreinte, version))
+        if enregistrement is None:
+            self.nb_manquants += 1
+        else:
+            self.nb_trouves += 1
+            self.utilises.add(nom)
+        return enregistrement
+
+    def ecrire(self, empreinte, version, enregistrement):
+        nom, entrees = self._fragment(empreinte)
+        entrees[(empreinte, version)] = enregistrement
+        ligne = json.dumps({'e': empreinte, 'v': version, 'r': enregistrement}, ensure_ascii=False, separators=(',', ':'))
+        self.a_ecrire.setdefault(nom, []).append(ligne + '\n')
+
+    def fermer(self):
+        """Ajoute les nouvelles lignes aux fragments, rafraîchit les fragments utilisés puis applique l'éviction."""
+        for nom, lignes in self.a_ecrire.items():
+            with open(self.dossier / f'{nom}.jsonl', 'a', encoding='utf-8') as f:
+                f.writelines(lignes)
+        for nom in self.utilises - set(self.a_ecrire):
+            chemin = self.dossier / f'{nom}.jsonl'
+            if chemin.exists():
+                os.utime(chemin)
+        self.a_ecrire = {}
+        self.utilises = set()
+        self.evincer()
+
+    #==========================================================================
+    #-- Eviction
+    #==========================================================================
+    def taille(self):
+        return sum(chemin.stat().st_size for chemin in self.dossier.glob('*.jsonl'))
+
+    def evincer(self):
+        """
+        Supprime les fragments les moins récemment utilisés tant que le cache dépasse taille_max.
+        Returns:
+            int: Nombre d'octets libérés.
+        """
+        fragments = sorted(self.dossier.glob('*.jsonl'), key=lambda chemin: chemin.stat().st_mtime)
+        total = sum(chemin.stat().st_size for chemin in fragments)
+        liberes = 0
+        for chemin in fragments:
+            if total - liberes <= self.taille_max:
+                break
+            liberes += chemin.stat().st_size
+            chemin.unlink()
+            self.fragments.pop(chemin.stem, None)
+        return liberes
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Charge le schéma en étoile de la production zone (DATALAKE/3_PRODUCTION_ZONE/BDD/*.csv)
+dans un entrepôt SQLite embarqué (DATALAKE/3_PRODUCTION_ZONE/entrepot.sqlite).
+
+- clés primaires et étrangères déclarées, index sur les clés étrangères et les dates ;
+- insertion par lots (executemany) dans une seule transaction ;
+- chargement incrémental : upsert (INSERT ... ON CONFLICT DO UPDATE) qui ne
+  réécrit que les lignes dont le contenu a changé ; après le chargement complet
+  d'une table, les lignes dont la clé n'est plus dans la source (offres
+  fusionnées, ids d'entreprises remplacés) sont supprimées.
+
+Les dates jj/mm/aaaa sont stockées au format ISO (aaaa-mm-jj) pour que les
+index permettent les filtres par période ; les valeurs 'NULL' ou vides
+deviennent NULL.
+
+Une table de faits peut aussi être un dossier Parquet partitionné par mois
+(BDD/F_avis/annee=2020/mois=03/part-0.parquet, voir partitionnement.py) :
+--depuis / --jusqu-a ne chargent alors que les partitions de la période (sans
+suppression des lignes absentes, la source n'étant que partielle). Une table
+peut enfin être un fichier <table>.parquet (pipeline.py --format parquet) ; si
+plusieurs dispositions existent, la plus récemment écrite est chargée.
+
+Usage:
+  python ETL/charger_entrepot.py
+  python ETL/charger_entrepot.py --source data_globale_etl --base /tmp/entrepot.sqlite
+  python ETL/charger_entrepot.py --depuis 2019-10
+"""
+from pathlib import Path
+from datetime import datetime
+import argparse
+import sqlite3
+import pandas as pd
+
+import instrumentation
+from partitionnement import NOM_EMPREINTES, est_table_partitionnee, lister_partitions
+from traitement_par_lots import TAILLE_LOT
+
+# Configuration des chemins
+RACINE = Path(__file__).resolve().parents[1]
+DOSSIER_SOURCE = RACINE / 'DATALAKE' / '3_PRODUCTION_ZONE' / 'BDD'
+CHEMIN_BASE = RACINE / 'DATALAKE' / '3_PRODUCTION_ZONE' / 'entrepot.sqlite'
+
+# Schéma en étoile : tables dans l'ordre de chargement (dimensions avant faits).
+# colonnes : (nom, type SQL) ; la première colonne est la clé primaire.
+SCHEMA = {
+    'd_secteur': {
+        'colonnes': [('id_secteur', 'INTEGER'), ('secteur', 'TEXT')],
+    },
+    'd_ville': {
+        'colonnes': [('id_ville', 'INTEGER'), ('ville', 'TEXT'), ('pays', 'TEXT')],
+    },
+    'd_type_poste': {
+        'colonnes': [('id_type_poste', 'INTEGER'), ('type_poste', 'TEXT')],
+    },
+    'd_note': {
+        'colonnes': [('id_note', 'INTEGER'), ('note', 'REAL')],
+    },
+    'd_entreprise': {
+        'colonnes': [('id_entreprise', 'INTEGER'), ('id_secteur', 'INTEGER'), ('nom_entreprise', 'TEXT'),
+                     ('taille', 'TEXT'), ('categorie', 'TEXT'), ('siege_social', 'TEXT'), ('pays', 'TEXT')],
+        'references': {'id_secteur': 'd_secteur'},
+    },
+    'F_offres': {
+        'colonnes': [('id_offre', 'INTEGER'), ('id_entreprise', 'INTEGER'), ('id_ville', 'INTEGER'),
+                     ('id_type_poste', 'INTEGER'), ('libelle_emploi', 'TEXT'), ('contenu', 'TEXT'), ('date_posted', 'DATE')],
+        'references': {'id_entreprise': 'd_entreprise', 'id_ville': 'd_ville', 'id_type_poste': 'd_type_poste'},
+    },
+    'F_avis': {
+        'colonnes': [('id_avis', 'INTEGER'), ('id_note', 'INTEGER'), ('date_publication', 'DATE'), ('contenu_avis', 'TEXT'),
+                     ('inconvenient', 'TEXT'), ('avantage', 'TEXT'), ('id_entreprise', 'INTEGER')],
+        'references': {'id_note': 'd_note', 'id_entreprise': 'd_entreprise'},
+    },
+}
+
+
+#==============================================================================
+#-- Conversion des valeurs
+#==============================================================================
+def vers_entier(v):
+    if v is None or str(v).strip() in ('', 'NULL'):
+        return None
+    try:
+        return int(float(str(v).strip()))
+    except ValueError:
+        return None
+
+
+def vers_reel(v):
+    if v is None or str(v).strip() in ('', 'NULL'):
+        return None
+    try:
+        return float(str(v).strip().replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def vers_date_iso(v):
+    """Convertit jj/mm/aaaa (format des CSV) en aaaa-mm-jj ; les autres valeurs sont gardées telles quelles."""
+    if v is None or str(v).strip() in ('', 'NULL'):
+        return None
+    s = str(v).strip()
+    try:
+        return datetime.strptime(s, '%d/%m/%Y').strftime('%Y-%m-%d')
+    except ValueError:
+        return s
+
+
+def vers_texte(v):
+    if v is None or str(v) in ('', 'NULL'):
+        return None
+    return str(v)
+
+
+CONVERSIONS = {'INTEGER': vers_entier, 'REAL': vers_reel, 'DATE': vers_date_iso, 'TEXT': vers_texte}
+
+
+#==============================================================================
+#-- Schéma
+#==============================================================================
+def creer_schema(connexion):
+    """Crée les tables et les index s'ils n'existent pas."""
+    for table, definition in SCHEMA.items():
+        colonnes = definition['colonnes']
+        cle = colonnes[0][0]
+        lignes = [f'{nom} {type_sql}' + (' PRIMARY KEY' if nom == cle else '') for nom, type_sql in colonnes]
+        for colonne, table_ref in definition.get('references', {}).items():
+            cle_ref = SCHEMA[table_ref]['colonnes'][0][0]
+            lignes.append(f'FOREIGN KEY ({colonne}) REFERENCES {table_ref}({cle_ref})')
+        connexion.execute(f'CREATE TABLE IF NOT EXISTS {table} (\n  ' + ',\n  '.join(lignes) + '\n)')
+
+        # index sur les clés étrangères et les colonnes de date
+        a_indexer = list(definition.get('references', {})) + [nom for nom, type_sql in colonnes if type_sql == 'DATE']
+        for colonne in a_indexer:
+            connexion.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{colonne} ON {table}({colonne})')
+
+
+def requete_upsert(table):
+    """INSERT ... ON CONFLICT DO UPDATE qui ne touche que les lignes dont une valeur a changé."""
+    noms = [nom for nom, _ in SCHEMA[table]['colonnes']]
+    cle, autres = noms[0], noms[1:]
+    requete = f"INSERT INTO {table} ({', '.join(noms)}) VALUES ({', '.join('?' for _ in noms)})"
+    if not autres:
+        return requete + f' ON CONFLICT({cle}) DO NOTHING'
+    return (requete + f" ON CONFLICT({cle}) DO UPDATE SET " + ', '.join(f'{c} = excluded.{c}' for c in autres)
+            + ' WHERE ' + ' OR '.join(f'{table}.{c} IS NOT excluded.{c}' for c in autres))
+
+
+#==============================================================================
+#-- Chargement
+#==============================================================================
+def lignes_converties(lot, table):
+    """Convertit un lot (DataFrame texte) en tuples typés dans l'ordre des colonnes du schéma."""
+    colonnes = SCHEMA[table]['colonnes']
+    series = []
+    for nom, type_sql in colonnes:
+        if nom in lot.columns:
+            series.append(lot[nom].map(CONVERSIONS[type_sql]).tolist())
+        else:
+            series.append([None] * len(lot))
+    # lignes sans clé primaire exploitable ignorées
+    return [ligne for ligne in zip(*series) if ligne[0] is not None]
+
+
+def lots_partitions(fichiers, taille_lot=TAILLE_LOT):
+    """Lots (DataFrame texte) des fichiers Parquet d'une table (partitions ou fichier unique), taille_lot lignes au plus."""
+    for fichier in fichiers:
+        df = pd.read_parquet(fichier)
+        # colonnes typées (schema_tables) : dates remises en aaaa-mm-jj avant la conversion commune
+        for colonne in df.columns[[pd.api.types.is_datetime64_any_dtype(t) for t in df.dtypes]]:
+            df[colonne] = df[colonne].dt.strftime('%Y-%m-%d')
+        df = df.astype(object).where(df.notna(), '').astype(str)
+        for debut in range(0, len(df), taille_lot):
+            yield df.iloc[debut:debut + taille_lot]
+
+
+def source_table(dossier_source, table, depuis=None, jusqu_a=None):
+    """
+    Source d'une table : dossier partitionné (partitions de la période seulement), fichier Parquet
+    ou CSV ; si plusieurs existent, le plus récemment écrit.
+    Returns:
+        tuple: ('partitions', liste des fichiers), ('parquet', chemin) ou ('csv', chemin) ;
+        None si la table est absente.
+    """
+    dossier_table = dossier_source / table
+    candidats = []
+    if est_table_partitionnee(dossier_table):
+        candidats.append((date_ecriture(dossier_table), 'partitions', dossier_table))
+    for genre in ('parquet', 'csv'):
+        chemin = dossier_source / f'{table}.{genre}'
+        if chemin.exists():
+            candidats.append((chemin.stat().st_mtime, genre, chemin))
+    if not candidats:
+        return None
+    _, genre, chemin = max(candidats, key=lambda candidat: candidat[0])
+    if genre == 'partitions':
+        return 'partitions', lister_partitions(dossier_table, depuis, jusqu_a)
+    return genre, chemin
+
+
+def date_ecriture(dossier_table):
+    """Date de la dernière écriture d'une table partitionnée (fichier d'empreintes ou partition la plus récente)."""
+    fichiers = list(dossier_table.glob(NOM_EMPREINTES)) + list(dossier_table.glob('annee=*/mois=*/*.parquet'))
+    return max((f.stat().st_mtime for f in fichiers), default=0.0)
+
+
+def charger_table(connexion, table, chemin_csv, taille_lot=TAILLE_LOT, partitions=None, supprimer_absentes=True):
+    """
+    Charge un CSV (ou les fichiers Parquet donnés : partitions ou table entière) dans sa table par
+    lots (executemany + upsert).
+    Args:
+        supprimer_absentes (bool): Source complète : supprimer ensuite les lignes dont la clé
+            n'y figure pas (clés de la source gardées dans une table temporaire).
+    Returns:
+        dict: nombre de lignes lues, insérées, mises à jour, supprimées.
+    """
+    cle = SCHEMA[table]['colonnes'][0][0]
+    avant = connexion.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    requete = requete_upsert(table)
+    if supprimer_absentes:
+        connexion.execute('DROP TABLE IF EXISTS temp.cles_source')
+        connexion.execute('CREATE TEMP TABLE cles_source (cle INTEGER PRIMARY KEY)')
+    nb_lues = 0
+    nb_changements = 0
+    if partitions is not None:
+        lots = lots_partitions(partitions, taille_lot)
+    else:
+        lots = pd.read_csv(chemin_csv, dtype=str, encoding='utf-8', keep_default_na=False, chunksize=taille_lot)
+    for lot in lots:
+        nb_lues += len(lot)
+        lignes = lignes_converties(lot, table)
+        changements_avant = connexion.total_changes
+        connexion.executemany(requete, lignes)
+        nb_changements += connexion.total_changes - changements_avant
+        if supprimer_absentes:
+            connexion.executemany('INSERT OR IGNORE INTO cles_source (cle) VALUES (?)', [(l[0],) for l in lignes])
+    apres = connexion.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    inserees = apres - avant
+    supprimees = 0
+    if supprimer_absentes:
+        supprimees = connexion.execute(f'DELETE FROM {table} WHERE {cle} NOT IN (SELECT cle FROM cles_source)').rowcount
+        connexion.execute('DROP TABLE temp.cles_source')
+    return {'lues': nb_lues, 'inserees': inserees, 'mises_a_jour': nb_changements - inserees, 'supprimees': supprimees}
+
+
+def charger_entrepot(dossier_source=DOSSIER_SOURCE, chemin_base=CHEMIN_BASE, taille_lot=TAILLE_LOT, reinitialiser=False,
+                     depuis=None, jusqu_a=None):
+    """
+    Charge toutes les tables présentes dans dossier_source, dans une seule transaction.
+    Args:
+        dossier_source (Path): Dossier contenant les tables d_*, F_avis et F_offres (CSV, Parquet ou dossiers partitionnés).
+        chemin_base (Path): Fichier SQLite de l'entrepôt (créé si besoin).
+        taille_lot (int): Nombre de lignes par executemany.
+        reinitialiser (bool): Supprimer les tables avant le chargement (rechargement complet).
+        depuis (str | None): Premier mois chargé des tables partitionnées ('AAAA' ou 'AAAA-MM').
+        jusqu_a (str | None): Dernier mois chargé des tables partitionnées.
+    Returns:
+        dict: Statistiques par table.
+    """
+    dossier_source, chemin_base = Path(dossier_source), Path(chemin_base)
+    chemin_base.parent.mkdir(parents=True, exist_ok=True)
+    connexion = sqlite3.connect(chemin_base)
+    statistiques = {}
+    try:
+        # clés étrangères vérifiées après le chargement (les sources peuvent contenir des ids orphelins)
+        connexion.execute('PRAGMA foreign_keys = OFF')
+        connexion.execute('PRAGMA journal_mode = WAL')
+        with connexion:
+            connexion.execute('BEGIN')
+            if reinitialiser:
+                for table in reversed(list(SCHEMA)):
+                    connexion.execute(f'DROP TABLE IF EXISTS {table}')
+            creer_schema(connexion)
+            for table in SCHEMA:
+                source = source_table(dossier_source, table, depuis, jusqu_a)
+                if source is None:
+                    print(f"Fichier introuvable, table non chargée: {dossier_source / f'{table}.csv'} (ni .parquet, ni dossier partitionné)")
+                    continue
+                genre, chemin = source
+                if genre == 'partitions':
+                    # période demandée : source partielle, les lignes hors période sont gardées
+                    complete = depuis is None and jusqu_a is None
+                    statistiques[table] = charger_table(connexion, table, None, taille_lot, partitions=chemin,
+                                                        supprimer_absentes=complete)
+                    statistiques[table]['partitions'] = len(chemin)
+                elif genre == 'parquet':
+                    statistiques[table] = charger_table(connexion, table, None, taille_lot, partitions=[chemin])
+                else:
+                    statistiques[table] = charger_table(connexion, table, chemin, taille_lot)
+                s = statistiques[table]
+                print(f"{table:<14} lues={s['lues']:<7} insérées={s['inserees']:<7} mises à jour={s['mises_a_jour']:<7} "
+                      f"supprimées={s['supprimees']}"
+                      + (f" partitions={s['partitions']}" if 'partitions' in s else ''))
+        connexion.execute('ANALYZE')
+
+        orphelins = connexion.execute('PRAGMA foreign_key_check').fetchall()
+        if orphelins:
+            par_table = {}
+            for table, _, table_ref, _ in orphelins:
+                par_table[(table, table_ref)] = par_table.get((table, table_ref), 0) + 1
+            for (table, table_ref), nb in sorted(par_table.items()):
+                print(f'Attention: {nb} ligne(s) de {table} référencent un id absent de {table_ref}')
+    finally:
+        connexion.close()
+    return statistiques
+
+
+@instrumentation.etape('charger_entrepot')
+def main():
+    parser = argparse.ArgumentParser(description='Charger la production zone dans un entrepôt SQLite')
+    parser.add_argument('--source', type=str, default=str(DOSSIER_SOURCE), help='Dossier des CSV du schéma en étoile')
+    parser.add_argument('--base', type=str, default=str(CHEMIN_BASE), help='Fichier SQLite de l\'entrepôt')
+    parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT, help='Nombre de lignes par lot d\'insertion')
+    parser.add_argument('--reinitialiser', action='store_true', help='Supprimer et recréer les tables (rechargement complet)')
+    parser.add_argument('--depuis', type=str, default=None, help='Premier mois chargé des faits partitionnés (AAAA ou AAAA-MM)')
+    parser.add_argument('--jusqu-a', type=str, default=None, help='Dernier mois chargé des faits partitionnés (AAAA ou AAAA-MM)')
+    args = parser.parse_args()
+
+    statistiques = charger_entrepot(args.source, args.base, args.taille_lot, args.reinitialiser, args.depuis, args.jusqu_a)
+    instrumentation.compter_lignes(sum(s['inserees'] + s['mises_a_jour'] + s['supprimees'] for s in statistiques.values()))
+    print(f'Entrepôt à jour: {args.base}')
+
+
+if __name__ == '__main__':
+    main()
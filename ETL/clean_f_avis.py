@@ -1,19 +1,17 @@
 # Ce script nettoie le fichier F_avis.csv : normalise les dates, nettoie les textes et remplace les valeurs vides par 'NULL'.
 from pathlib import Path
+import argparse
 import pandas as pd
 from dateutil import parser
 import re
 
+import instrumentation
+from traitement_par_lots import TAILLE_LOT, transformer_csv_par_lots
+
 # Configuration des chemins
 RACINE = Path(__file__).resolve().parents[1]
 CHEMIN_F_AVIS = RACINE / 'data_globale_etl' / 'F_avis.csv'
 
-if not CHEMIN_F_AVIS.exists():
-    raise FileNotFoundError(f"Fichier manquant: {CHEMIN_F_AVIS}")
-
-print('Lecture de', CHEMIN_F_AVIS)
-df_avis = pd.read_csv(CHEMIN_F_AVIS, dtype=str, encoding='utf-8', keep_default_na=False)
-
 #  Fonctions de nettoyage
 def nettoyer_texte(s: str) -> str:
     if s is None:
@@ -42,36 +40,61 @@ def formater_date(s: str) -> str:
         except Exception:
             return s
 
-colonnes = list(df_avis.columns)
-
-# Normalisation de la colonne date_publication
-if 'date_publication' in df_avis.columns:
-    print('Normalisation de date_publication...')
-    df_avis['date_publication'] = df_avis['date_publication'].apply(formater_date)
-else:
-    print('Colonne date_publication introuvable')
-
-# Nettoyage des colonnes texte
-colonnes_texte = ['contenu_avis', 'inconvenient', 'avantage']
-for col in colonnes_texte:
-    if col in df_avis.columns:
-        print(f'Nettoyage de la colonne texte: {col}')
-        df_avis[col] = df_avis[col].apply(nettoyer_texte)
-
-for col in df_avis.columns:
-    if col in ['id_avis', 'id_note', 'id_entreprise', 'date_publication']:
-        continue
-    if df_avis[col].dtype == object:
-        df_avis[col] = df_avis[col].apply(lambda x: nettoyer_texte(x))
-
-colonnes_a_traiter = [c for c in df_avis.columns if c != 'id_avis']
-if colonnes_a_traiter:
-    df_avis[colonnes_a_traiter] = df_avis[colonnes_a_traiter].replace(r'^\s*$', 'NULL', regex=True)
-
-# Ecriture du fichier nettoyé
-sauvegarde = CHEMIN_F_AVIS.with_suffix('.bak.csv')
-print('Ecriture de la sauvegarde vers', sauvegarde)
-df_avis.to_csv(sauvegarde, index=False, encoding='utf-8')
-print('Ecriture finale vers', CHEMIN_F_AVIS)
-df_avis.to_csv(CHEMIN_F_AVIS, index=False, encoding='utf-8')
-print('Terminé. Lignes :', len(df_avis))
+
+def nettoyer_avis(df_avis: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalise les dates, nettoie les textes et remplace les valeurs vides par 'NULL'.
+    Args:
+        df_avis (pd.DataFrame): Table F_avis lue en texte.
+    Returns:
+        pd.DataFrame: Table F_avis nettoyée.
+    """
+    # Normalisation de la colonne date_publication
+    if 'date_publication' in df_avis.columns:
+        print('Normalisation de date_publication...')
+        df_avis['date_publication'] = df_avis['date_publication'].apply(formater_date)
+    else:
+        print('Colonne date_publication introuvable')
+
+    # Nettoyage des colonnes texte
+    colonnes_texte = ['contenu_avis', 'inconvenient', 'avantage']
+    for col in colonnes_texte:
+        if col in df_avis.columns:
+            print(f'Nettoyage de la colonne texte: {col}')
+            df_avis[col] = df_avis[col].apply(nettoyer_texte)
+
+    for col in df_avis.columns:
+        if col in ['id_avis', 'id_note', 'id_entreprise', 'date_publication']:
+            continue
+        if df_avis[col].dtype == object:
+            df_avis[col] = df_avis[col].apply(lambda x: nettoyer_texte(x))
+
+    colonnes_a_traiter = [c for c in df_avis.columns if c != 'id_avis']
+    if colonnes_a_traiter:
+        df_avis[colonnes_a_traiter] = df_avis[colonnes_a_traiter].replace(r'^\s*$', 'NULL', regex=True)
+    return df_avis
+
+
+@instrumentation.etape('clean_f_avis')
+def principal(taille_lot=TAILLE_LOT):
+    if not CHEMIN_F_AVIS.exists():
+        raise FileNotFoundError(f"Fichier manquant: {CHEMIN_F_AVIS}")
+
+    # Lecture et nettoyage par lots ; le fichier d'origine est conservé en sauvegarde par renommage
+    sauvegarde = CHEMIN_F_AVIS.with_suffix('.bak.csv')
+    print('Lecture de', CHEMIN_F_AVIS)
+    _, nb_lignes = transformer_csv_par_lots(CHEMIN_F_AVIS, CHEMIN_F_AVIS, nettoyer_avis, taille_lot, sauvegarde=sauvegarde)
+    print('Sauvegarde du fichier d\'origine vers', sauvegarde)
+    print('Ecriture finale vers', CHEMIN_F_AVIS)
+    print('Terminé. Lignes :', nb_lignes)
+    instrumentation.compter_lignes(nb_lignes)
+
+
+def lire_arguments():
+    parser = argparse.ArgumentParser(description='Nettoyer F_avis.csv')
+    parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT, help='Nombre de lignes traitées à la fois')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    principal(lire_arguments().taille_lot)
@@ -1,9 +1,13 @@
 # Ce script nettoie le fichier F_offres.csv : normalise les dates, nettoie les textes et remplace les valeurs vides par 'NULL'.
+import argparse
 import csv
 import re
 from pathlib import Path
 import pandas as pd
 
+import instrumentation
+from traitement_par_lots import TAILLE_LOT, transformer_csv_par_lots
+
 # Fonctions de nettoyage
 def normaliser_texte(s: str) -> str:
     if pd.isna(s):
@@ -33,24 +37,15 @@ def normaliser_date_iso_vers_jjmmaa(s: str) -> str:
     except Exception:
         return 'NULL'
 
-# Fonction principale 
-def principal():
-    # Configuration des chemins
-    racine_repo = Path(__file__).resolve().parent.parent
-    chemin_src = racine_repo / 'data_globale' / 'F_offres.csv'
-    dossier_sortie = racine_repo / 'data_globale_etl'
-    dossier_sortie.mkdir(parents=True, exist_ok=True)
-    chemin_dest = dossier_sortie / 'F_offres.csv'
-    sauvegarde = dossier_sortie / 'F_offres.bak.csv'
-
-    if not chemin_src.exists():
-        print(f"Fichier source introuvable: {chemin_src}")
-        return
-    
-    # Lecture du fichier source
-    df_offres = pd.read_csv(chemin_src, dtype=str, keep_default_na=False)
-
-    # Nettoyage des colonnes texte
+# Nettoyage de la table F_offres
+def nettoyer_offres(df_offres: pd.DataFrame) -> pd.DataFrame:
+    """
+    Nettoie les textes, normalise les dates et remplace les valeurs vides par 'NULL'.
+    Args:
+        df_offres (pd.DataFrame): Table F_offres lue en texte.
+    Returns:
+        pd.DataFrame: Table F_offres nettoyée.
+    """
     colonnes_texte = [c for c in df_offres.columns if c.lower() in ('libelle_emploi', 'contenu', 'description', 'libelle')]
     for col in colonnes_texte:
         print(f"Nettoyage de la colonne texte: {col}")
@@ -67,15 +62,39 @@ def principal():
         if col == 'id_offre':
             continue
         df_offres[col] = df_offres[col].apply(lambda x: 'NULL' if (isinstance(x, str) and x.strip() == '') else x)
+    return df_offres
 
-    if chemin_dest.exists():
-        chemin_dest.rename(sauvegarde)
-        print(f'Sortie existante sauvegardée vers: {sauvegarde}')
 
-    # Ecriture du fichier nettoyé
-    df_offres.to_csv(chemin_dest, index=False, quoting=csv.QUOTE_MINIMAL)
+# Fonction principale 
+@instrumentation.etape('clean_f_offres')
+def principal(taille_lot=TAILLE_LOT):
+    # Configuration des chemins
+    racine_repo = Path(__file__).resolve().parent.parent
+    chemin_src = racine_repo / 'data_globale' / 'F_offres.csv'
+    dossier_sortie = racine_repo / 'data_globale_etl'
+    dossier_sortie.mkdir(parents=True, exist_ok=True)
+    chemin_dest = dossier_sortie / 'F_offres.csv'
+    sauvegarde = dossier_sortie / 'F_offres.bak.csv'
+
+    if not chemin_src.exists():
+        print(f"Fichier source introuvable: {chemin_src}")
+        return
+    
+    # Lecture et nettoyage par lots ; la sortie existante est conservée en sauvegarde par renommage
+    sortie_existante = chemin_dest.exists()
+    _, nb_lignes = transformer_csv_par_lots(chemin_src, chemin_dest, nettoyer_offres, taille_lot, sauvegarde=sauvegarde,
+                                            options_ecriture={'quoting': csv.QUOTE_MINIMAL})
+    if sortie_existante:
+        print(f'Sortie existante sauvegardée vers: {sauvegarde}')
     print(f'Ecriture du fichier nettoyé vers: {chemin_dest}')
+    instrumentation.compter_lignes(nb_lignes)
+
+def lire_arguments():
+    parser = argparse.ArgumentParser(description='Nettoyer F_offres.csv')
+    parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT, help='Nombre de lignes traitées à la fois')
+    return parser.parse_args()
+
 
 # Lancer le script
 if __name__ == '__main__':
-    principal()
+    principal(lire_arguments().taille_lot)
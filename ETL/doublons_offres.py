@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Détection des offres quasi identiques (MinHash + LSH par bandes).
+
+Une même offre est souvent publiée plusieurs fois sous des identifiants
+LinkedIn différents, avec de légères retouches du texte (« Description du
+poste » ajouté, ville ou mention H/F modifiée). Une comparaison exacte des
+textes ne les voit pas, et comparer toutes les paires est quadratique.
+
+Chaque offre (libelle_emploi + contenu nettoyés) est découpée en shingles de
+TAILLE_SHINGLE mots ; sa signature MinHash (NB_PERMUTATIONS minima de
+fonctions de hachage universelles) estime la similarité de Jaccard entre deux
+offres. La signature est coupée en bandes : deux offres ne sont comparées que
+si elles partagent le contenu d'une bande (même seau), ce qui garde un temps
+à peu près linéaire. Le nombre de bandes est choisi d'après le seuil, en
+pénalisant davantage les paires manquées que les paires comparées pour rien.
+Les paires dont la similarité estimée atteint le seuil sont regroupées en
+clusters (composantes connexes) ; l'offre canonique d'un cluster est celle
+de plus petit id_offre (première capture).
+
+evaluer() compare, sur un échantillon d'offres, les paires regroupées aux
+paires dont la similarité de Jaccard exacte atteint le seuil (toutes les
+paires de l'échantillon) : précision et rappel de la détection.
+
+Usage:
+  python ETL/doublons_offres.py --seuil 0.8
+  python ETL/doublons_offres.py --fichier data_globale_etl/F_offres.csv --echantillon 2000
+
+Sortie : data_globale_etl/doublons_offres.csv (id_offre, id_offre_canonique,
+taille_cluster), une ligne par offre ; le nombre d'offres distinctes est le
+nombre de id_offre_canonique distincts.
+"""
+from pathlib import Path
+import argparse
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+
+import instrumentation
+
+# Configuration des chemins
+RACINE = Path(__file__).resolve().parents[1]
+CHEMIN_OFFRES = RACINE / 'data_globale_etl' / 'F_offres.csv'
+CHEMIN_SORTIE = RACINE / 'data_globale_etl' / 'doublons_offres.csv'
+
+SEUIL_DOUBLON = 0.8
+TAILLE_SHINGLE = 3
+NB_PERMUTATIONS = 128
+TAILLE_ECHANTILLON = 1000
+# Poids des paires manquées face aux paires comparées pour rien dans le choix des bandes
+POIDS_FAUX_NEGATIFS = 0.7
+
+COLONNES_TEXTE = ['libelle_emploi', 'contenu']
+COLONNES_DOUBLONS = ['id_offre', 'id_offre_canonique', 'taille_cluster']
+MOTIF_MOT = re.compile(r'[0-9a-z]+')
+
+
+#==============================================================================
+#-- Shingles et signatures
+#==============================================================================
+def texte_offre(libelle, contenu):
+    """Titre et description d'une offre en minuscules sans accents ('NULL' des scripts de nettoyage ignoré)."""
+    morceaux = [str(v) for v in (libelle, contenu) if isinstance(v, str) and v.strip() and v.strip() != 'NULL']
+    # accents décomposés (NFKD) puis retirés avec les autres caractères non ASCII
+    return unicodedata.normalize('NFKD', ' '.join(morceaux)).encode('ascii', 'ignore').decode('ascii').lower()
+
+
+def shingles(textes, taille=TAILLE_SHINGLE):
+    """
+    Empreintes 64 bits des suites de `taille` mots consécutifs de chaque texte (uniques, triées).
+    Les mots de tous les textes sont hachés en un seul appel ; un texte plus court que `taille`
+    mots donne une seule empreinte.
+    Args:
+        textes (list): Textes (voir texte_offre).
+        taille (int): Nombre de mots par shingle.
+    Returns:
+        list: Un tableau uint64 par texte (vide si le texte n'a aucun mot).
+    """
+    listes = [MOTIF_MOT.findall(t) for t in textes]
+    mots = np.array([m for liste in listes for m in liste], dtype=object)
+    codes = pd.util.hash_array(mots) if len(mots) else np.empty(0, dtype=np.uint64)
+    ensembles = []
+    debut = 0
+    for liste in listes:
+        ensembles.append(_combiner(codes[debut:debut + len(liste)], taille))
+        debut += len(liste)
+    return ensembles
+
+
+def _combiner(codes, taille):
+    """Combinaison polynomiale des codes de `taille` mots consécutifs (dépassements modulo 2**64 voulus)."""
+    if len(codes) == 0:
+        return np.empty(0, dtype=np.uint64)
+    taille = min(taille, len(codes))
+    nb = len(codes) - taille + 1
+    with np.errstate(over='ignore'):
+        empreintes = np.zeros(nb, dtype=np.uint64)
+        for decalage in range(taille):
+            empreintes = empreintes * np.uint64(1000003) + codes[decalage:decalage + nb]
+    return np.unique(empreintes)
+
+
+def permutations(nb_permutations=NB_PERMUTATIONS, graine=1):
+    """Coefficients (a impair, b) des fonctions h(x) = ((a*x + b) mod 2**64) >> 32 (multiplication-décalage)."""
+    generateur = np.random.RandomState(graine)
+    a = generateur.randint(0, 2**63, size=nb_permutations, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = generateur.randint(0, 2**63, size=nb_permutations, dtype=np.uint64)
+    return a, b
+
+
+def signature_minhash(empreintes, coefficients):
+    """Signature MinHash d'un ensemble d'empreintes (None si l'ensemble est vide)."""
+    if len(empreintes) == 0:
+        return None
+    a, b = coefficients
+    # clés de 32 bits : h est alors universel sur 2**32 valeurs avec l'arithmétique 64 bits
+    valeurs = empreintes & np.uint64(0xFFFFFFFF)
+    with np.errstate(over='ignore'):
+        return ((a[:, None] * valeurs[None, :] + b[:, None]) >> np.uint64(32)).min(axis=1)
+
+
+def parametres_lsh(seuil, nb_permutations=NB_PERMUTATIONS, poids_faux_negatifs=POIDS_FAUX_NEGATIFS):
+    """
+    Nombre de bandes et de lignes par bande (bandes * lignes = nb_permutations) minimisant
+    l'aire des faux positifs (similarité < seuil) et des faux négatifs (>= seuil) de la courbe
+    P(candidat) = 1 - (1 - s**lignes)**bandes.
+    Returns:
+        tuple: (bandes, lignes)
+    """
+    s = np.linspace(0, 1, 1001)
+    pas = s[1] - s[0]
+    meilleur, meilleure_erreur = None, None
+    for lignes in range(1, nb_permutations + 1):
+        if nb_permutations % lignes:
+            continue
+        bandes = nb_permutations // lignes
+        probabilite = 1 - (1 - s ** lignes) ** bandes
+        # aires par somme de Riemann sur la grille (pas de 0.001)
+        faux_positifs = probabilite[s < seuil].sum() * pas
+        faux_negatifs = (1 - probabilite[s >= seuil]).sum() * pas
+        erreur = (1 - poids_faux_negatifs) * faux_positifs + poids_faux_negatifs * faux_negatifs
+        if meilleure_erreur is None or erreur < meilleure_erreur:
+            meilleur, meilleure_erreur = (bandes, lignes), erreur
+    return meilleur
+
+
+#==============================================================================
+#-- Regroupement
+#==============================================================================
+class Composantes:
+    """Union-find des offres ; les paires déjà reliées ne sont pas recomparées."""
+
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def racine(self, x):
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def unir(self, a, b):
+        ra, rb = self.racine(a), self.racine(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def regrouper_doublons(textes, seuil=SEUIL_DOUBLON, nb_permutations=NB_PERMUTATIONS, taille_shingle=TAILLE_SHINGLE):
+    """
+    Regroupe les textes quasi identiques.
+    Args:
+        textes (list): Texte de chaque offre (voir texte_offre).
+        seuil (float): Similarité de Jaccard estimée minimale entre deux offres d'un même cluster.
+        nb_permutations (int): Longueur des signatures MinHash.
+        taille_shingle (int): Nombre de mots par shingle.
+    Returns:
+        tuple: (numéro de cluster de chaque offre = plus petit indice du cluster, nombre de paires comparées)
+    """
+    coefficients = permutations(nb_permutations)
+    signatures = [signature_minhash(ensemble, coefficients) for ensemble in shingles(textes, taille_shingle)]
+    bandes, lignes = parametres_lsh(seuil, nb_permutations)
+    composantes = Composantes(len(textes))
+    nb_comparaisons = 0
+    for bande in range(bandes):
+        seaux = {}
+        debut, fin = bande * lignes, (bande + 1) * lignes
+        for i, signature in enumerate(signatures):
+            if signature is not None:
+                seaux.setdefault(signature[debut:fin].tobytes(), []).append(i)
+        for membres in seaux.values():
+            # une offre n'est comparée qu'à un représentant de chaque cluster déjà présent dans le seau :
+            # les copies d'une même offre ne coûtent pas un nombre quadratique de comparaisons
+            representants = {}
+            for i in membres:
+                for j in list(representants.values()):
+                    if composantes.racine(i) == composantes.racine(j):
+                        continue
+                    nb_comparaisons += 1
+                    if np.mean(signatures[i] == signatures[j]) >= seuil:
+                        composantes.unir(i, j)
+                representants = {composantes.racine(j): j for j in [*representants.values(), i]}
+    return [composantes.racine(i) for i in range(len(textes))], nb_comparaisons
+
+
+def detecter_doublons(df_offres, seuil=SEUIL_DOUBLON, nb_permutations=NB_PERMUTATIONS):
+    """
+    Clusters d'offres quasi identiques de F_offres et offre canonique de chacun.
+    Args:
+        df_offres (pd.DataFrame): Table F_offres nettoyée (id_offre, libelle_emploi, contenu).
+        seuil (float): Similarité minimale.
+        nb_permutations (int): Longueur des signatures MinHash.
+    Returns:
+        pd.DataFrame: Une ligne par offre (id_offre, id_offre_canonique, taille_cluster), dans l'ordre de df_offres.
+    """
+    if df_offres.empty:
+        return pd.DataFrame(columns=COLONNES_DOUBLONS)
+    colonnes = [df_offres[c] if c in df_offres.columns else pd.Series('', index=df_offres.index) for c in COLONNES_TEXTE]
+    textes = [texte_offre(libelle, contenu) for libelle, contenu in zip(*colonnes)]
+    clusters, nb_comparaisons = regrouper_doublons(textes, seuil, nb_permutations)
+    print(f'Paires candidates comparées: {nb_comparaisons} (sur {len(textes) * (len(textes) - 1) // 2} paires possibles)')
+
+    # offre canonique : plus petit id_offre du cluster (id non entier départagé par l'ordre des lignes)
+    ids = df_offres['id_offre'].astype(str).str.strip()
+    membres = pd.DataFrame({
+        'cluster': clusters,
+        'id_entier': pd.to_numeric(ids.where(ids.str.fullmatch(r'\d+')), errors='coerce').fillna(np.inf).to_numpy(),
+        'indice': np.arange(len(ids)),
+    })
+    canoniques = membres.sort_values(['id_entier', 'indice']).groupby('cluster')['indice'].first()
+    tailles = membres.groupby('cluster').size()
+    return pd.DataFrame({
+        'id_offre': ids.to_numpy(),
+        'id_offre_canonique': ids.to_numpy()[canoniques.loc[membres['cluster']].to_numpy()],
+        'taille_cluster': tailles.loc[membres['cluster']].to_numpy(),
+    }, columns=COLONNES_DOUBLONS)
+
+
+#==============================================================================
+#-- Evaluation
+#==============================================================================
+def jaccard(a, b):
+    if len(a) == 0 or len(b) == 0:
+        return 0.0
+    commun = len(np.intersect1d(a, b, assume_unique=True))
+    return commun / (len(a) + len(b) - commun)
+
+
+def evaluer(df_offres, doublons, seuil=SEUIL_DOUBLON, taille_echantillon=TAILLE_ECHANTILLON, graine=1):
+    """
+    Précision et rappel des clusters sur un échantillon d'offres, face à la similarité de Jaccard
+    exacte de toutes les paires de l'échantillon (quadratique : l'échantillon reste petit).
+    Une paire est détectée si ses deux offres ont la même offre canonique.
+    Returns:
+        dict: echantillon, paires_reelles, paires_detectees, vrais_positifs, precision, rappel.
+    """
+    n = len(df_offres)
+    if n > taille_echantillon:
+        positions = np.sort(np.random.RandomState(graine).choice(n, taille_echantillon, replace=False))
+    else:
+        positions = np.arange(n)
+    colonnes = [df_offres[c] if c in df_offres.columns else pd.Series('', index=df_offres.index) for c in COLONNES_TEXTE]
+    ensembles = shingles([texte_offre(colonnes[0].iloc[p], colonnes[1].iloc[p]) for p in positions])
+    canoniques = doublons['id_offre_canonique'].to_numpy()[positions]
+
+    reelles, detectees = set(), set()
+    for x in range(len(positions)):
+        for y in range(x + 1, len(positions)):
+            if jaccard(ensembles[x], ensembles[y]) >= seuil:
+                reelles.add((x, y))
+            if canoniques[x] == canoniques[y]:
+                detectees.add((x, y))
+    vrais_positifs = len(reelles & detectees)
+    return {
+        'echantillon': len(positions),
+        'paires_reelles': len(reelles),
+        'paires_detectees': len(detectees),
+        'vrais_positifs': vrais_positifs,
+        'precision': vrais_positifs / len(detectees) if detectees else 1.0,
+        'rappel': vrais_positifs / len(reelles) if reelles else 1.0,
+    }
+
+
+def afficher_evaluation(rapport, seuil):
+    print(f"Evaluation sur {rapport['echantillon']} offres (Jaccard exact >= {seuil}):")
+    print(f"  - paires réelles: {rapport['paires_reelles']}, détectées: {rapport['paires_detectees']}, "
+          f"communes: {rapport['vrais_positifs']}")
+    print(f"  - précision: {rapport['precision']:.3f}, rappel: {rapport['rappel']:.3f}")
+
+
+@instrumentation.etape('doublons_offres')
+def main():
+    parser = argparse.ArgumentParser(description='Détecter les offres quasi identiques (MinHash LSH)')
+    parser.add_argument('--seuil', type=float, default=SEUIL_DOUBLON, help='Similarité de Jaccard minimale (0-1)')
+    parser.add_argument('--permutations', type=int, default=NB_PERMUTATIONS, help='Longueur des signatures MinHash')
+    parser.add_argument('--fichier', type=str, default=str(CHEMIN_OFFRES), help='Chemin vers F_offres.csv nettoyé')
+    parser.add_argument('--sortie', type=str, default=str(CHEMIN_SORTIE), help='CSV des clusters écrit')
+    parser.add_argument('--echantillon', type=int, default=TAILLE_ECHANTILLON,
+                        help="Nombre d'offres de l'évaluation précision / rappel (0 : pas d'évaluation)")
+    args = parser.parse_args()
+
+    chemin = Path(args.fichier)
+    if not chemin.exists():
+        print(f'Fichier source introuvable: {chemin}')
+        return
+    df_offres = pd.read_csv(chemin, dtype=str, encoding='utf-8', keep_default_na=False)
+    print(f'Offres lues: {len(df_offres)}')
+    bandes, lignes = parametres_lsh(args.seuil, args.permutations)
+    print(f'Seuil {args.seuil}: {bandes} bandes de {lignes} lignes')
+
+    doublons = detecter_doublons(df_offres, seuil=args.seuil, nb_permutations=args.permutations)
+    nb_clusters = doublons.loc[doublons['taille_cluster'] > 1, 'id_offre_canonique'].nunique()
+    nb_distinctes = doublons['id_offre_canonique'].nunique()
+    print(f'Clusters de doublons: {nb_clusters} ; offres distinctes: {nb_distinctes} sur {len(doublons)}')
+    if args.echantillon:
+        afficher_evaluation(evaluer(df_offres, doublons, args.seuil, args.echantillon), args.seuil)
+
+    chemin_sortie = Path(args.sortie)
+    chemin_sortie.parent.mkdir(parents=True, exist_ok=True)
+    doublons.to_csv(chemin_sortie, index=False, encoding='utf-8')
+    instrumentation.compter_lignes(len(doublons))
+    print(f'Ecriture des clusters vers: {chemin_sortie}')
+
+
+if __name__ == '__main__':
+    main()
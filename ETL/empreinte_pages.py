@@ -0,0 +1,53 @@
+"""
+Empreinte de contenu des pages crawlées (dédoublonnage de la landing zone).
+
+Une même fiche recrawlée (offre LinkedIn, fiche société Glassdoor) ne diffère
+souvent de la capture précédente que par du balisage volatil : identifiants
+de session et de suivi dans les liens (refId, trackingId, trk, position,
+pageNum, utm_*), attributs de suivi (data-track-*), scripts de suivi et de
+publicité, commentaires, identifiants des emplacements publicitaires.
+L'empreinte d'une page est le sha256 de son contenu débarrassé de ce
+balisage ; deux captures de même empreinte sont stockées une seule fois.
+
+Le bloc <script type="application/ld+json"> est conservé : il porte les
+champs des offres LinkedIn.
+
+Utilisation:
+  empreinte = empreinte_page(octets_html)               # contenu normalisé
+  empreinte = empreinte_page(octets_html, normaliser=False)  # octets bruts
+"""
+import hashlib
+import re
+
+# Scripts autres que le JSON-LD (suivi, publicité, état de la page)
+MOTIF_SCRIPT = re.compile(rb'<script\b(?![^>]*application/ld\+json)[^>]*>.*?</script>', re.S | re.I)
+MOTIF_COMMENTAIRE = re.compile(rb'<!--.*?-->', re.S)
+# Valeur des paramètres de suivi dans les URL, y compris encodées dans un paramètre de redirection
+MOTIF_PARAMETRES_SUIVI = re.compile(
+    rb'((?:[?&;]|%3F|%26)(?:refId|trackingId|trk|position|pageNum|utm_[a-z]+|sessionid|csrfToken)(?:=|%3D))'
+    rb'(?:[^&"\'\s%<>]|%(?!26|22|3F)[0-9A-Fa-f]{2})*')
+# Attributs de suivi, dont l'ordre varie d'un crawl à l'autre (data-track-source, data-tracking-will-navigate...)
+MOTIF_ATTRIBUTS_SUIVI = re.compile(rb'\sdata-track(?:ing)?-[\w-]+(?:=(?:"[^"]*"|\'[^\']*\'|[^\s>]+))?')
+MOTIF_EMPLACEMENT_PUB = re.compile(rb'id=([\'"])div-AdSlot-[^\'"]*\1')
+
+
+def normaliser_page(octets):
+    """Contenu d'une page sans son balisage volatil (scripts, commentaires, suivi, publicités, espaces)."""
+    octets = MOTIF_SCRIPT.sub(b'', octets)
+    octets = MOTIF_COMMENTAIRE.sub(b'', octets)
+    octets = MOTIF_PARAMETRES_SUIVI.sub(rb'\1', octets)
+    octets = MOTIF_ATTRIBUTS_SUIVI.sub(b'', octets)
+    octets = MOTIF_EMPLACEMENT_PUB.sub(b'', octets)
+    return b' '.join(octets.split())
+
+
+def empreinte_page(octets, normaliser=True):
+    """
+    Empreinte de contenu d'une page.
+    Args:
+        octets (bytes): Contenu brut de la page.
+        normaliser (bool): Retirer le balisage volatil avant le calcul (False : octets bruts).
+    Returns:
+        str: sha256 hexadécimal.
+    """
+    return hashlib.sha256(normaliser_page(octets) if normaliser else octets).hexdigest()
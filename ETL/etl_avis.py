@@ -1,8 +1,11 @@
 # Ce script ETL filtre F_avis.csv : il supprime les lignes dont le contenu d'avis est vide.
 from pathlib import Path
-import sys
+import argparse
 import pandas as pd
 
+import instrumentation
+from traitement_par_lots import TAILLE_LOT, transformer_csv_par_lots
+
 # Fonction pour vérifier si une chaîne est vide ou ne contient que des espaces
 def est_vide(s):
     """
@@ -23,51 +26,87 @@ def est_vide(s):
 RACINE = Path(__file__).resolve().parents[1]
 REPERTOIRE_ENTREE = RACINE / 'data_globale'
 REPERTOIRE_SORTIE = RACINE / 'data_globale_etl'
-REPERTOIRE_SORTIE.mkdir(parents=True, exist_ok=True)
 
 fichier_entree = REPERTOIRE_ENTREE / 'F_avis.csv'
 fichier_sortie = REPERTOIRE_SORTIE / 'F_avis.csv'
 
-if not fichier_entree.exists():
-    raise FileNotFoundError(f"Fichier source introuvable: {fichier_entree}")
-
-# Lire le fichier CSV d'entrée
-df_avant = pd.read_csv(fichier_entree, dtype=str, encoding='utf-8', keep_default_na=False, on_bad_lines='skip')
-nb_original = len(df_avant)
-
-# Identifier la colonne de contenu d'avis
-candidats_contenu = ['contenu_avis', 'contenu', 'texte', 'contenu_avis_fr']
-colonne_contenu = None
-for c in candidats_contenu:
-    if c in df_avant.columns:
-        colonne_contenu = c
-        break
-# Si aucune colonne standard n'est trouvée, chercher une colonne contenant des mots-clés
-if colonne_contenu is None:
+
+def trouver_colonne_contenu(df_avant):
+    """
+    Identifie la colonne de contenu d'avis.
+    Args:
+        df_avant (pd.DataFrame): Table F_avis.
+    Returns:
+        str | None: Nom de la colonne de contenu ou None si aucune n'est trouvée.
+    """
+    candidats_contenu = ['contenu_avis', 'contenu', 'texte', 'contenu_avis_fr']
+    for c in candidats_contenu:
+        if c in df_avant.columns:
+            return c
+    # Si aucune colonne standard n'est trouvée, chercher une colonne contenant des mots-clés
     for c in df_avant.columns:
         lc = c.lower()
         if 'conten' in lc or 'avis' in lc or 'texte' in lc:
-            colonne_contenu = c
-            break
-# Si toujours aucune colonne trouvée, afficher un message et sortir
-if colonne_contenu is None:
-    print('Aucune colonne de contenu trouvée dans F_avis.csv. Aucune ligne supprimée. Colonnes:', list(df_avant.columns))
-    df_avant.to_csv(fichier_sortie, index=False, encoding='utf-8')
-    print(f'Ecrit: {fichier_sortie} (inchangé)')
-    sys.exit(0)
-
-
-# Filtrer les lignes où la colonne de contenu d'avis est vide
-masque_vide = df_avant[colonne_contenu].map(est_vide)
-nb_vides = int(masque_vide.sum())
-# Créer le DataFrame nettoyé
-df_nettoye = df_avant[~masque_vide].reset_index(drop=True)
-nb_ecrits = len(df_nettoye)
-
-# Écrire le DataFrame nettoyé dans le fichier de sortie
-df_nettoye.to_csv(fichier_sortie, index=False, encoding='utf-8')
-
-# Afficher le résumé
-print(f'Lu: {fichier_entree} lignes={nb_original}')
-print(f'Lignes supprimées avec "{colonne_contenu}" vide: {nb_vides}')
-print(f'Ecrit: {fichier_sortie} lignes={nb_ecrits}')
+            return c
+    return None
+
+
+def filtrer_avis(df_avant):
+    """
+    Supprime les lignes dont le contenu d'avis est vide.
+    Args:
+        df_avant (pd.DataFrame): Table F_avis lue en texte.
+    Returns:
+        tuple: (DataFrame nettoyé, colonne de contenu utilisée ou None, nombre de lignes supprimées)
+    """
+    colonne_contenu = trouver_colonne_contenu(df_avant)
+    if colonne_contenu is None:
+        return df_avant, None, 0
+
+    # Filtrer les lignes où la colonne de contenu d'avis est vide
+    masque_vide = df_avant[colonne_contenu].map(est_vide)
+    nb_vides = int(masque_vide.sum())
+    # Créer le DataFrame nettoyé
+    df_nettoye = df_avant[~masque_vide].reset_index(drop=True)
+    return df_nettoye, colonne_contenu, nb_vides
+
+
+@instrumentation.etape('etl_avis')
+def principal(taille_lot=TAILLE_LOT):
+    REPERTOIRE_SORTIE.mkdir(parents=True, exist_ok=True)
+    if not fichier_entree.exists():
+        raise FileNotFoundError(f"Fichier source introuvable: {fichier_entree}")
+
+    # Lire le fichier CSV d'entrée par lots et écrire chaque lot filtré au fil de l'eau
+    colonne_contenu = trouver_colonne_contenu(pd.read_csv(fichier_entree, dtype=str, encoding='utf-8', nrows=0))
+    nb_vides = 0
+
+    def filtrer_lot(lot):
+        nonlocal nb_vides
+        lot_nettoye, _, nb_vides_lot = filtrer_avis(lot)
+        nb_vides += nb_vides_lot
+        return lot_nettoye
+
+    nb_original, nb_ecrits = transformer_csv_par_lots(fichier_entree, fichier_sortie, filtrer_lot, taille_lot,
+                                                      options_lecture={'on_bad_lines': 'skip'})
+    instrumentation.compter_lignes(nb_ecrits)
+    # Si aucune colonne trouvée, le fichier est recopié tel quel
+    if colonne_contenu is None:
+        print('Aucune colonne de contenu trouvée dans F_avis.csv. Aucune ligne supprimée.')
+        print(f'Ecrit: {fichier_sortie} (inchangé)')
+        return
+
+    # Afficher le résumé
+    print(f'Lu: {fichier_entree} lignes={nb_original}')
+    print(f'Lignes supprimées avec "{colonne_contenu}" vide: {nb_vides}')
+    print(f'Ecrit: {fichier_sortie} lignes={nb_ecrits}')
+
+
+def lire_arguments():
+    parser = argparse.ArgumentParser(description='Filtrer les avis au contenu vide de F_avis.csv')
+    parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT, help='Nombre de lignes traitées à la fois')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    principal(lire_arguments().taille_lot)
@@ -4,91 +4,71 @@ import re
 import csv
 import pandas as pd
 
-def nettoyer_id_secteur(val):
+import instrumentation
+
+def par_valeurs_distinctes(serie, transformation):
     """
-    Nettoie la valeur de id_secteur en supprimant les espaces et les suffixes .0
+    Applique une transformation de Series aux seules valeurs distinctes, puis diffuse le résultat.
     Args:
-        val (str): Valeur à nettoyer.
+        serie (pd.Series): Valeurs (les colonnes de d_entreprise répètent peu de libellés).
+        transformation (callable): Fonction pd.Series -> pd.Series, appliquée aux valeurs distinctes.
     Returns:
-        str: Valeur nettoyée."""
-    if pd.isna(val) or str(val).strip() == '':
-        return ''
-    s = str(val).strip()
-    if s.endswith('.0'):
-        s = s[:-2]
-    s = re.sub(r"\.0$", "", s)
-    return s
+        pd.Series: Résultat aligné sur serie.
+    """
+    codes, distinctes = pd.factorize(serie, use_na_sentinel=False)
+    resultat = transformation(pd.Series(distinctes, dtype=object)).to_numpy()
+    return pd.Series(resultat[codes], index=serie.index, dtype=object)
+
+def nettoyer_ids_secteur(serie):
+    """
+    Nettoie les valeurs de id_secteur en supprimant les espaces et les suffixes .0 (deux au plus)
+    Args:
+        serie (pd.Series): Valeurs à nettoyer.
+    Returns:
+        pd.Series: Valeurs nettoyées ('' pour une valeur manquante)."""
+    return par_valeurs_distinctes(
+        serie, lambda v: v.fillna('').astype(str).str.strip().str.replace(r"(?:\.0){1,2}$", "", regex=True))
 
-def est_ligne_uniquement_id(row):
+def texte_colonne(df, colonne):
+    """Valeurs d'une colonne en texte sans espaces de bord ('' si la colonne est absente)."""
+    if colonne not in df.columns:
+        return pd.Series('', index=df.index)
+    return par_valeurs_distinctes(df[colonne], lambda v: v.astype(str).str.strip())
+
+def masque_lignes_uniquement_id(df):
     """
-    Vérifie si une ligne contient uniquement des informations d'identifiant (id_entreprise, id_secteur)
+    Repère les lignes qui ne contiennent que des informations d'identifiant (id_entreprise, id_secteur vide)
     Args:
-        row (pd.Series): Ligne du DataFrame.
+        df (pd.DataFrame): Table d_entreprise.
     Returns:
-        bool: True si la ligne contient uniquement des identifiants, False sinon."""
-    nom = str(row.get('nom_entreprise','')).strip()
-    taille = str(row.get('taille','')).strip()
-    idsec = str(row.get('id_secteur','')).strip()
-    if (not nom) and (not taille) and (not idsec):
-        return True
-    return False
+        pd.Series: Masque booléen, True pour les lignes sans nom, taille ni id_secteur."""
+    return ((texte_colonne(df, 'nom_entreprise') == '') & (texte_colonne(df, 'taille') == '')
+            & (texte_colonne(df, 'id_secteur') == ''))
 
 
 # Configuration des chemins
 RACINE = Path(__file__).resolve().parents[1]
 REPERTOIRE_ENTREE = RACINE / 'data_globale'
 REPERTOIRE_SORTIE = RACINE / 'data_globale_etl'
-REPERTOIRE_SORTIE.mkdir(parents=True, exist_ok=True)
 
 fichier_entreprise = REPERTOIRE_ENTREE / 'd_entreprise.csv'
 fichier_secteur = REPERTOIRE_ENTREE / 'd_secteur.csv'
 fichier_sortie_entreprise = REPERTOIRE_SORTIE / 'd_entreprise.csv'
 fichier_sortie_secteur = REPERTOIRE_SORTIE / 'd_secteur.csv'
 
-# Vérifier l'existence du fichier source
-if not fichier_entreprise.exists():
-    raise FileNotFoundError(f"Fichier source introuvable: {fichier_entreprise}")
-
-# Lire d_entreprise.csv
-df_entreprise = pd.read_csv(fichier_entreprise, dtype=str, encoding='utf-8', keep_default_na=False)
-df_entreprise.columns = [c.strip() for c in df_entreprise.columns]
-
-
-# Nettoyer la colonne id_secteur
-if 'id_secteur' not in df_entreprise.columns:
-    df_entreprise['id_secteur'] = ''
-df_entreprise['id_secteur'] = df_entreprise['id_secteur'].apply(nettoyer_id_secteur)
-
-
-# Supprimer les lignes qui ne contiennent que des identifiants
-masque_seulement_id = df_entreprise.apply(est_ligne_uniquement_id, axis=1)
-nb_suppr = masque_seulement_id.sum()
-if nb_suppr > 0:
-    df_entreprise = df_entreprise[~masque_seulement_id].reset_index(drop=True)
-
-# Remplir les valeurs manquantes de id_secteur avec '42', représentant 'sans secteur'
-masque_idsec_manquant = df_entreprise['id_secteur'].map(lambda x: str(x).strip() == '')
-if masque_idsec_manquant.any():
-    df_entreprise.loc[masque_idsec_manquant, 'id_secteur'] = '42'
-
 # Normaliser la colonne taille et créer la colonne categorie
-def remplir_taille(x):
+def remplir_tailles(serie):
     """
-    Remplit la valeur de taille avec 'Inconnu' si elle est manquante ou vide.
+    Remplit les valeurs de taille avec 'Inconnu' si elles sont manquantes ou vides.
     Args:
-        x (str): Valeur de taille.
+        serie (pd.Series): Valeurs de taille.
     Returns:
-        str: Valeur de taille remplie.
+        pd.Series: Valeurs de taille remplies, sans espaces de bord.
     """
-    if pd.isna(x) or str(x).strip() == '':
-        return 'Inconnu'
-    return str(x).strip()
-
-# Remplir les valeurs manquantes de taille
-if 'taille' not in df_entreprise.columns:
-    df_entreprise['taille'] = 'Inconnu'
-else:
-    df_entreprise['taille'] = df_entreprise['taille'].apply(remplir_taille)
+    def remplir(valeurs):
+        tailles = valeurs.fillna('').astype(str).str.strip()
+        return tailles.mask(tailles == '', 'Inconnu')
+    return par_valeurs_distinctes(serie, remplir)
 
 def extraire_nombres(s):
     """
@@ -135,12 +115,9 @@ def categorie_depuis_taille(s):
         return 'PME'
     return 'Autre'
 
-# Appliquer la fonction pour créer la colonne categorie
-df_entreprise['categorie'] = df_entreprise['taille'].map(categorie_depuis_taille)
-
 def normaliser_libelle_taille(s):
     """
-    Normalise les libellés de taille en supprimant les espaces superflus.  
+    Normalise les libellés de taille en supprimant les espaces superflus.
     Args:
         s (str): Libellé de taille.
     Returns:
@@ -164,10 +141,11 @@ taille_vers_categorie = {
     normaliser_libelle_taille('Inconnu'): 'Inconnu',
 }
 
-# Mapper les tailles vers catégories en utilisant le dictionnaire
+# Catégorie d'une taille : dictionnaire de correspondance, extraction des nombres pour les libellés absents du dictionnaire
 def mapper_taille_vers_categorie(val):
     """
-    Mappe une valeur de taille vers une catégorie en utilisant le dictionnaire de correspondance.
+    Mappe une valeur de taille vers une catégorie en utilisant le dictionnaire de correspondance,
+    ou à défaut les effectifs lus dans le libellé (categorie_depuis_taille).
     Args:
         val (str): Valeur de taille.
     Returns:
@@ -175,49 +153,127 @@ def mapper_taille_vers_categorie(val):
     if val is None:
         return 'Inconnu'
     key = normaliser_libelle_taille(val)
-    return taille_vers_categorie.get(key, 'Autre')
-
-# Appliquer le mapping pour mettre à jour la colonne categorie
-df_entreprise['categorie'] = df_entreprise['taille'].map(mapper_taille_vers_categorie)
-# Réorganiser les colonnes et s'assurer qu'elles existent toutes
-colonnes_finales = ['id_entreprise','id_secteur','nom_entreprise','taille','categorie']
-for c in colonnes_finales:
-    if c not in df_entreprise.columns:
-        df_entreprise[c] = ''
-# Réorganiser les colonnes
-df_entreprise = df_entreprise[colonnes_finales]
-
-# Traiter d_secteur.csv
-if fichier_secteur.exists():
-    df_secteur = pd.read_csv(fichier_secteur, dtype=str, encoding='utf-8', keep_default_na=False)
-    df_secteur.columns = [c.strip() for c in df_secteur.columns]
-else:
-    df_secteur = pd.DataFrame(columns=['id_secteur','secteur'])
-
-if 'id_secteur' in df_secteur.columns:
-    df_secteur['id_secteur'] = df_secteur['id_secteur'].map(lambda x: '' if pd.isna(x) else str(x).strip())
-    df_secteur['id_secteur'] = df_secteur['id_secteur'].apply(lambda v: re.sub(r"\.0$", "", v) if v else v)
-else:
-    df_secteur['id_secteur'] = ''
-    df_secteur['secteur'] = ''
-
-existe_42 = any(str(x).strip() == '42' for x in df_secteur['id_secteur'].tolist())
-if not existe_42:
-    df_secteur = pd.concat([df_secteur, pd.DataFrame([{'id_secteur':'42','secteur':'sans secteur'}])], ignore_index=True)
-
-colonnes_dsec = ['id_secteur','secteur']
-for c in colonnes_dsec:
-    if c not in df_secteur.columns:
-        df_secteur[c] = ''
-
-# Réorganiser les colonnes de d_secteur
-df_secteur = df_secteur[colonnes_dsec]
-df_secteur.to_csv(fichier_sortie_secteur, index=False, encoding='utf-8')
-# Sauvegarder d_entreprise.csv nettoyé
-df_entreprise.to_csv(fichier_sortie_entreprise, index=False, encoding='utf-8')
-
-# Afficher le résumé
-print('ETL terminé.')
-print(f'Ecrit: {fichier_sortie_entreprise}')
-print(f'Ecrit: {fichier_sortie_secteur}')
-print(f'Supprimé {nb_suppr} lignes qui contenaient seulement id_entreprise')
+    if key in taille_vers_categorie:
+        return taille_vers_categorie[key]
+    return categorie_depuis_taille(key)
+
+def classifier_tailles(tailles):
+    """
+    Catégorie de chaque taille : chaque libellé distinct n'est classé qu'une fois, puis le résultat est diffusé.
+    Args:
+        tailles (pd.Series): Valeurs de taille.
+    Returns:
+        pd.Series: Catégories, alignées sur tailles.
+    """
+    categories = {libelle: mapper_taille_vers_categorie(libelle) for libelle in tailles.unique()}
+    return tailles.map(categories).astype(object)
+
+
+def transformer_entreprise(df_entreprise):
+    """
+    Nettoie la table d_entreprise et calcule la colonne categorie.
+    Args:
+        df_entreprise (pd.DataFrame): Table d_entreprise lue en texte.
+    Returns:
+        tuple: (DataFrame nettoyé, nombre de lignes supprimées qui ne contenaient que des identifiants)
+    """
+    df_entreprise.columns = [c.strip() for c in df_entreprise.columns]
+
+    # Nettoyer la colonne id_secteur
+    if 'id_secteur' not in df_entreprise.columns:
+        df_entreprise['id_secteur'] = ''
+    df_entreprise['id_secteur'] = nettoyer_ids_secteur(df_entreprise['id_secteur'])
+
+    # Supprimer les lignes qui ne contiennent que des identifiants
+    masque_seulement_id = masque_lignes_uniquement_id(df_entreprise)
+    nb_suppr = masque_seulement_id.sum()
+    if nb_suppr > 0:
+        df_entreprise = df_entreprise[~masque_seulement_id].reset_index(drop=True)
+
+    # Remplir les valeurs manquantes de id_secteur avec '42', représentant 'sans secteur'
+    masque_idsec_manquant = df_entreprise['id_secteur'] == ''
+    if masque_idsec_manquant.any():
+        df_entreprise.loc[masque_idsec_manquant, 'id_secteur'] = '42'
+
+    # Remplir les valeurs manquantes de taille
+    if 'taille' not in df_entreprise.columns:
+        df_entreprise['taille'] = 'Inconnu'
+    else:
+        df_entreprise['taille'] = remplir_tailles(df_entreprise['taille'])
+
+    # Créer la colonne categorie à partir des libellés de taille distincts
+    df_entreprise['categorie'] = classifier_tailles(df_entreprise['taille'])
+    # Réorganiser les colonnes et s'assurer qu'elles existent toutes
+    colonnes_finales = ['id_entreprise','id_secteur','nom_entreprise','taille','categorie']
+    for c in colonnes_finales:
+        if c not in df_entreprise.columns:
+            df_entreprise[c] = ''
+    # Réorganiser les colonnes
+    df_entreprise = df_entreprise[colonnes_finales]
+    return df_entreprise, nb_suppr
+
+
+def transformer_secteur(df_secteur):
+    """
+    Nettoie la table d_secteur et ajoute le secteur 42 'sans secteur' s'il est absent.
+    Args:
+        df_secteur (pd.DataFrame | None): Table d_secteur lue en texte, ou None si le fichier n'existe pas.
+    Returns:
+        pd.DataFrame: Table d_secteur nettoyée.
+    """
+    if df_secteur is None:
+        df_secteur = pd.DataFrame(columns=['id_secteur','secteur'])
+    else:
+        df_secteur.columns = [c.strip() for c in df_secteur.columns]
+
+    if 'id_secteur' in df_secteur.columns:
+        df_secteur['id_secteur'] = df_secteur['id_secteur'].fillna('').astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
+    else:
+        df_secteur['id_secteur'] = ''
+        df_secteur['secteur'] = ''
+
+    existe_42 = (df_secteur['id_secteur'].astype(str).str.strip() == '42').any()
+    if not existe_42:
+        df_secteur = pd.concat([df_secteur, pd.DataFrame([{'id_secteur':'42','secteur':'sans secteur'}])], ignore_index=True)
+
+    colonnes_dsec = ['id_secteur','secteur']
+    for c in colonnes_dsec:
+        if c not in df_secteur.columns:
+            df_secteur[c] = ''
+
+    # Réorganiser les colonnes de d_secteur
+    return df_secteur[colonnes_dsec]
+
+
+@instrumentation.etape('etl_entreprise')
+def principal():
+    REPERTOIRE_SORTIE.mkdir(parents=True, exist_ok=True)
+
+    # Vérifier l'existence du fichier source
+    if not fichier_entreprise.exists():
+        raise FileNotFoundError(f"Fichier source introuvable: {fichier_entreprise}")
+
+    # Lire d_entreprise.csv
+    df_entreprise = pd.read_csv(fichier_entreprise, dtype=str, encoding='utf-8', keep_default_na=False)
+    df_entreprise, nb_suppr = transformer_entreprise(df_entreprise)
+
+    # Traiter d_secteur.csv
+    df_secteur = None
+    if fichier_secteur.exists():
+        df_secteur = pd.read_csv(fichier_secteur, dtype=str, encoding='utf-8', keep_default_na=False)
+    df_secteur = transformer_secteur(df_secteur)
+
+    df_secteur.to_csv(fichier_sortie_secteur, index=False, encoding='utf-8')
+    # Sauvegarder d_entreprise.csv nettoyé
+    df_entreprise.to_csv(fichier_sortie_entreprise, index=False, encoding='utf-8')
+    instrumentation.compter_lignes(len(df_entreprise) + len(df_secteur))
+
+    # Afficher le résumé
+    print('ETL terminé.')
+    print(f'Ecrit: {fichier_sortie_entreprise}')
+    print(f'Ecrit: {fichier_sortie_secteur}')
+    print(f'Supprimé {nb_suppr} lignes qui contenaient seulement id_entreprise')
+
+
+if __name__ == '__main__':
+    principal()
@@ -4,18 +4,16 @@ import re
 import unicodedata
 import pandas as pd
 
+import instrumentation
+
 # Configuration des chemins
 RACINE = Path(__file__).resolve().parents[1]
 REPERTOIRE_ENTREE = RACINE / 'data_globale'
 REPERTOIRE_SORTIE = RACINE / 'data_globale_etl'
-REPERTOIRE_SORTIE.mkdir(parents=True, exist_ok=True)
 
 fichier_ville = REPERTOIRE_ENTREE / 'd_ville.csv'
 fichier_sortie_ville = REPERTOIRE_SORTIE / 'd_ville.csv'
 
-if not fichier_ville.exists():
-    raise FileNotFoundError(f"Fichier source introuvable: {fichier_ville}")
-
 
 def enlever_accents(s: str) -> str:
     """
@@ -122,11 +120,14 @@ def parser_ville_pays(raw: str):
         return (left, right)
     return (s, 'France')
 
-def executer():
+def transformer_ville(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Exécute le processus ETL pour nettoyer et normaliser d_ville.csv.
+    Nettoie et normalise la table d_ville (séparation ville / pays).
+    :param df: table d_ville lue en texte
+    :type df: pd.DataFrame
+    :return: table d_ville normalisée (id_ville, ville, pays)
+    :rtype: pd.DataFrame
     """
-    df = pd.read_csv(fichier_ville, dtype=str, encoding='utf-8', keep_default_na=False)
     df.columns = [c.strip() for c in df.columns]
     if 'id_ville' not in df.columns:
         if len(df.columns) >= 2:
@@ -184,9 +185,21 @@ def executer():
             country = 'France'
         lignes_sortie.append({'id_ville': vid, 'ville': city, 'pays': country or ''})
 
-    df_sortie = pd.DataFrame(lignes_sortie)
+    return pd.DataFrame(lignes_sortie)
+
+@instrumentation.etape('etl_ville')
+def executer():
+    """
+    Exécute le processus ETL pour nettoyer et normaliser d_ville.csv.
+    """
+    if not fichier_ville.exists():
+        raise FileNotFoundError(f"Fichier source introuvable: {fichier_ville}")
+    REPERTOIRE_SORTIE.mkdir(parents=True, exist_ok=True)
+    df = pd.read_csv(fichier_ville, dtype=str, encoding='utf-8', keep_default_na=False)
+    df_sortie = transformer_ville(df)
     df_sortie.to_csv(fichier_sortie_ville, index=False, encoding='utf-8')
     print('Ecriture de :', fichier_sortie_ville)
+    instrumentation.compter_lignes(len(df_sortie))
 
 # Exécuter le script ETL
 if __name__ == '__main__':
@@ -0,0 +1,329 @@
+"""
+Instrumentation des étapes du pipeline.
+
+Chaque étape (etape) et chaque fonction décorée (instrumenter) est mesurée :
+durée, nombre d'appels, octets lus, lignes produites et pic mémoire de
+l'étape (mémoire résidente relevée pendant l'étape, et non pic du processus
+depuis son démarrage : les étapes de pipeline.py, qui partagent un même
+processus, ont chacune leur propre pic ; hausse_rss_mo est la hausse de ce
+pic par rapport à la mémoire résidente à l'entrée de l'étape). Les
+mesures sont ajoutées à DATALAKE/00_METADATA/metriques.csv, à côté de
+metadata_technique.csv (une ligne par étape et une ligne par fonction appelée
+pendant l'étape).
+
+Utilisation:
+  import instrumentation                  # depuis ETL/
+  from ETL import instrumentation         # depuis la racine du dépôt
+
+  @instrumentation.instrumenter
+  def extraire_fichier_SOC(fichier_html): ...
+
+  with instrumentation.etape('curated'):  # ou @instrumentation.etape('curated')
+      ...
+      instrumentation.compter_lignes(len(df))
+
+Variables d'environnement:
+  DATALAKE_METRIQUES    chemin du CSV de métriques ('0' pour désactiver)
+  DATALAKE_PROFIL       'cprofile' ou 'pyinstrument' : profil de chaque étape écrit dans 00_METADATA/profils/
+  DATALAKE_TRACEMALLOC  '1' pour mesurer aussi le pic d'allocations Python (tracemalloc, plus lent)
+"""
+from contextlib import contextmanager
+from pathlib import Path
+import atexit
+import csv
+import functools
+import os
+import threading
+import time
+import uuid
+
+RACINE = Path(__file__).resolve().parents[1]
+DOSSIER_METADATA = RACINE / 'DATALAKE' / '00_METADATA'
+CHEMIN_METRIQUES = DOSSIER_METADATA / 'metriques.csv'
+COLONNES = ['horodatage', 'execution', 'etape', 'fonction', 'statut', 'nb_appels', 'duree_s', 'octets_lus',
+            'nb_lignes', 'lignes_par_s', 'pic_rss_mo', 'pic_tracemalloc_mo', 'hausse_rss_mo']
+
+# Période (s) des relevés de mémoire résidente pendant une étape
+PERIODE_RSS = 0.02
+
+# Identifiant commun à toutes les lignes écrites par ce processus
+EXECUTION = uuid.uuid4().hex[:12]
+
+# Mesure des octets lus d'après le premier argument d'une fonction instrumentée (chemin -> octets)
+_taille_lue = os.path.getsize
+
+_verrou = threading.Lock()
+_pile_etapes = []
+_hors_etape = {}
+
+
+def chemin_metriques():
+    """Chemin du CSV de métriques, ou None si l'instrumentation est désactivée."""
+    valeur = os.environ.get('DATALAKE_METRIQUES', '')
+    if valeur == '0':
+        return None
+    return Path(valeur) if valeur else CHEMIN_METRIQUES
+
+
+#==============================================================================
+#-- Mesures système
+#==============================================================================
+def rss_actuel_mo():
+    """Mémoire résidente actuelle du processus, en Mo (None si indisponible)."""
+    try:
+        with open('/proc/self/statm', 'r', encoding='ascii') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+class SuiviRSS(threading.Thread):
+    """
+    Relève la mémoire résidente toutes les `periode` secondes pendant une étape : pic de l'étape
+    depuis son entrée, même quand plusieurs étapes partagent le processus (ru_maxrss serait le
+    pic depuis le démarrage du processus).
+    """
+
+    def __init__(self, periode=PERIODE_RSS):
+        super().__init__(name='suivi-rss', daemon=True)
+        self.periode = periode
+        self.arret = threading.Event()
+        self.pic = self.debut = rss_actuel_mo()
+        if self.pic is not None:
+            self.start()
+
+    def run(self):
+        while not self.arret.wait(self.periode):
+            self.relever()
+
+    def relever(self):
+        rss = rss_actuel_mo()
+        if rss is not None:
+            self.pic = max(self.pic, rss)
+
+    def arreter(self):
+        """Arrête le suivi ; renvoie (pic de l'étape, hausse du pic par rapport à l'entrée) en Mo (None si indisponible)."""
+        if self.pic is None:
+            return None, None
+        self.arret.set()
+        self.join()
+        self.relever()
+        return round(self.pic, 1), round(self.pic - self.debut, 1)
+
+
+def octets_lus_processus():
+    """Octets lus par le processus (read/pread, cache disque compris), ou None si indisponible."""
+    try:
+        with open('/proc/self/io', 'r', encoding='ascii') as f:
+            for ligne in f:
+                if ligne.startswith('rchar:'):
+                    return int(ligne.split()[1])
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().io_counters().read_bytes
+    except (ImportError, AttributeError, OSError):
+        return None
+
+
+def nb_lignes(resultat):
+    """Nombre de lignes produites par une fonction : len() des DataFrames et listes, 1 pour un enregistrement (dict)."""
+    if isinstance(resultat, dict):
+        return 1
+    if isinstance(resultat, (list, tuple)) or hasattr(resultat, 'shape'):
+        return len(resultat)
+    return 0
+
+
+#==============================================================================
+#-- Compteurs par fonction
+#==============================================================================
+def _compteurs_courants():
+    return _pile_etapes[-1]['fonctions'] if _pile_etapes else _hors_etape
+
+
+def definir_taille_lue(mesure):
+    """
+    Remplace la mesure des octets lus par les fonctions instrumentées (os.path.getsize par défaut),
+    ex. pour des chemins logiques dont le fichier stocké est compressé ou archivé.
+    Args:
+        mesure (callable): chemin -> octets ; OSError ou ValueError si le chemin n'est pas un fichier lu.
+    """
+    global _taille_lue
+    _taille_lue = mesure
+
+
+def instrumenter(fonction):
+    """
+    Décorateur : compte les appels, la durée, les octets lus et les lignes produites d'une fonction.
+    Si le premier argument est un chemin de fichier existant, sa taille (voir definir_taille_lue)
+    est comptée en octets lus.
+    """
+    nom = fonction.__qualname__
+
+    @functools.wraps(fonction)
+    def enveloppe(*args, **kwargs):
+        debut = time.perf_counter()
+        resultat = fonction(*args, **kwargs)
+        duree = time.perf_counter() - debut
+        octets = 0
+        if args and isinstance(args[0], (str, Path)):
+            try:
+                octets = _taille_lue(args[0])
+            except (OSError, ValueError):
+                pass
+        with _verrou:
+            compteur = _compteurs_courants().setdefault(nom, {'nb_appels': 0, 'duree_s': 0.0, 'octets_lus': 0, 'nb_lignes': 0})
+            compteur['nb_appels'] += 1
+            compteur['duree_s'] += duree
+            compteur['octets_lus'] += octets
+            compteur['nb_lignes'] += nb_lignes(resultat)
+        return resultat
+
+    return enveloppe
+
+
+def compter_lignes(n):
+    """Ajoute n lignes produites à l'étape en cours."""
+    with _verrou:
+        if _pile_etapes:
+            _pile_etapes[-1]['nb_lignes'] += int(n)
+
+
+#==============================================================================
+#-- Profilage optionnel
+#==============================================================================
+def _demarrer_profil(nom_etape):
+    mode = os.environ.get('DATALAKE_PROFIL', '').lower()
+    if mode == 'cprofile':
+        import cProfile
+        profil = cProfile.Profile()
+        profil.enable()
+        return mode, profil
+    if mode == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print('pyinstrument non installé : profilage désactivé (pip install pyinstrument)')
+            return None
+        profil = Profiler()
+        profil.start()
+        return mode, profil
+    return None
+
+
+def _arreter_profil(profilage, nom_etape):
+    if profilage is None:
+        return
+    mode, profil = profilage
+    dossier = (chemin_metriques() or CHEMIN_METRIQUES).parent / 'profils'
+    dossier.mkdir(parents=True, exist_ok=True)
+    base = dossier / f"{nom_etape}_{time.strftime('%Y%m%d_%H%M%S')}_{EXECUTION}"
+    if mode == 'cprofile':
+        profil.disable()
+        chemin = base.with_suffix('.prof')
+        profil.dump_stats(chemin)
+    else:
+        profil.stop()
+        chemin = base.with_suffix('.html')
+        chemin.write_text(profil.output_html(), encoding='utf-8')
+    print(f'Profil de {nom_etape} écrit dans {chemin}')
+
+
+#==============================================================================
+#-- Etapes
+#==============================================================================
+@contextmanager
+def etape(nom_etape):
+    """
+    Mesure une étape du pipeline (utilisable en bloc `with` ou en décorateur).
+    A la sortie, une ligne pour l'étape et une ligne par fonction instrumentée
+    appelée pendant l'étape sont ajoutées au CSV de métriques.
+    """
+    tracer = os.environ.get('DATALAKE_TRACEMALLOC') == '1'
+    if tracer:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    mesure = {'nom': nom_etape, 'nb_lignes': 0, 'fonctions': {}}
+    with _verrou:
+        _pile_etapes.append(mesure)
+    octets_debut = octets_lus_processus()
+    suivi_rss = SuiviRSS()
+    profilage = _demarrer_profil(nom_etape)
+    debut = time.perf_counter()
+    statut = 'ok'
+    try:
+        yield mesure
+    except BaseException:
+        statut = 'erreur'
+        raise
+    finally:
+        duree = time.perf_counter() - debut
+        _arreter_profil(profilage, nom_etape)
+        octets_fin = octets_lus_processus()
+        pic_rss, hausse_rss = suivi_rss.arreter()
+        pic_tracemalloc = None
+        if tracer:
+            pic_tracemalloc = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        with _verrou:
+            _pile_etapes.remove(mesure)
+
+        lignes = [{
+            'etape': nom_etape, 'fonction': '', 'statut': statut, 'nb_appels': 1, 'duree_s': duree,
+            'octets_lus': octets_fin - octets_debut if octets_debut is not None and octets_fin is not None else '',
+            'nb_lignes': mesure['nb_lignes'], 'pic_rss_mo': pic_rss, 'hausse_rss_mo': hausse_rss,
+            'pic_tracemalloc_mo': pic_tracemalloc,
+        }]
+        for nom_fonction, compteur in sorted(mesure['fonctions'].items()):
+            lignes.append({'etape': nom_etape, 'fonction': nom_fonction, 'statut': statut, **compteur})
+        ecrire_metriques(lignes)
+
+
+def archiver_ancien_format(chemin):
+    """Renomme un CSV de métriques dont l'en-tête n'est plus COLONNES (metriques_<date>.csv) : le suivant repart d'un nouvel en-tête."""
+    if not chemin.exists():
+        return
+    with open(chemin, 'r', newline='', encoding='utf-8') as f:
+        entete = next(csv.reader(f, delimiter=';'), None)
+    if entete is not None and entete != COLONNES:
+        chemin.rename(chemin.with_name(f"{chemin.stem}_{time.strftime('%Y%m%d_%H%M%S')}{chemin.suffix}"))
+
+
+def ecrire_metriques(lignes):
+    """Ajoute des lignes de mesures au CSV de métriques (crée le fichier et son en-tête si besoin)."""
+    chemin = chemin_metriques()
+    if chemin is None or not lignes:
+        return
+    horodatage = time.strftime('%Y-%m-%d %H:%M:%S')
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    with _verrou:
+        archiver_ancien_format(chemin)
+    nouveau = not chemin.exists()
+    with _verrou, open(chemin, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=COLONNES, delimiter=';', extrasaction='ignore')
+        if nouveau:
+            writer.writeheader()
+        for ligne in lignes:
+            duree = ligne.get('duree_s') or 0
+            ligne = {**ligne, 'horodatage': horodatage, 'execution': EXECUTION,
+                     'duree_s': round(duree, 6),
+                     'lignes_par_s': round(ligne['nb_lignes'] / duree, 2) if duree > 0 and ligne.get('nb_lignes') else ''}
+            writer.writerow({c: '' if ligne.get(c) is None else ligne.get(c, '') for c in COLONNES})
+
+
+@atexit.register
+def _ecrire_hors_etape():
+    # fonctions instrumentées appelées en dehors de toute étape
+    if _hors_etape:
+        ecrire_metriques([{'etape': '', 'fonction': nom, 'statut': 'ok', **compteur}
+                          for nom, compteur in sorted(_hors_etape.items())])
+        _hors_etape.clear()
@@ -0,0 +1,189 @@
+"""
+Liaison des offres LinkedIn aux entreprises Glassdoor (d_entreprise).
+
+Une offre LinkedIn ne porte que le nom de l'entreprise (champ entreprise),
+sans taille ni secteur ; les fiches Glassdoor écrivent souvent ce nom
+autrement (« Groupe SII » / « SII », « Sopra Steria Group » / « Sopra
+Steria », accents, ponctuation, forme juridique).
+
+Les noms sont normalisés (accents, ponctuation, formes juridiques et mots
+génériques retirés), puis un index inversé mot -> entreprises sert de
+blocage : une offre n'est comparée qu'aux entreprises qui partagent au
+moins un mot avec elle (les mots présents dans plus de MAX_BLOC entreprises
+ne servent au blocage que s'ils sont les seuls). Chaque paire bloquée reçoit
+un score entre 0 et 1 :
+- 1.0 pour des noms normalisés identiques ;
+- sinon 0.6 x inclusion + 0.4 x ratio difflib des noms normalisés, où
+  l'inclusion est la part (pondérée par l'IDF des mots) du nom le plus court
+  présente dans l'autre : « Cegedim » / « CEGEDIM SRH » obtient une inclusion
+  de 1, « EOLE Consulting » / « Atos Consulting » ne partage que le mot
+  fréquent « consulting » et une inclusion faible.
+Le meilleur candidat est retenu si son score atteint SEUIL_LIAISON, ou
+SEUIL_MOT_UNIQUE quand l'un des deux noms normalisés n'a qu'un mot : son
+inclusion vaut alors 1 dès que ce mot figure dans l'autre nom (« PARIS GROUP »,
+normalisé en « paris », serait lié à « Paris Inn Group »).
+
+Chaque nom distinct n'est lié qu'une fois ; la table des liens garde, pour
+chaque offre, le meilleur candidat et son score, qu'il soit retenu ou non.
+
+Utilisation:
+  index = IndexEntreprises(d_entreprise)
+  liens = lier_offres(noms_offres, index)   # une ligne par offre
+  resume_liens(liens)                       # {'exact': n, 'approche': n, ...}
+"""
+from collections import defaultdict
+import difflib
+import math
+import re
+import unicodedata
+import pandas as pd
+
+SEUIL_LIAISON = 0.7
+SEUIL_MOT_UNIQUE = 0.9
+POIDS_INCLUSION = 0.6
+MAX_BLOC = 50
+
+# Formes juridiques et mots qui ne distinguent pas deux entreprises
+FORMES_JURIDIQUES = {'sa', 'sas', 'sasu', 'sarl', 'eurl', 'sci', 'snc', 'sca', 'scop', 'gie', 'gmbh', 'ag', 'kg',
+                     'ltd', 'limited', 'inc', 'incorporated', 'llc', 'llp', 'plc', 'corp', 'corporation', 'co',
+                     'cie', 'bv', 'nv', 'spa', 'srl', 'pty', 'as'}
+# 'france' : filiale française (« Manpower France », « Fujitsu France »)
+MOTS_GENERIQUES = {'groupe', 'group', 'holding', 'the', 'et', 'and', 'de', 'du', 'des', 'en', 'la', 'le', 'les', 'l',
+                   'd', 'fr', 'com', 'france'}
+MOTIF_PONCTUATION = re.compile(r'[^0-9a-z]+')
+
+COLONNES_LIENS = ['id_offre', 'id_entreprise', 'entreprise_offre', 'nom_entreprise', 'score', 'methode']
+# Méthodes de liaison, dans l'ordre d'affichage ('nom_taille' : nom et taille identiques dans les métadonnées)
+METHODES = ['nom_taille', 'exact', 'approche', 'sous_seuil', 'aucun']
+
+
+def normaliser_nom_entreprise(nom):
+    """
+    Nom d'entreprise comparable : minuscules, sans accents ni ponctuation, sans forme juridique
+    ni mot générique (gardés si le nom ne contient rien d'autre).
+    Args:
+        nom (str): Nom tel qu'il apparaît dans la page.
+    Returns:
+        str: Mots du nom normalisé séparés par une espace ('' si le nom est vide).
+    """
+    if nom is None or (not isinstance(nom, str) and pd.isna(nom)):
+        return ''
+    texte = unicodedata.normalize('NFKD', str(nom).replace('&', ' et '))
+    texte = ''.join(c for c in texte if not unicodedata.combining(c)).lower()
+    mots = MOTIF_PONCTUATION.sub(' ', texte).split()
+    distinctifs = [m for m in mots if m not in FORMES_JURIDIQUES and m not in MOTS_GENERIQUES]
+    return ' '.join(distinctifs or mots)
+
+
+class IndexEntreprises:
+    """Index inversé mot normalisé -> entreprises de d_entreprise, pour le blocage des candidats."""
+
+    def __init__(self, d_entreprise, max_bloc=MAX_BLOC):
+        self.max_bloc = max_bloc
+        self.ids = []
+        self.noms = []
+        self.normes = []
+        self.par_nom_normalise = {}     # nom normalisé -> position de la première entreprise
+        self.index = defaultdict(list)  # mot -> positions des entreprises qui le contiennent
+        for id_entreprise, nom in d_entreprise[['id_entreprise', 'nom_entreprise']].itertuples(index=False, name=None):
+            norme = normaliser_nom_entreprise(nom)
+            if not norme:
+                continue
+            position = len(self.ids)
+            self.ids.append(id_entreprise)
+            self.noms.append(nom)
+            self.normes.append(norme)
+            self.par_nom_normalise.setdefault(norme, position)
+            for mot in set(norme.split()):
+                self.index[mot].append(position)
+        nb = max(len(self.ids), 1)
+        self.idf = {mot: math.log(1 + nb / len(positions)) for mot, positions in self.index.items()}
+        # un mot absent de toutes les entreprises est le plus discriminant
+        self.idf_inconnu = math.log(1 + nb)
+
+    def candidats(self, mots):
+        """Positions des entreprises qui partagent un mot discriminant (au plus max_bloc entreprises par mot)."""
+        connus = [m for m in mots if m in self.index]
+        if not connus:
+            return set()
+        discriminants = [m for m in connus if len(self.index[m]) <= self.max_bloc]
+        if not discriminants:
+            discriminants = [min(connus, key=lambda m: len(self.index[m]))]
+        return {position for m in discriminants for position in self.index[m]}
+
+    def score(self, norme, mots, position):
+        """
+        Score d'une paire bloquée : inclusion pondérée par l'IDF (part du poids du nom le plus court
+        présente dans l'autre) et ratio difflib des noms normalisés, pondérés par POIDS_INCLUSION.
+        """
+        mots_candidat = set(self.normes[position].split())
+        poids = lambda ensemble: sum(self.idf.get(m, self.idf_inconnu) for m in ensemble)
+        plus_court = min(poids(mots), poids(mots_candidat))
+        inclusion = poids(mots & mots_candidat) / plus_court if plus_court else 0.0
+        ratio = difflib.SequenceMatcher(None, norme, self.normes[position]).ratio()
+        return POIDS_INCLUSION * inclusion + (1 - POIDS_INCLUSION) * ratio
+
+    def mot_unique(self, nom, position):
+        """Vrai si le nom ou celui de l'entreprise candidate n'a qu'un mot une fois normalisé."""
+        return min(len(normaliser_nom_entreprise(nom).split()), len(self.normes[position].split())) == 1
+
+    def lier(self, nom):
+        """
+        Meilleure entreprise pour un nom.
+        Returns:
+            tuple: (position ou None, score, methode) ; methode vaut 'exact' (noms normalisés identiques),
+            'approche' (meilleur candidat bloqué) ou 'aucun'.
+        """
+        norme = normaliser_nom_entreprise(nom)
+        if not norme:
+            return None, 0.0, 'aucun'
+        if norme in self.par_nom_normalise:
+            return self.par_nom_normalise[norme], 1.0, 'exact'
+        mots = set(norme.split())
+        meilleure, meilleur_score = None, 0.0
+        # ordre des positions : à score égal, l'entreprise la plus ancienne
+        for position in sorted(self.candidats(mots)):
+            score = self.score(norme, mots, position)
+            if score > meilleur_score:
+                meilleure, meilleur_score = position, score
+        if meilleure is None:
+            return None, 0.0, 'aucun'
+        return meilleure, round(meilleur_score, 4), 'approche'
+
+
+def lier_offres(noms_offres, index, seuil=SEUIL_LIAISON, seuil_mot_unique=SEUIL_MOT_UNIQUE):
+    """
+    Lie chaque offre à une entreprise ; chaque nom distinct n'est lié qu'une fois.
+    Args:
+        noms_offres (list): Nom de l'entreprise de chaque offre (None si absent).
+        index (IndexEntreprises): Index des entreprises.
+        seuil (float): Score minimal pour retenir le lien.
+        seuil_mot_unique (float): Score minimal quand l'un des deux noms normalisés n'a qu'un mot.
+    Returns:
+        pd.DataFrame: Une ligne par offre (id_entreprise retenu ou NA, entreprise_offre, meilleur
+        candidat nom_entreprise, score, methode ; methode 'sous_seuil' si le candidat n'est pas retenu).
+    """
+    resultats = {}
+    lignes = []
+    for nom in noms_offres:
+        cle = None if nom is None or (not isinstance(nom, str) and pd.isna(nom)) else str(nom)
+        if cle not in resultats:
+            position, score, methode = index.lier(cle)
+            seuil_nom = seuil_mot_unique if position is not None and index.mot_unique(cle, position) else seuil
+            resultats[cle] = position, score, methode, methode == 'exact' or score >= seuil_nom
+        position, score, methode, retenu = resultats[cle]
+        retenu = position is not None and retenu
+        lignes.append({
+            'id_entreprise': index.ids[position] if retenu else pd.NA,
+            'entreprise_offre': cle,
+            'nom_entreprise': index.noms[position] if position is not None else None,
+            'score': score,
+            'methode': methode if retenu or position is None else 'sous_seuil',
+        })
+    return pd.DataFrame(lignes, columns=COLONNES_LIENS[1:])
+
+
+def resume_liens(liens):
+    """Nombre d'offres par méthode de liaison ({'exact': n, ...}, dans l'ordre de METHODES)."""
+    comptes = liens['methode'].value_counts() if 'methode' in liens.columns else pd.Series(dtype=int)
+    return {methode: int(comptes.get(methode, 0)) for methode in METHODES}
@@ -0,0 +1,233 @@
+"""
+Tables de faits partitionnées par mois de publication (disposition Hive).
+
+F_offres et F_avis sont écrites en un dossier par table, découpé selon le
+mois de la date de publication (date_posted / date_publication) :
+
+  F_avis/annee=2020/mois=03/part-0.parquet
+  F_avis/annee=__HIVE_DEFAULT_PARTITION__/mois=__HIVE_DEFAULT_PARTITION__/part-0.parquet   (date absente)
+
+Les colonnes annee et mois ne sont portées que par les noms de dossiers
+(lecture directe possible par pyarrow, DuckDB, Spark ou Power BI).
+
+Le fichier _empreintes.json du dossier de la table conserve l'empreinte du
+contenu de chaque partition : une nouvelle écriture ne réécrit que les
+partitions dont le contenu a changé et supprime celles qui ont disparu.
+A la lecture, les partitions hors de la période demandée (depuis / jusqu_a,
+au mois près) ne sont pas ouvertes.
+
+Utilisation:
+  ecrire_table_partitionnee(df_avis, dossier / 'F_avis', 'date_publication')
+  df = lire_table_partitionnee(dossier / 'F_avis', depuis='2019-06')
+"""
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import shutil
+import pandas as pd
+
+# Table de faits -> colonne de date de partitionnement
+COLONNES_PARTITION = {'F_offres': 'date_posted', 'F_avis': 'date_publication'}
+
+PARTITION_DEFAUT = '__HIVE_DEFAULT_PARTITION__'
+NOM_EMPREINTES = '_empreintes.json'
+NOM_FICHIER = 'part-0.parquet'
+
+MOTIF_ISO = re.compile(r'^\s*(\d{4})-(\d{2})')
+MOTIF_JJMMAAAA = re.compile(r'^\s*\d{1,2}/(\d{1,2})/(\d{4})')
+MOTIF_PERIODE = re.compile(r'^(\d{4})(?:-(\d{1,2}))?')
+
+
+def colonne_partition(nom_table):
+    """Colonne de date de partitionnement d'une table (F_avis_updated -> date_publication), None sinon."""
+    return COLONNES_PARTITION.get(re.sub(r'_updated$', '', nom_table))
+
+
+#==============================================================================
+#-- Clés de partition
+#==============================================================================
+def mois_publication(dates):
+    """
+    Année et mois ('2020', '03') de chaque date, dans les formats rencontrés le long du pipeline :
+    aaaa-mm-jj[Thh:mm...], jj/mm/aaaa, 'Jul 26, 2019'. Une date absente ou illisible donne
+    la partition par défaut.
+    Args:
+        dates (pd.Series): Dates en texte.
+    Returns:
+        tuple: (pd.Series annee, pd.Series mois)
+    """
+    texte = dates.astype(object).where(dates.notna(), '').astype(str)
+    annee = pd.Series(PARTITION_DEFAUT, index=dates.index, dtype=object)
+    mois = pd.Series(PARTITION_DEFAUT, index=dates.index, dtype=object)
+
+    iso = texte.str.extract(MOTIF_ISO)
+    masque = iso[0].notna()
+    annee[masque], mois[masque] = iso.loc[masque, 0], iso.loc[masque, 1]
+
+    jjmmaaaa = texte.str.extract(MOTIF_JJMMAAAA)
+    masque = jjmmaaaa[0].notna() & ~masque
+    annee[masque], mois[masque] = jjmmaaaa.loc[masque, 1], jjmmaaaa.loc[masque, 0].str.zfill(2)
+
+    # autres formats (dates Glassdoor non nettoyées) : analyse générique des seules valeurs restantes
+    restantes = (annee == PARTITION_DEFAUT) & ~texte.str.strip().isin(['', 'NULL'])
+    if restantes.any():
+        converties = pd.to_datetime(texte[restantes], errors='coerce', format='mixed')
+        lisibles = converties.notna()
+        index = converties.index[lisibles]
+        annee[index] = converties[lisibles].dt.strftime('%Y')
+        mois[index] = converties[lisibles].dt.strftime('%m')
+    return annee, mois
+
+
+def borne_periode(valeur):
+    """'2019', '2019-06' ou '2019-06-15' -> (2019, 6) ; le mois vaut None pour une année seule."""
+    if valeur is None:
+        return None
+    correspondance = MOTIF_PERIODE.match(str(valeur).strip())
+    if not correspondance:
+        raise ValueError(f'Période invalide (attendu AAAA ou AAAA-MM): {valeur}')
+    annee, mois = correspondance.groups()
+    return int(annee), int(mois) if mois else None
+
+
+def dans_periode(annee, mois, depuis=None, jusqu_a=None):
+    """Vrai si la partition (annee, mois) recoupe la période ; la partition par défaut n'est gardée que sans période."""
+    if depuis is None and jusqu_a is None:
+        return True
+    if PARTITION_DEFAUT in (annee, mois):
+        return False
+    cle = (int(annee), int(mois))
+    if depuis is not None and cle < (depuis[0], depuis[1] or 1):
+        return False
+    if jusqu_a is not None and cle > (jusqu_a[0], jusqu_a[1] or 12):
+        return False
+    return True
+
+
+#==============================================================================
+#-- Ecriture
+#==============================================================================
+def empreinte_partition(df):
+    """Empreinte du contenu d'une partition (colonnes et valeurs, dans l'ordre des lignes)."""
+    h = hashlib.sha256(json.dumps(list(map(str, df.columns)), ensure_ascii=False).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def _lire_empreintes(dossier):
+    chemin = dossier / NOM_EMPREINTES
+    if not chemin.exists():
+        return {}
+    try:
+        with open(chemin, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except ValueError:
+        # fichier tronqué : toutes les partitions seront réécrites
+        return {}
+
+
+def _ecrire_empreintes(dossier, empreintes):
+    chemin = dossier / NOM_EMPREINTES
+    chemin_tmp = chemin.with_name(chemin.name + '.tmp')
+    with open(chemin_tmp, 'w', encoding='utf-8') as f:
+        json.dump(dict(sorted(empreintes.items())), f, indent=1)
+    os.replace(chemin_tmp, chemin)
+
+
+def ecrire_table_partitionnee(df, dossier, colonne_date):
+    """
+    Ecrit une table de faits en Parquet partitionné par année et mois de colonne_date.
+    Seules les partitions nouvelles ou modifiées sont réécrites (fichier temporaire puis
+    os.replace) ; les partitions qui n'ont plus de lignes sont supprimées.
+    Args:
+        df (pd.DataFrame): Table à écrire (les colonnes annee / mois sont calculées, non stockées).
+        dossier (Path): Dossier de la table (ex. BDD/F_avis).
+        colonne_date (str): Colonne de date de publication.
+    Returns:
+        dict: Nombre de partitions 'ecrites', 'inchangees' et 'supprimees'.
+    """
+    dossier = Path(dossier)
+    dossier.mkdir(parents=True, exist_ok=True)
+    precedentes = _lire_empreintes(dossier)
+    # partitions présentes sur disque mais absentes du fichier d'empreintes (écriture interrompue)
+    for chemin in dossier.glob(f'annee=*/mois=*/{NOM_FICHIER}'):
+        precedentes.setdefault(str(chemin.parent.relative_to(dossier).as_posix()), None)
+
+    annee, mois = mois_publication(df[colonne_date])
+    empreintes = {}
+    statistiques = {'ecrites': 0, 'inchangees': 0, 'supprimees': 0}
+    for (a, m), partition in df.groupby([annee, mois], sort=True):
+        nom = f'annee={a}/mois={m}'
+        partition = partition.reset_index(drop=True)
+        empreinte = empreinte_partition(partition)
+        empreintes[nom] = empreinte
+        if precedentes.get(nom) == empreinte and (dossier / nom / NOM_FICHIER).exists():
+            statistiques['inchangees'] += 1
+            continue
+        (dossier / nom).mkdir(parents=True, exist_ok=True)
+        chemin = dossier / nom / NOM_FICHIER
+        chemin_tmp = chemin.with_name(chemin.name + '.tmp')
+        partition.to_parquet(chemin_tmp, index=False)
+        os.replace(chemin_tmp, chemin)
+        statistiques['ecrites'] += 1
+
+    for nom in set(precedentes) - set(empreintes):
+        shutil.rmtree(dossier / nom, ignore_errors=True)
+        dossier_annee = (dossier / nom).parent
+        if dossier_annee.exists() and not any(dossier_annee.iterdir()):
+            dossier_annee.rmdir()
+        statistiques['supprimees'] += 1
+
+    _ecrire_empreintes(dossier, empreintes)
+    return statistiques
+
+
+def est_table_partitionnee(dossier):
+    """Vrai si le dossier contient une table écrite par ecrire_table_partitionnee."""
+    dossier = Path(dossier)
+    return dossier.is_dir() and ((dossier / NOM_EMPREINTES).exists() or any(dossier.glob('annee=*')))
+
+
+def supprimer_table_partitionnee(dossier):
+    """Supprime le dossier d'une table partitionnée (rien si le dossier n'en est pas une)."""
+    if est_table_partitionnee(dossier):
+        shutil.rmtree(dossier)
+        return True
+    return False
+
+
+#==============================================================================
+#-- Lecture
+#==============================================================================
+def lister_partitions(dossier, depuis=None, jusqu_a=None):
+    """
+    Fichiers des partitions qui recoupent la période, triés par (annee, mois).
+    Args:
+        dossier (Path): Dossier de la table.
+        depuis (str | None): Premier mois gardé ('AAAA' ou 'AAAA-MM').
+        jusqu_a (str | None): Dernier mois gardé ('AAAA' ou 'AAAA-MM').
+    Returns:
+        list: Chemins des fichiers Parquet.
+    """
+    depuis, jusqu_a = borne_periode(depuis), borne_periode(jusqu_a)
+    fichiers = []
+    for chemin in sorted(Path(dossier).glob(f'annee=*/mois=*/{NOM_FICHIER}')):
+        annee = chemin.parent.parent.name.split('=', 1)[1]
+        mois = chemin.parent.name.split('=', 1)[1]
+        if dans_periode(annee, mois, depuis, jusqu_a):
+            fichiers.append(chemin)
+    return fichiers
+
+
+def lire_table_partitionnee(dossier, depuis=None, jusqu_a=None, colonnes=None):
+    """
+    Lit une table partitionnée en n'ouvrant que les partitions de la période.
+    Returns:
+        pd.DataFrame: Lignes des partitions gardées (DataFrame vide si aucune).
+    """
+    lots = [pd.read_parquet(chemin, columns=colonnes) for chemin in lister_partitions(dossier, depuis, jusqu_a)]
+    if not lots:
+        return pd.DataFrame(columns=colonnes)
+    return pd.concat(lots, ignore_index=True)
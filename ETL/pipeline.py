@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Orchestrateur du pipeline ETL en un seul processus.
+
+Enchaîne les étapes generate_data_globale -> etl_avis -> clean_f_avis ->
+etl_entreprise -> etl_ville -> etl_f_offres -> doublons_offres -> dédoublonnage
+des entreprises (trouver_entreprises_proches / remplacer_ids_entreprises) en gardant les
+DataFrames en mémoire entre les étapes. Les tables ne sont écrites sur disque
+(CSV ou Parquet) qu'aux points de contrôle demandés et à la fin du pipeline.
+Avec --format parquet_partitionne, F_offres et F_avis sont écrites en Parquet
+partitionné par mois de publication (voir partitionnement.py) : seules les
+partitions modifiées sont réécrites. Les fichiers Parquet portent les types
+déclarés dans schema_tables.py (entiers nullables, catégories, dates) ;
+--rapport-memoire affiche la mémoire des tables finales en texte et typées.
+
+Usage:
+  python ETL/pipeline.py
+  python ETL/pipeline.py --checkpoint generate_data_globale --format parquet
+  python ETL/pipeline.py --format parquet_partitionne
+
+Chaque script reste utilisable seul ; ce module n'appelle que leurs fonctions
+de transformation.
+"""
+from pathlib import Path
+import argparse
+import time
+import pandas as pd
+
+import generate_data_globale
+import etl_avis
+import clean_f_avis
+import etl_entreprise
+import etl_ville
+import etl_f_offres
+import doublons_offres
+import remplacer_ids_entreprises
+import instrumentation
+from partitionnement import colonne_partition, ecrire_table_partitionnee, supprimer_table_partitionnee
+from schema_tables import rapport_memoire, typer_table
+from registre_cles import RegistreCles
+
+# Configuration des chemins
+RACINE = Path(__file__).resolve().parents[1]
+DOSSIER_DATA_GLOBALE = RACINE / 'data_globale'
+DOSSIER_DATA_GLOBALE_ETL = RACINE / 'data_globale_etl'
+
+# Etapes dans l'ordre d'exécution
+ETAPES = ['generate_data_globale', 'etl_avis', 'clean_f_avis', 'etl_entreprise', 'etl_ville', 'etl_f_offres',
+          'doublons_offres', 'dedup_entreprises']
+
+
+def en_texte(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convertit un DataFrame dans la forme obtenue par read_csv(dtype=str, keep_default_na=False)
+    sur sa sortie to_csv : toutes les valeurs en str, valeurs manquantes -> ''.
+    Les scripts ETL attendent cette forme.
+    """
+    return df.astype(object).where(df.notna(), '').astype(str)
+
+
+#==============================================================================
+#-- Etapes : chacune lit et remplace des tables dans le dictionnaire `tables`
+#==============================================================================
+def etape_generate_data_globale(tables, options):
+    df_meta = generate_data_globale.lire_metadata(options['meta'])
+    # identifiants stables d'une exécution à l'autre (registre des clés de la production zone)
+    with RegistreCles() as registre:
+        generees = generate_data_globale.generer_tables(df_meta, generate_data_globale.lire_avis(options['meta']), registre)
+    for nom, df in generees.items():
+        tables[nom] = en_texte(df)
+    # tables du schéma et table des liens offre -> entreprise
+    return {nom: DOSSIER_DATA_GLOBALE for nom in generees}
+
+
+def etape_etl_avis(tables, options):
+    df_nettoye, colonne_contenu, nb_vides = etl_avis.filtrer_avis(tables['F_avis'])
+    if colonne_contenu is None:
+        print('Aucune colonne de contenu trouvée dans F_avis. Aucune ligne supprimée.')
+    else:
+        print(f'Lignes supprimées avec "{colonne_contenu}" vide: {nb_vides}')
+    tables['F_avis'] = df_nettoye
+    return {'F_avis': DOSSIER_DATA_GLOBALE_ETL}
+
+
+def etape_clean_f_avis(tables, options):
+    tables['F_avis'] = clean_f_avis.nettoyer_avis(tables['F_avis'])
+    return {'F_avis': DOSSIER_DATA_GLOBALE_ETL}
+
+
+def etape_etl_entreprise(tables, options):
+    tables['d_entreprise'], nb_suppr = etl_entreprise.transformer_entreprise(tables['d_entreprise'])
+    tables['d_secteur'] = etl_entreprise.transformer_secteur(tables.get('d_secteur'))
+    print(f'Supprimé {nb_suppr} lignes qui contenaient seulement id_entreprise')
+    return {'d_entreprise': DOSSIER_DATA_GLOBALE_ETL, 'd_secteur': DOSSIER_DATA_GLOBALE_ETL}
+
+
+def etape_etl_ville(tables, options):
+    tables['d_ville'] = etl_ville.transformer_ville(tables['d_ville'])
+    return {'d_ville': DOSSIER_DATA_GLOBALE_ETL}
+
+
+def etape_etl_f_offres(tables, options):
+    tables['F_offres'] = etl_f_offres.nettoyer_offres(tables['F_offres'])
+    return {'F_offres': DOSSIER_DATA_GLOBALE_ETL}
+
+
+def etape_doublons_offres(tables, options):
+    doublons = doublons_offres.detecter_doublons(tables['F_offres'], seuil=options['seuil_doublons'])
+    print(f"Offres distinctes (seuil {options['seuil_doublons']}): {doublons['id_offre_canonique'].nunique()} "
+          f"sur {len(doublons)}")
+    tables['doublons_offres'] = doublons
+    return {'doublons_offres': DOSSIER_DATA_GLOBALE_ETL}
+
+
+def etape_dedup_entreprises(tables, options):
+    # d_entreprise est passé en texte, comme s'il était relu depuis data_globale_etl
+    df_ent = remplacer_ids_entreprises.preparer_entreprises(en_texte(tables['d_entreprise']))
+    mapping, df_ent = remplacer_ids_entreprises.construire_mapping_depuis_df(df_ent, seuil=options['seuil'])
+    if mapping:
+        print(f'Mapping trouvé: {len(mapping)} ids supprimés → id gardé')
+    else:
+        # comme le script : tables *_updated produites sans remplacement
+        print('Aucun mapping trouvé (pas de paires similaires). Tables écrites sans remplacement.')
+
+    tables['d_entreprise_deduplique'] = df_ent[~df_ent['id_entreprise'].astype(str).isin(mapping)].reset_index(drop=True)
+    suffixe = '' if options['inplace'] else '_updated'
+    sorties = {'d_entreprise_deduplique': DOSSIER_DATA_GLOBALE_ETL}
+    for nom in ['F_avis', 'F_offres']:
+        if 'id_entreprise' not in tables[nom].columns:
+            continue
+        df, remplacements = remplacer_ids_entreprises.appliquer_mapping(tables[nom].copy(), 'id_entreprise', mapping)
+        print(f'{nom}: remplacements appliqués: {remplacements}')
+        tables[nom + suffixe] = df
+        sorties[nom + suffixe] = DOSSIER_DATA_GLOBALE_ETL
+    return sorties
+
+
+FONCTIONS_ETAPES = {
+    'generate_data_globale': etape_generate_data_globale,
+    'etl_avis': etape_etl_avis,
+    'clean_f_avis': etape_clean_f_avis,
+    'etl_entreprise': etape_etl_entreprise,
+    'etl_ville': etape_etl_ville,
+    'etl_f_offres': etape_etl_f_offres,
+    'doublons_offres': etape_doublons_offres,
+    'dedup_entreprises': etape_dedup_entreprises,
+}
+
+
+#==============================================================================
+#-- Matérialisation
+#==============================================================================
+def ecrire_table(df: pd.DataFrame, dossier: Path, nom: str, format_sortie: str = 'csv') -> Path:
+    """
+    Ecrit une table en CSV (même format que les scripts), en Parquet, ou en Parquet partitionné
+    par mois de publication pour les tables de faits (format parquet_partitionne ; les
+    dimensions sont alors écrites en Parquet simple). Le Parquet est écrit avec les types déclarés.
+    Les autres dispositions de la table (dossier partitionné, fichier CSV ou Parquet) sont supprimées :
+    un lecteur comme charger_entrepot ne lit pas une version périmée.
+    """
+    dossier.mkdir(parents=True, exist_ok=True)
+    if format_sortie != 'csv':
+        df = typer_table(df, nom)
+    colonne_date = colonne_partition(nom)
+    if format_sortie == 'parquet_partitionne' and colonne_date in df.columns:
+        chemin = dossier / nom
+        s = ecrire_table_partitionnee(df, chemin, colonne_date)
+        for autre in (dossier / f'{nom}.csv', dossier / f'{nom}.parquet'):
+            autre.unlink(missing_ok=True)
+        print(f"[pipeline] {nom}: partitions écrites={s['ecrites']} inchangées={s['inchangees']} supprimées={s['supprimees']}")
+    elif format_sortie in ('parquet', 'parquet_partitionne'):
+        chemin = dossier / f'{nom}.parquet'
+        df.to_parquet(chemin, index=False)
+        (dossier / f'{nom}.csv').unlink(missing_ok=True)
+    else:
+        chemin = dossier / f'{nom}.csv'
+        df.to_csv(chemin, index=False, encoding='utf-8')
+        (dossier / f'{nom}.parquet').unlink(missing_ok=True)
+    if chemin != dossier / nom and supprimer_table_partitionnee(dossier / nom):
+        print(f'[pipeline] {nom}: dossier partitionné précédent supprimé')
+    return chemin
+
+
+def executer_pipeline(checkpoints=(), format_sortie='csv', seuil=0.85, inplace=False,
+                      meta=generate_data_globale.CHEMIN_META, ecrire_final=True, afficher_memoire=False,
+                      seuil_doublons=doublons_offres.SEUIL_DOUBLON):
+    """
+    Exécute toutes les étapes en mémoire.
+    Args:
+        checkpoints (iterable): Etapes dont les sorties sont écrites dès la fin de l'étape.
+        format_sortie (str): 'csv', 'parquet' ou 'parquet_partitionne'.
+        seuil (float): Seuil de similarité pour le dédoublonnage des entreprises.
+        inplace (bool): Comme remplacer_ids_entreprises --inplace (sinon écrit *_updated).
+        meta (Path): Chemin du fichier metadata_descriptives.csv.
+        ecrire_final (bool): Ecrire la dernière version de chaque table à la fin.
+        afficher_memoire (bool): Afficher la mémoire des tables finales, en texte et avec les types déclarés.
+        seuil_doublons (float): Similarité de Jaccard minimale entre deux offres quasi identiques.
+    Returns:
+        tuple: (tables en mémoire, liste des durées (etape, secondes, nb_lignes))
+    """
+    options = {'seuil': seuil, 'inplace': inplace, 'meta': Path(meta), 'seuil_doublons': seuil_doublons}
+    tables = {}
+    derniere_sortie = {}
+    durees = []
+    debut_total = time.perf_counter()
+
+    for etape in ETAPES:
+        print(f'[pipeline] Etape {etape}...')
+        debut = time.perf_counter()
+        with instrumentation.etape(etape):
+            sorties = FONCTIONS_ETAPES[etape](tables, options)
+            nb_lignes = sum(len(tables[nom]) for nom in sorties)
+            instrumentation.compter_lignes(nb_lignes)
+        duree = time.perf_counter() - debut
+        durees.append((etape, duree, nb_lignes))
+        print(f'[pipeline] {etape} terminé en {duree:.2f}s ({nb_lignes} lignes produites)')
+
+        derniere_sortie.update(sorties)
+        if etape in checkpoints:
+            for nom, dossier in sorties.items():
+                chemin = ecrire_table(tables[nom], dossier, nom, format_sortie)
+                print(f'[pipeline] Point de contrôle: {chemin}')
+
+    if ecrire_final:
+        debut = time.perf_counter()
+        for nom, dossier in derniere_sortie.items():
+            # les tables brutes de data_globale ne sont écrites que sur point de contrôle
+            if dossier == DOSSIER_DATA_GLOBALE:
+                continue
+            chemin = ecrire_table(tables[nom], dossier, nom, format_sortie)
+            print(f'Ecrit: {chemin}')
+        durees.append(('ecriture_finale', time.perf_counter() - debut, 0))
+
+    if afficher_memoire:
+        rapport_memoire({nom: tables[nom] for nom in derniere_sortie})
+
+    print('[pipeline] Durées par étape:')
+    for etape, duree, nb_lignes in durees:
+        print(f'  - {etape:<24} {duree:8.2f}s')
+    print(f'[pipeline] Terminé en {time.perf_counter() - debut_total:.2f}s')
+    return tables, durees
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exécuter le pipeline ETL en mémoire (un seul processus)')
+    parser.add_argument('--checkpoint', action='append', default=[], choices=ETAPES,
+                        help='Etape dont les sorties sont écrites sur disque (répétable)')
+    parser.add_argument('--format', type=str, default='csv', choices=['csv', 'parquet', 'parquet_partitionne'],
+                        help='Format des fichiers écrits (parquet_partitionne : faits partitionnés par mois)')
+    parser.add_argument('--seuil', type=float, default=0.85, help='Seuil de similarité (0-1) pour le dédoublonnage')
+    parser.add_argument('--seuil-doublons', type=float, default=doublons_offres.SEUIL_DOUBLON,
+                        help='Similarité (0-1) des offres quasi identiques (MinHash)')
+    parser.add_argument('--inplace', action='store_true', help='Écraser F_avis/F_offres au lieu d\'écrire *_updated')
+    parser.add_argument('--meta', type=str, default=str(generate_data_globale.CHEMIN_META), help='Chemin vers metadata_descriptives.csv')
+    parser.add_argument('--rapport-memoire', action='store_true', help='Afficher la mémoire des tables finales (texte / typées)')
+    args = parser.parse_args()
+
+    executer_pipeline(checkpoints=args.checkpoint, format_sortie=args.format, seuil=args.seuil,
+                      inplace=args.inplace, meta=args.meta, afficher_memoire=args.rapport_memoire,
+                      seuil_doublons=args.seuil_doublons)
+
+
+if __name__ == '__main__':
+    main()
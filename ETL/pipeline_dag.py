@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Exécution du pipeline complet sous forme de graphe de dépendances (DAG).
+
+Chaque étape déclare ses fichiers d'entrée et de sortie. Avant d'exécuter une
+étape, on calcule une empreinte (sha256) de ses entrées et de son code (le
+script, les modules du dépôt qu'il importe, directement ou non, et la liste
+'code' de l'étape pour les chargements dynamiques) ; si cette empreinte est identique à celle de la dernière exécution réussie et que
+toutes les sorties existent, l'étape est sautée. Les étapes indépendantes
+(par exemple etl_ville et etl_entreprise) sont exécutées en parallèle.
+
+L'état (empreintes des étapes et cache des hash de fichiers, indexé par taille
+et date de modification) est conservé dans DATALAKE/00_METADATA/etat_dag.json,
+ce qui permet une relance sans changement en quelques secondes.
+
+Usage:
+  python ETL/pipeline_dag.py
+  python ETL/pipeline_dag.py --jobs 4 --force etl_ville
+  python ETL/pipeline_dag.py --liste
+
+clean_f_offres.py (doublon de etl_f_offres.py) et clean_text.py ne font pas
+partie du graphe.
+"""
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import argparse
+import ast
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Configuration des chemins
+RACINE = Path(__file__).resolve().parents[1]
+CHEMIN_ETAT = RACINE / 'DATALAKE' / '00_METADATA' / 'etat_dag.json'
+
+# Déclaration des étapes, dans l'ordre du pipeline.
+# Les chemins sont relatifs à la racine du dépôt ; les entrées acceptent les motifs glob.
+ETAPES_DAG = [
+    {'nom': 'ingestion_landing', 'script': 'ingestion_data_landing_zone.py',
+     'entrees': ['DATALAKE/0_SOURCE_WEB/*.html'],
+     'sorties': ['DATALAKE/00_METADATA/metadata_technique.csv', 'DATALAKE/1_LANDING_ZONE']},
+    {'nom': 'extraction_curated', 'script': 'ingestion_data_curated_zone.py',
+     # pages en clair, compressées ou regroupées en archives de crawl (stockage_pages.py)
+     'entrees': ['DATALAKE/00_METADATA/metadata_technique.csv', 'DATALAKE/1_LANDING_ZONE/*/*/*.html',
+                 'DATALAKE/1_LANDING_ZONE/*/*/*.html.gz', 'DATALAKE/1_LANDING_ZONE/*/*/*.html.zst',
+                 'DATALAKE/1_LANDING_ZONE/*/*/*.pages', 'DATALAKE/1_LANDING_ZONE/*/*/*.pages.gz',
+                 'DATALAKE/1_LANDING_ZONE/*/*/*.pages.zst', 'DATALAKE/1_LANDING_ZONE/*/*/*.index.json'],
+     'sorties': ['DATALAKE/00_METADATA/metadata_descriptives.csv', 'DATALAKE/00_METADATA/metadata.sqlite',
+                 'DATALAKE/2_CURATED_ZONE/avis.csv']},
+    # la base metadata.sqlite est lue avant le CSV ; le texte des avis n'est que dans avis.csv
+    {'nom': 'generate_data_globale', 'script': 'ETL/generate_data_globale.py',
+     'entrees': ['DATALAKE/00_METADATA/metadata_descriptives.csv', 'DATALAKE/00_METADATA/metadata.sqlite',
+                 'DATALAKE/2_CURATED_ZONE/avis.csv'],
+     'sorties': ['data_globale/d_ville.csv', 'data_globale/d_secteur.csv', 'data_globale/d_entreprise.csv',
+                 'data_globale/d_type_poste.csv', 'data_globale/d_note.csv', 'data_globale/F_offres.csv',
+                 'data_globale/F_avis.csv', 'data_globale/liens_offres_entreprises.csv']},
+    {'nom': 'etl_avis', 'script': 'ETL/etl_avis.py',
+     'entrees': ['data_globale/F_avis.csv'],
+     'sorties': ['data_globale_etl/F_avis.csv']},
+    # clean_f_avis modifie data_globale_etl/F_avis.csv sur place
+    {'nom': 'clean_f_avis', 'script': 'ETL/clean_f_avis.py',
+     'entrees': ['data_globale_etl/F_avis.csv'],
+     'sorties': ['data_globale_etl/F_avis.csv']},
+    {'nom': 'etl_entreprise', 'script': 'ETL/etl_entreprise.py',
+     'entrees': ['data_globale/d_entreprise.csv', 'data_globale/d_secteur.csv'],
+     'sorties': ['data_globale_etl/d_entreprise.csv', 'data_globale_etl/d_secteur.csv']},
+    {'nom': 'etl_ville', 'script': 'ETL/etl_ville.py',
+     'entrees': ['data_globale/d_ville.csv'],
+     'sorties': ['data_globale_etl/d_ville.csv']},
+    {'nom': 'etl_f_offres', 'script': 'ETL/etl_f_offres.py',
+     'entrees': ['data_globale/F_offres.csv'],
+     'sorties': ['data_globale_etl/F_offres.csv']},
+    {'nom': 'doublons_offres', 'script': 'ETL/doublons_offres.py',
+     'entrees': ['data_globale_etl/F_offres.csv'],
+     'sorties': ['data_globale_etl/doublons_offres.csv']},
+    {'nom': 'trouver_entreprises_proches', 'script': 'ETL/trouver_entreprises_proches.py',
+     'entrees': ['data_globale_etl/d_entreprise.csv'],
+     'sorties': ['data_globale_etl/d_entreprise_deduplique.csv']},
+    {'nom': 'remplacer_ids_entreprises', 'script': 'ETL/remplacer_ids_entreprises.py',
+     'code': ['ETL/trouver_entreprises_proches.py'],
+     'entrees': ['data_globale_etl/d_entreprise.csv', 'data_globale_etl/F_avis.csv', 'data_globale_etl/F_offres.csv'],
+     'sorties': ['data_globale_etl/F_avis_updated.csv', 'data_globale_etl/F_offres_updated.csv']},
+    {'nom': 'charger_entrepot', 'script': 'ETL/charger_entrepot.py',
+     'entrees': ['DATALAKE/3_PRODUCTION_ZONE/BDD/*.csv', 'DATALAKE/3_PRODUCTION_ZONE/BDD/*/annee=*/mois=*/*.parquet'],
+     'sorties': ['DATALAKE/3_PRODUCTION_ZONE/entrepot.sqlite']},
+]
+
+
+def calculer_dependances(etapes):
+    """
+    Déduit les dépendances : une étape dépend de la dernière étape précédente
+    (dans l'ordre de déclaration) qui produit l'une de ses entrées.
+    Returns:
+        dict: nom d'étape -> ensemble des noms d'étapes dont elle dépend.
+    """
+    dependances = {}
+    for i, etape in enumerate(etapes):
+        deps = set()
+        for entree in etape['entrees']:
+            for precedente in reversed(etapes[:i]):
+                if any(_recouvre(entree, sortie) for sortie in precedente['sorties']):
+                    deps.add(precedente['nom'])
+                    break
+        dependances[etape['nom']] = deps
+    return dependances
+
+
+def _recouvre(entree, sortie):
+    """Vrai si le motif d'entrée désigne la sortie ou un fichier sous le dossier de sortie."""
+    return entree == sortie or fnmatch.fnmatch(sortie, entree) or entree.startswith(sortie.rstrip('/') + '/')
+
+
+class CacheHash:
+    """
+    Cache des sha256 de fichiers, indexé par (taille, mtime) pour éviter de relire
+    les fichiers inchangés. Partagé entre threads.
+    """
+
+    def __init__(self, entrees=None):
+        self.entrees = dict(entrees or {})
+        self.verrou = threading.Lock()
+
+    def hash_fichier(self, chemin: Path) -> str:
+        st = chemin.stat()
+        cle = str(chemin.relative_to(RACINE))
+        with self.verrou:
+            connu = self.entrees.get(cle)
+        if connu and connu[0] == st.st_size and connu[1] == st.st_mtime_ns:
+            return connu[2]
+        h = hashlib.sha256()
+        with open(chemin, 'rb') as f:
+            for bloc in iter(lambda: f.read(1 << 20), b''):
+                h.update(bloc)
+        valeur = h.hexdigest()
+        with self.verrou:
+            self.entrees[cle] = [st.st_size, st.st_mtime_ns, valeur]
+        return valeur
+
+
+def lister_fichiers(motif):
+    """Liste triée des fichiers désignés par un chemin ou un motif glob (relatif à la racine)."""
+    if any(c in motif for c in '*?['):
+        return sorted(Path(p) for p in glob.glob(str(RACINE / motif)) if os.path.isfile(p))
+    chemin = RACINE / motif
+    if chemin.is_dir():
+        return sorted(p for p in chemin.rglob('*') if p.is_file())
+    return [chemin]
+
+
+def _resoudre_module(nom, dossier):
+    """Fichier du dépôt d'un module importé ('x' à côté du script, à la racine ou dans ETL ; 'ETL.x'), None sinon."""
+    relatif = Path(*nom.split('.')).with_suffix('.py')
+    for base in (dossier, RACINE, RACINE / 'ETL'):
+        chemin = base / relatif
+        if chemin.is_file():
+            return chemin.resolve()
+    return None
+
+
+def modules_locaux(scripts):
+    """
+    Modules du dépôt importés par des scripts, directement ou transitivement, d'après leurs
+    instructions import (y compris dans les fonctions).
+    Args:
+        scripts (list): Chemins relatifs à la racine.
+    Returns:
+        list: Chemins relatifs triés des modules, scripts exclus.
+    """
+    departs = {(RACINE / s).resolve() for s in scripts}
+    a_voir = list(departs)
+    vus = set()
+    while a_voir:
+        chemin = a_voir.pop()
+        if chemin in vus or not chemin.is_file():
+            continue
+        vus.add(chemin)
+        try:
+            arbre = ast.parse(chemin.read_text(encoding='utf-8'))
+        except (SyntaxError, UnicodeDecodeError):
+            continue
+        for noeud in ast.walk(arbre):
+            if isinstance(noeud, ast.Import):
+                noms = [alias.name for alias in noeud.names]
+            elif isinstance(noeud, ast.ImportFrom) and noeud.module and not noeud.level:
+                # from ETL import x : x peut être un module
+                noms = [noeud.module] + [f'{noeud.module}.{alias.name}' for alias in noeud.names]
+            else:
+                continue
+            for nom in noms:
+                module = _resoudre_module(nom, chemin.parent)
+                if module is not None and module not in vus:
+                    a_voir.append(module)
+    return sorted(str(p.relative_to(RACINE.resolve()).as_posix()) for p in vus - departs)
+
+
+def empreinte_etape(etape, cache: CacheHash) -> str:
+    """Empreinte sha256 du code de l'étape (script, modules importés, liste 'code') et du contenu de ses entrées."""
+    h = hashlib.sha256()
+    codes = [etape['script']] + etape.get('code', [])
+    for code in codes + [m for m in modules_locaux(codes) if m not in codes]:
+        h.update(f"code:{code}:{cache.hash_fichier(RACINE / code)}\n".encode())
+    for motif in etape['entrees']:
+        for chemin in lister_fichiers(motif):
+            rel = chemin.relative_to(RACINE)
+            if chemin.exists():
+                h.update(f"entree:{rel}:{cache.hash_fichier(chemin)}\n".encode())
+            else:
+                h.update(f"entree:{rel}:ABSENT\n".encode())
+    return h.hexdigest()
+
+
+def sorties_presentes(etape) -> bool:
+    return all((RACINE / s).exists() for s in etape['sorties'])
+
+
+def charger_etat(chemin=CHEMIN_ETAT):
+    if chemin.exists():
+        with open(chemin, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'etapes': {}, 'fichiers': {}}
+
+
+def sauvegarder_etat(etat, chemin=CHEMIN_ETAT):
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    tmp = chemin.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(etat, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, chemin)
+
+
+def executer_etape(etape, etat, cache: CacheHash, forcer=False):
+    """
+    Exécute une étape si ses entrées ou son code ont changé (ou si forcée).
+    Returns:
+        tuple: (statut 'sautee' | 'executee' | 'echec', durée en secondes, sortie du script,
+                nouvelle empreinte ou None)
+    """
+    debut = time.perf_counter()
+    empreinte = empreinte_etape(etape, cache)
+    precedente = etat['etapes'].get(etape['nom'], {}).get('empreinte')
+    if not forcer and empreinte == precedente and sorties_presentes(etape):
+        return 'sautee', time.perf_counter() - debut, '', None
+
+    resultat = subprocess.run([sys.executable, etape['script']], cwd=RACINE,
+                              capture_output=True, text=True, encoding='utf-8', errors='replace')
+    sortie = resultat.stdout + resultat.stderr
+    if resultat.returncode != 0:
+        return 'echec', time.perf_counter() - debut, sortie, None
+
+    # L'empreinte est recalculée après exécution : pour une étape qui modifie
+    # son entrée sur place (clean_f_avis), c'est le contenu produit qui compte.
+    return 'executee', time.perf_counter() - debut, sortie, empreinte_etape(etape, cache)
+
+
+def executer_dag(etapes=ETAPES_DAG, jobs=4, forcer=(), tout_forcer=False, verbeux=False, chemin_etat=CHEMIN_ETAT):
+    """
+    Exécute les étapes dans l'ordre des dépendances, en parallèle quand c'est possible.
+    Returns:
+        dict: nom d'étape -> statut ('sautee', 'executee', 'echec', 'non executee')
+    """
+    dependances = calculer_dependances(etapes)
+    par_nom = {e['nom']: e for e in etapes}
+    etat = charger_etat(chemin_etat)
+    cache = CacheHash(etat.get('fichiers'))
+    statuts = {}
+    restantes = [e['nom'] for e in etapes]
+    debut_total = time.perf_counter()
+
+    def tache(nom):
+        return executer_etape(par_nom[nom], etat, cache, forcer=tout_forcer or nom in forcer)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        en_cours = {}
+        while restantes or en_cours:
+            for nom in list(restantes):
+                deps = dependances[nom]
+                if any(statuts.get(d) in ('echec', 'non executee') for d in deps):
+                    statuts[nom] = 'non executee'
+                    restantes.remove(nom)
+                    print(f'[dag] {nom}: non exécutée (dépendance en échec)')
+                elif all(d in statuts for d in deps):
+                    en_cours[pool.submit(tache, nom)] = nom
+                    restantes.remove(nom)
+            if not en_cours:
+                break
+            faits, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+            for futur in faits:
+                nom = en_cours.pop(futur)
+                statut, duree, sortie, empreinte = futur.result()
+                statuts[nom] = statut
+                libelle = {'sautee': 'inchangée, sautée', 'executee': 'exécutée', 'echec': 'ÉCHEC'}[statut]
+                print(f'[dag] {nom}: {libelle} ({duree:.2f}s)')
+                if sortie and (verbeux or statut == 'echec'):
+                    print('\n'.join('    ' + l for l in sortie.rstrip().splitlines()))
+                if empreinte:
+                    etat['etapes'][nom] = {'empreinte': empreinte, 'date': time.strftime('%Y-%m-%d %H:%M:%S')}
+                with cache.verrou:
+                    etat['fichiers'] = dict(cache.entrees)
+                sauvegarder_etat(etat, chemin_etat)
+
+    print(f'[dag] Terminé en {time.perf_counter() - debut_total:.2f}s')
+    return statuts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exécuter le pipeline en DAG avec saut des étapes inchangées')
+    noms = [e['nom'] for e in ETAPES_DAG]
+    parser.add_argument('--jobs', type=int, default=4, help='Nombre d\'étapes exécutées en parallèle')
+    parser.add_argument('--force', action='append', default=[], choices=noms + ['tout'],
+                        help='Forcer l\'exécution d\'une étape (répétable, "tout" pour toutes)')
+    parser.add_argument('--verbeux', action='store_true', help='Afficher la sortie des scripts exécutés')
+    parser.add_argument('--liste', action='store_true', help='Afficher les étapes et leurs dépendances puis quitter')
+    args = parser.parse_args()
+
+    if args.liste:
+        dependances = calculer_dependances(ETAPES_DAG)
+        for e in ETAPES_DAG:
+            deps = ', '.join(sorted(dependances[e['nom']])) or '-'
+            print(f"{e['nom']:<28} <- {deps}")
+        return
+
+    statuts = executer_dag(jobs=args.jobs, forcer=set(args.force), tout_forcer='tout' in args.force, verbeux=args.verbeux)
+    if any(s in ('echec', 'non executee') for s in statuts.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""
+Registre des clés de substitution des tables de data_globale.
+
+generate_data_globale numérote les lignes de chaque table (range(1, n+1)) dans
+l'ordre de première apparition : une page ajoutée peut décaler tous les
+identifiants. Le registre conserve, par table, la correspondance clé
+naturelle -> identifiant (DATALAKE/3_PRODUCTION_ZONE/registre_cles.sqlite) :
+un membre déjà vu garde son identifiant, un nouveau membre reçoit le suivant.
+Les identifiants ne sont jamais réattribués, même si le membre disparaît.
+
+Clés naturelles :
+- d_ville, d_secteur, d_type_poste, d_note : la valeur elle-même ;
+- d_entreprise : (nom, taille, secteur) ;
+- F_offres : identifiant de l'offre LinkedIn (nom de la page) ;
+- F_avis : employeur Glassdoor et contenu de l'avis.
+Une clé présente plusieurs fois dans une exécution (deux captures d'une
+même offre) est numérotée par occurrence (cle, cle#2, cle#3...).
+
+Le registre conserve aussi l'empreinte du contenu de chaque ligne écrite :
+calculer_increments() ne garde que les lignes insérées (I) ou modifiées (U),
+plus l'identifiant des lignes supprimées (D), pour des rechargements
+incrémentaux de l'entrepôt et du modèle Power BI.
+
+Utilisation:
+  with RegistreCles() as registre:
+      tables = generer_tables(df_meta, df_avis, registre)
+      increments = calculer_increments(tables, registre)
+      ecrire_increments(increments, dossier)
+      registre.valider(increments)
+"""
+from pathlib import Path
+import hashlib
+import json
+import sqlite3
+import numpy as np
+import pandas as pd
+
+from traitement_par_lots import TAILLE_LOT
+
+RACINE = Path(__file__).resolve().parents[1]
+CHEMIN_REGISTRE = RACINE / 'DATALAKE' / '3_PRODUCTION_ZONE' / 'registre_cles.sqlite'
+
+# Table -> (colonne identifiant, colonnes de la clé naturelle ; None : clé fournie par generate_data_globale)
+CLES = {
+    'd_ville': ('id_ville', ['ville']),
+    'd_secteur': ('id_secteur', ['secteur']),
+    'd_type_poste': ('id_type_poste', ['type_poste']),
+    'd_note': ('id_note', ['note']),
+    'd_entreprise': ('id_entreprise', None),
+    'F_offres': ('id_offre', None),
+    'F_avis': ('id_avis', None),
+}
+
+# Clés étrangères : table -> {colonne: table référencée}
+REFERENCES = {
+    'd_entreprise': {'id_secteur': 'd_secteur'},
+    'F_offres': {'id_entreprise': 'd_entreprise', 'id_ville': 'd_ville', 'id_type_poste': 'd_type_poste'},
+    'F_avis': {'id_note': 'd_note', 'id_entreprise': 'd_entreprise'},
+    'liens_offres_entreprises': {'id_offre': 'F_offres', 'id_entreprise': 'd_entreprise'},
+}
+
+# Tables sans identifiant propre : seules leurs clés étrangères sont stabilisées (pas d'incréments)
+TABLES_LIEES = ['liens_offres_entreprises']
+
+# Ordre de stabilisation : tables référencées avant les tables qui les référencent
+ORDRE = ['d_ville', 'd_secteur', 'd_type_poste', 'd_note', 'd_entreprise', 'F_offres', 'F_avis']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cles (
+  nom_table TEXT NOT NULL,
+  cle_naturelle TEXT NOT NULL,
+  id INTEGER NOT NULL,
+  PRIMARY KEY (nom_table, cle_naturelle)
+);
+CREATE TABLE IF NOT EXISTS empreintes (
+  nom_table TEXT NOT NULL,
+  id INTEGER NOT NULL,
+  empreinte TEXT NOT NULL,
+  PRIMARY KEY (nom_table, id)
+);
+"""
+
+
+def cle_naturelle(*valeurs):
+    """Clé naturelle texte d'une ligne (valeurs manquantes -> None)."""
+    return json.dumps([None if v is None or (not isinstance(v, str) and pd.isna(v)) else str(v) for v in valeurs],
+                      ensure_ascii=False)
+
+
+def cle_hachee(*valeurs):
+    """Clé naturelle condensée (sha1) pour les lignes de faits dont la clé contient du texte long."""
+    return hashlib.sha1(cle_naturelle(*valeurs).encode('utf-8')).hexdigest()
+
+
+class RegistreCles:
+    """Correspondance persistante clé naturelle -> identifiant, par table."""
+
+    def __init__(self, chemin_base=CHEMIN_REGISTRE):
+        self.chemin_base = Path(chemin_base)
+        self.chemin_base.parent.mkdir(parents=True, exist_ok=True)
+        self.connexion = sqlite3.connect(self.chemin_base)
+        self.connexion.executescript(SCHEMA)
+
+    def fermer(self):
+        self.connexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+    def attribuer(self, nom_table, cles):
+        """
+        Identifiants des clés naturelles d'une table : identifiant enregistré pour une clé connue,
+        identifiant suivant (max + 1, dans l'ordre des clés) pour une nouvelle clé.
+        Args:
+            nom_table (str): Table de data_globale.
+            cles (list): Clés naturelles (str), une par ligne.
+        Returns:
+            list: Identifiants, dans l'ordre des clés.
+        """
+        # occurrences multiples d'une même clé dans l'exécution : cle, cle#2, cle#3...
+        occurrences = {}
+        cles_uniques = []
+        for cle in cles:
+            occurrences[cle] = occurrences.get(cle, 0) + 1
+            cles_uniques.append(cle if occurrences[cle] == 1 else f'{cle}#{occurrences[cle]}')
+
+        connues = dict(self.connexion.execute('SELECT cle_naturelle, id FROM cles WHERE nom_table = ?', (nom_table,)))
+        prochain = max(connues.values(), default=0) + 1
+        nouvelles = []
+        identifiants = []
+        for cle in cles_uniques:
+            if cle not in connues:
+                connues[cle] = prochain
+                nouvelles.append((nom_table, cle, prochain))
+                prochain += 1
+            identifiants.append(connues[cle])
+        with self.connexion:
+            for debut in range(0, len(nouvelles), TAILLE_LOT):
+                self.connexion.executemany('INSERT INTO cles (nom_table, cle_naturelle, id) VALUES (?, ?, ?)',
+                                           nouvelles[debut:debut + TAILLE_LOT])
+        return identifiants
+
+    def empreintes(self, nom_table):
+        return dict(self.connexion.execute('SELECT id, empreinte FROM empreintes WHERE nom_table = ?', (nom_table,)))
+
+    def valider(self, increments):
+        """Enregistre les empreintes des lignes émises, une fois les incréments écrits."""
+        with self.connexion:
+            for nom_table, df in increments.items():
+                colonne_id = CLES[nom_table][0]
+                supprimes = df.loc[df['operation'] == 'D', colonne_id]
+                ecrits = df.loc[df['operation'] != 'D', [colonne_id, '_empreinte']].itertuples(index=False, name=None)
+                self.connexion.executemany('DELETE FROM empreintes WHERE nom_table = ? AND id = ?',
+                                           [(nom_table, int(i)) for i in supprimes])
+                self.connexion.executemany(
+                    'INSERT INTO empreintes (nom_table, id, empreinte) VALUES (?, ?, ?) '
+                    'ON CONFLICT(nom_table, id) DO UPDATE SET empreinte = excluded.empreinte',
+                    [(nom_table, int(i), e) for i, e in ecrits])
+
+
+#==============================================================================
+#-- Stabilisation des identifiants
+#==============================================================================
+def _remplacer(serie, correspondance):
+    """Remplace des identifiants (valeurs manquantes conservées, dtype objet pour ne pas passer en float)."""
+    return serie.astype(object).map(lambda v: correspondance.get(v, v) if pd.notna(v) else v)
+
+
+def _remplacer_references(df, nom_table, correspondances):
+    for colonne, reference in REFERENCES.get(nom_table, {}).items():
+        if colonne in df.columns and reference in correspondances:
+            df[colonne] = _remplacer(df[colonne], correspondances[reference])
+    return df
+
+
+def stabiliser_tables(tables, cles_naturelles, registre):
+    """
+    Remplace les identifiants numérotés par generate_data_globale par ceux du registre,
+    clés étrangères comprises.
+    Args:
+        tables (dict): Nom de table -> DataFrame (identifiants 1..n de l'exécution).
+        cles_naturelles (dict): Clés des tables sans colonnes de clé (d_entreprise, F_offres, F_avis),
+            une par ligne.
+        registre (RegistreCles): Registre des clés.
+    Returns:
+        dict: Tables avec identifiants stables, mêmes colonnes et même ordre de lignes (clés étrangères
+        des TABLES_LIEES comprises).
+    """
+    correspondances = {}
+    stables = dict(tables)
+    for nom_table in ORDRE:
+        df = tables.get(nom_table)
+        if df is None:
+            continue
+        df = _remplacer_references(df.copy(), nom_table, correspondances)
+
+        colonne_id, colonnes_cle = CLES[nom_table]
+        if df.empty or colonne_id not in df.columns:
+            stables[nom_table] = df
+            continue
+        if colonnes_cle is None:
+            cles = cles_naturelles[nom_table]
+        else:
+            cles = [cle_naturelle(*valeurs) for valeurs in df[colonnes_cle].itertuples(index=False, name=None)]
+        identifiants = registre.attribuer(nom_table, cles)
+        correspondances[nom_table] = dict(zip(df[colonne_id].tolist(), identifiants))
+        df[colonne_id] = identifiants
+        stables[nom_table] = df
+    for nom_table in TABLES_LIEES:
+        if tables.get(nom_table) is not None:
+            stables[nom_table] = _remplacer_references(tables[nom_table].copy(), nom_table, correspondances)
+    return stables
+
+
+#==============================================================================
+#-- Incréments
+#==============================================================================
+def empreinte_ligne(valeurs):
+    return hashlib.sha1('\x1f'.join('' if v is None or (not isinstance(v, str) and pd.isna(v)) else str(v)
+                                    for v in valeurs).encode('utf-8')).hexdigest()
+
+
+def calculer_increments(tables, registre):
+    """
+    Lignes insérées (I), modifiées (U) et supprimées (D) de chaque table depuis la dernière validation.
+    Returns:
+        dict: Nom de table -> DataFrame (operation, colonnes de la table, _empreinte) ; les lignes
+        supprimées n'ont que leur identifiant.
+    """
+    increments = {}
+    for nom_table in ORDRE:
+        df = tables.get(nom_table)
+        if df is None:
+            continue
+        colonne_id = CLES[nom_table][0]
+        precedentes = registre.empreintes(nom_table)
+        if df.empty or colonne_id not in df.columns:
+            identifiants, empreintes = [], []
+        else:
+            identifiants = [int(i) for i in df[colonne_id]]
+            empreintes = [empreinte_ligne(valeurs) for valeurs in df.itertuples(index=False, name=None)]
+        operations = ['I' if i not in precedentes else ('U' if precedentes[i] != e else None)
+                      for i, e in zip(identifiants, empreintes)]
+        masque = np.array([op is not None for op in operations], dtype=bool)
+
+        emises = df[masque].copy() if identifiants else df.iloc[0:0].copy()
+        emises.insert(0, 'operation', [op for op in operations if op is not None])
+        emises['_empreinte'] = [e for e, garde in zip(empreintes, masque) if garde]
+        supprimes = sorted(set(precedentes) - set(identifiants))
+        if supprimes:
+            emises = pd.concat([emises, pd.DataFrame({'operation': 'D', colonne_id: supprimes})], ignore_index=True)
+        increments[nom_table] = emises
+    return increments
+
+
+def ecrire_increments(increments, dossier):
+    """Ecrit un CSV par table modifiée (operation, colonnes de la table) ; les anciens incréments sont remplacés."""
+    dossier = Path(dossier)
+    dossier.mkdir(parents=True, exist_ok=True)
+    for fichier in dossier.glob('*.csv'):
+        fichier.unlink()
+    for nom_table, df in increments.items():
+        if not df.empty:
+            df.drop(columns=['_empreinte']).to_csv(dossier / f'{nom_table}.csv', index=False, encoding='utf-8')
+
+
+def resume_increments(increments):
+    """{table: {'I': n, 'U': n, 'D': n}} pour l'affichage."""
+    return {nom_table: {op: int((df['operation'] == op).sum()) for op in 'IUD'} for nom_table, df in increments.items()}
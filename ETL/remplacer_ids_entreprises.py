@@ -16,6 +16,8 @@ import argparse
 import pandas as pd
 import importlib.util
 
+import instrumentation
+
 
 def _charger_module_trouver():
     """Charge dynamiquement le module trouver_entreprises_proches.py
@@ -27,26 +29,33 @@ def _charger_module_trouver():
     spec.loader.exec_module(mod)
     return (
         mod.charger_entreprises,
+        mod.preparer_entreprises,
         mod.trouver_paires_proches,
         mod.regrouper_composantes,
-        mod.choisir_representant,
+        mod.choisir_representants,
     )
 
 
 # charger les fonctions du module local
-charger_entreprises, trouver_paires_proches, regrouper_composantes, choisir_representant = _charger_module_trouver()
+(charger_entreprises, preparer_entreprises, trouver_paires_proches,
+ regrouper_composantes, choisir_representants) = _charger_module_trouver()
 
 
 def construire_mapping(chemin_entreprises: Path, seuil: float = 0.85):
     df = charger_entreprises(chemin_entreprises)
+    return construire_mapping_depuis_df(df, seuil=seuil)
+
+
+def construire_mapping_depuis_df(df: pd.DataFrame, seuil: float = 0.85):
+    """Calcule le mapping id supprimé -> id gardé sur un d_entreprise déjà préparé
+    (voir `preparer_entreprises`)."""
     paires = trouver_paires_proches(df, seuil=seuil)
     if not paires:
         return {}, df
 
     clusters = regrouper_composantes(paires, len(df))
     mapping = {}
-    for comp in clusters:
-        kept_idx = choisir_representant(df, comp)
+    for comp, kept_idx in zip(clusters, choisir_representants(df, clusters)):
         kept_id = str(df.at[kept_idx, 'id_entreprise'])
         for idx in comp:
             if idx == kept_idx:
@@ -57,16 +66,9 @@ def construire_mapping(chemin_entreprises: Path, seuil: float = 0.85):
     return mapping, df
 
 
-def appliquer_mapping_sur_csv(chemin_csv: Path, colonne: str, mapping: dict, inplace: bool = False):
-    if not chemin_csv.exists():
-        print(f"Fichier introuvable, skip: {chemin_csv}")
-        return 0
-
-    df = pd.read_csv(chemin_csv, dtype=str, encoding='utf-8', keep_default_na=False)
-    if colonne not in df.columns:
-        print(f"Colonne '{colonne}' non trouvée dans {chemin_csv}. Fichier inchangé.")
-        return 0
-
+def appliquer_mapping(df: pd.DataFrame, colonne: str, mapping: dict):
+    """Remplace dans `colonne` les ids supprimés par les ids gardés.
+    Retourne (df, nombre de remplacements)."""
     # Appliquer mapping (les clés/valeurs sont des str)
     def mapper_val(v):
         if pd.isna(v):
@@ -80,6 +82,20 @@ def appliquer_mapping_sur_csv(chemin_csv: Path, colonne: str, mapping: dict, inp
 
     # compter remplacements
     remplacements = sum(1 for a, b in zip(avant, apres) if a != b)
+    return df, remplacements
+
+
+def appliquer_mapping_sur_csv(chemin_csv: Path, colonne: str, mapping: dict, inplace: bool = False):
+    if not chemin_csv.exists():
+        print(f"Fichier introuvable, skip: {chemin_csv}")
+        return 0
+
+    df = pd.read_csv(chemin_csv, dtype=str, encoding='utf-8', keep_default_na=False)
+    if colonne not in df.columns:
+        print(f"Colonne '{colonne}' non trouvée dans {chemin_csv}. Fichier inchangé.")
+        return 0
+
+    df, remplacements = appliquer_mapping(df, colonne, mapping)
 
     if inplace:
         out = chemin_csv
@@ -91,6 +107,7 @@ def appliquer_mapping_sur_csv(chemin_csv: Path, colonne: str, mapping: dict, inp
     return remplacements
 
 
+@instrumentation.etape('remplacer_ids_entreprises')
 def main():
     parser = argparse.ArgumentParser(description='Remplacer ids d\'entreprise supprimés par ids gardés')
     parser.add_argument('--seuil', type=float, default=0.85, help='Seuil de similarité (0-1)')
@@ -104,11 +121,14 @@ def main():
     print(f'Calcul du mapping (seuil={args.seuil}) depuis: {chemin_ent}')
     mapping, df_ent = construire_mapping(chemin_ent, seuil=args.seuil)
 
-    if not mapping:
+    if mapping:
+        print(f'Mapping trouvé: {len(mapping)} ids supprimés → id gardé (ex: {next(iter(mapping.items()))})')
+    elif args.inplace:
         print('Aucun mapping trouvé (pas de paires similaires). Rien à appliquer.')
         return
-
-    print(f'Mapping trouvé: {len(mapping)} ids supprimés → id gardé (ex: {next(iter(mapping.items()))})')
+    else:
+        # les copies *_updated sont écrites quand même : sorties toujours présentes et à jour
+        print('Aucun mapping trouvé (pas de paires similaires). Copies *_updated écrites sans remplacement.')
 
     # Appliquer sur F_avis et F_offres
     total = 0
@@ -116,6 +136,7 @@ def main():
     total += appliquer_mapping_sur_csv(Path(args.f_offres), 'id_entreprise', mapping, inplace=args.inplace)
 
     print(f'Total remplacements appliqués: {total}')
+    instrumentation.compter_lignes(total)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,118 @@
+"""
+Point de reprise et quarantaine de l'extraction de la curated zone.
+
+Pendant l'extraction, chaque page traitée est ajoutée à un journal
+JSON-lines (curated_reprise.jsonl, à côté de metadata_descriptives.csv),
+écrit sur disque (flush + fsync) toutes les `frequence` pages. Si
+l'exécution est interrompue, la suivante relit le journal et ne traite que
+les pages restantes. Le journal est supprimé une fois
+metadata_descriptives.csv écrit.
+
+Une page dont l'extraction lève une exception est mise en quarantaine :
+elle est ignorée pour cette exécution et ajoutée, avec son erreur, à
+quarantaine_curated.csv (horodatage;type_fichier;fichier;erreur).
+
+Utilisation:
+  with JournalReprise.a_cote_de('./DATALAKE/00_METADATA/metadata_descriptives.csv') as journal:
+      for fichier in fichiers:
+          if journal.deja_traite('AVI', fichier): ...
+          journal.ajouter('AVI', fichier, enregistrement)
+  journal.terminer()
+"""
+from datetime import datetime
+from pathlib import Path
+import csv
+import json
+import os
+
+NOM_JOURNAL = 'curated_reprise.jsonl'
+NOM_QUARANTAINE = 'quarantaine_curated.csv'
+FREQUENCE = 50
+
+
+class JournalReprise:
+    """Journal des pages déjà extraites pendant l'exécution en cours."""
+
+    def __init__(self, chemin_journal, chemin_quarantaine, frequence=FREQUENCE):
+        self.chemin_journal = Path(chemin_journal)
+        self.chemin_quarantaine = Path(chemin_quarantaine)
+        self.frequence = frequence
+        self.traites = self._relire()
+        self.nb_repris = len(self.traites)
+        self.nb_quarantaine = 0
+        self.en_attente = []
+        self.fichier = open(self.chemin_journal, 'a', encoding='utf-8')
+
+    @classmethod
+    def a_cote_de(cls, chemin_csv, frequence=FREQUENCE):
+        """Journal et quarantaine situés dans le même dossier qu'un CSV de métadonnées."""
+        chemin_csv = Path(chemin_csv)
+        return cls(chemin_csv.with_name(NOM_JOURNAL), chemin_csv.with_name(NOM_QUARANTAINE), frequence)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+    def _relire(self):
+        traites = {}
+        if not self.chemin_journal.exists():
+            return traites
+        with open(self.chemin_journal, 'r', encoding='utf-8') as f:
+            for ligne in f:
+                try:
+                    entree = json.loads(ligne)
+                    traites[(entree['type'], entree['fichier'])] = entree.get('r')
+                except (ValueError, KeyError):
+                    # dernière ligne tronquée par l'interruption : la page sera retraitée
+                    continue
+        return traites
+
+    def deja_traite(self, type_page, fichier):
+        return (type_page, str(fichier)) in self.traites
+
+    def enregistrement(self, type_page, fichier):
+        """Enregistrement journalisé (None pour une page mise en quarantaine)."""
+        return self.traites.get((type_page, str(fichier)))
+
+    def ajouter(self, type_page, fichier, enregistrement):
+        """Journalise une page traitée (enregistrement None : page en quarantaine)."""
+        self.traites[(type_page, str(fichier))] = enregistrement
+        self.en_attente.append(json.dumps({'type': type_page, 'fichier': str(fichier), 'r': enregistrement},
+                                          ensure_ascii=False, separators=(',', ':')) + '\n')
+        if len(self.en_attente) >= self.frequence:
+            self.enregistrer()
+
+    def mettre_en_quarantaine(self, type_page, fichier, erreur):
+        """Ecarte une page en erreur : ligne ajoutée à la quarantaine et page journalisée sans enregistrement."""
+        nouveau = not self.chemin_quarantaine.exists()
+        with open(self.chemin_quarantaine, 'a', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, delimiter=';', lineterminator='\n')
+            if nouveau:
+                writer.writerow(['horodatage', 'type_fichier', 'fichier', 'erreur'])
+            writer.writerow([datetime.now().isoformat(timespec='seconds'), type_page, str(fichier),
+                             f'{type(erreur).__name__}: {erreur}'])
+        self.nb_quarantaine += 1
+        print(f'Page mise en quarantaine ({type(erreur).__name__}: {erreur}) : {fichier}')
+        self.ajouter(type_page, fichier, None)
+
+    def enregistrer(self):
+        """Point de reprise : écrit les pages en attente et force leur écriture sur disque."""
+        if not self.en_attente:
+            return
+        self.fichier.writelines(self.en_attente)
+        self.fichier.flush()
+        os.fsync(self.fichier.fileno())
+        self.en_attente = []
+
+    def fermer(self):
+        if not self.fichier.closed:
+            self.enregistrer()
+            self.fichier.close()
+
+    def terminer(self):
+        """Extraction terminée et sortie écrite : le journal n'est plus utile."""
+        self.fermer()
+        if self.chemin_journal.exists():
+            self.chemin_journal.unlink()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Registre des types de colonnes des tables du schéma en étoile.
+
+Les scripts ETL lisent les CSV en texte (dtype=str, keep_default_na=False) :
+chaque identifiant, note ou libellé est un objet str Python. Une fois les
+tables nettoyées, TYPES déclare le type de chaque colonne :
+- identifiants : entiers nullables (Int32) ;
+- notes : float32 ;
+- libellés peu variés (taille, categorie, pays, siege_social) : category ;
+- dates : datetime64 ;
+- autres textes : string.
+Les valeurs vides et 'NULL' deviennent des valeurs manquantes ; les colonnes
+non déclarées sont gardées telles quelles.
+
+Utilisation:
+  df = lire_table('data_globale_etl/F_avis.csv')      # type déduit du nom du fichier
+  df = typer_table(df_texte, 'd_entreprise')
+  rapport_memoire({'F_avis': df_texte})                # mémoire texte / typée par table
+
+  python ETL/schema_tables.py --dossier DATALAKE/3_PRODUCTION_ZONE/BDD
+"""
+from pathlib import Path
+import argparse
+import re
+import pandas as pd
+
+# Configuration des chemins
+RACINE = Path(__file__).resolve().parents[1]
+DOSSIER_DEFAUT = RACINE / 'DATALAKE' / '3_PRODUCTION_ZONE' / 'BDD'
+
+ID = 'Int32'
+TYPES = {
+    'd_secteur': {'id_secteur': ID, 'secteur': 'string'},
+    'd_ville': {'id_ville': ID, 'ville': 'string', 'pays': 'category'},
+    'd_type_poste': {'id_type_poste': ID, 'type_poste': 'string'},
+    'd_note': {'id_note': ID, 'note': 'float32'},
+    'd_entreprise': {'id_entreprise': ID, 'id_secteur': ID, 'nom_entreprise': 'string', 'taille': 'category',
+                     'categorie': 'category', 'siege_social': 'category', 'pays': 'category'},
+    'F_offres': {'id_offre': ID, 'id_entreprise': ID, 'id_ville': ID, 'id_type_poste': ID,
+                 'libelle_emploi': 'string', 'contenu': 'string', 'date_posted': 'datetime64[ns]'},
+    'F_avis': {'id_avis': ID, 'id_note': ID, 'date_publication': 'datetime64[ns]', 'contenu_avis': 'string',
+               'inconvenient': 'string', 'avantage': 'string', 'id_entreprise': ID},
+    'doublons_offres': {'id_offre': ID, 'id_offre_canonique': ID, 'taille_cluster': ID},
+}
+
+# Variantes écrites par le pipeline (remplacer_ids_entreprises, dédoublonnage)
+MOTIF_VARIANTE = re.compile(r'(_updated|_deduplique)$')
+VALEURS_MANQUANTES = ['', 'NULL']
+
+
+def nom_table_de(nom):
+    """Table du registre pour un nom de table ou de fichier (F_avis_updated.csv -> F_avis), None si inconnue."""
+    nom = MOTIF_VARIANTE.sub('', Path(nom).name.split('.')[0])
+    return nom if nom in TYPES else None
+
+
+#==============================================================================
+#-- Conversion
+#==============================================================================
+def convertir_dates(serie):
+    """jj/mm/aaaa (format des scripts de nettoyage), puis aaaa-mm-jj[Thh:mm...Z] ou 'Jul 26, 2019' -> datetime64."""
+    texte = serie.astype('string').str.strip().replace(VALEURS_MANQUANTES, pd.NA)
+    dates = pd.to_datetime(texte, format='%d/%m/%Y', errors='coerce')
+    restantes = dates.isna() & texte.notna()
+    if restantes.any():
+        autres = pd.to_datetime(texte[restantes], format='mixed', errors='coerce', utc=True).dt.tz_localize(None)
+        dates[restantes] = autres.astype(dates.dtype)
+    return dates
+
+
+def convertir_colonne(serie, type_colonne):
+    if type_colonne.startswith('datetime'):
+        return convertir_dates(serie)
+    if serie.dtype == object or pd.api.types.is_string_dtype(serie):
+        serie = serie.astype('string').str.strip().replace(VALEURS_MANQUANTES, pd.NA)
+    if type_colonne == ID:
+        # identifiants lus '12' ou '12.0' ; une valeur non numérique devient manquante
+        return pd.to_numeric(serie, errors='coerce').round().astype(ID)
+    if type_colonne.startswith('float'):
+        return pd.to_numeric(serie, errors='coerce').astype(type_colonne)
+    return serie.astype(type_colonne)
+
+
+def typer_table(df, nom_table):
+    """
+    Applique les types déclarés d'une table à un DataFrame (texte ou déjà typé).
+    Args:
+        df (pd.DataFrame): Table lue.
+        nom_table (str): Table du registre (les variantes *_updated sont acceptées).
+    Returns:
+        pd.DataFrame: Copie typée ; df inchangé si la table n'est pas déclarée.
+    """
+    types = TYPES.get(nom_table_de(nom_table) or '', {})
+    if not types:
+        return df
+    df = df.copy()
+    for colonne, type_colonne in types.items():
+        if colonne in df.columns:
+            df[colonne] = convertir_colonne(df[colonne], type_colonne)
+    return df
+
+
+def lire_table(chemin, nom_table=None):
+    """
+    Lit une table CSV ou Parquet et applique ses types déclarés.
+    Args:
+        chemin (Path): Fichier .csv ou .parquet.
+        nom_table (str | None): Table du registre (par défaut : déduite du nom du fichier).
+    Returns:
+        pd.DataFrame: Table typée.
+    """
+    chemin = Path(chemin)
+    nom_table = nom_table or chemin.name
+    if chemin.suffix == '.parquet':
+        return typer_table(pd.read_parquet(chemin), nom_table)
+    types = TYPES.get(nom_table_de(nom_table) or '', {})
+    # libellés lus directement en catégories, le reste en texte puis converti
+    dtype = {colonne: ('category' if type_colonne == 'category' else str) for colonne, type_colonne in types.items()}
+    df = pd.read_csv(chemin, dtype=dtype or str, encoding='utf-8', keep_default_na=False, na_values=VALEURS_MANQUANTES)
+    return typer_table(df, nom_table)
+
+
+#==============================================================================
+#-- Rapport mémoire
+#==============================================================================
+def en_objets(df):
+    """Forme des tables chez les scripts ETL : toutes les valeurs en str Python."""
+    return df.astype(object).where(df.notna(), '').astype(str)
+
+
+def rapport_memoire(tables, afficher=True):
+    """
+    Mémoire de chaque table en objets str (lecture dtype=str) et avec les types déclarés.
+    Args:
+        tables (dict): Nom de table -> DataFrame (texte ou typé).
+        afficher (bool): Afficher le rapport.
+    Returns:
+        pd.DataFrame: table, lignes, octets_texte, octets_types, reduction (%).
+    """
+    lignes = []
+    for nom, df in tables.items():
+        octets_texte = int(en_objets(df).memory_usage(deep=True, index=False).sum())
+        octets_types = int(typer_table(df, nom).memory_usage(deep=True, index=False).sum())
+        reduction = 100 * (1 - octets_types / octets_texte) if octets_texte else 0.0
+        lignes.append({'table': nom, 'lignes': len(df), 'octets_texte': octets_texte, 'octets_types': octets_types,
+                       'reduction': round(reduction, 1)})
+    rapport = pd.DataFrame(lignes, columns=['table', 'lignes', 'octets_texte', 'octets_types', 'reduction'])
+    if afficher:
+        print('Mémoire par table (texte -> types déclarés):')
+        for r in rapport.itertuples(index=False):
+            print(f'  - {r.table:<24} {r.lignes:>8} lignes  {r.octets_texte / 1e6:8.2f} Mo -> '
+                  f'{r.octets_types / 1e6:8.2f} Mo  (-{r.reduction:.1f} %)')
+        total_texte, total_types = rapport['octets_texte'].sum(), rapport['octets_types'].sum()
+        if total_texte:
+            print(f'  = total {total_texte / 1e6:.2f} Mo -> {total_types / 1e6:.2f} Mo '
+                  f'(-{100 * (1 - total_types / total_texte):.1f} %)')
+    return rapport
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mémoire des tables du schéma en étoile, en texte et typées')
+    parser.add_argument('--dossier', type=str, default=str(DOSSIER_DEFAUT), help='Dossier des CSV / Parquet des tables')
+    args = parser.parse_args()
+
+    tables = {}
+    for chemin in sorted(Path(args.dossier).iterdir()):
+        if chemin.suffix in ('.csv', '.parquet') and nom_table_de(chemin.name):
+            lecture = pd.read_parquet(chemin) if chemin.suffix == '.parquet' else \
+                pd.read_csv(chemin, dtype=str, encoding='utf-8', keep_default_na=False)
+            tables[chemin.stem] = lecture
+    if not tables:
+        print(f'Aucune table du schéma dans {args.dossier}')
+        return
+    rapport_memoire(tables)
+
+
+if __name__ == '__main__':
+    main()
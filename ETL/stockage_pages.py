@@ -0,0 +1,206 @@
+"""
+Stockage des pages HTML de la landing zone : en clair, compressées page par
+page (gzip ou zstd) ou regroupées par crawl dans des archives.
+
+Le chemin logique d'une page (fichier_cible des métadonnées techniques, ex.
+.../GLASSDOOR/AVI/13552-AVIS-SOC-GLASSDOOR-E2131167_P1.html) ne change pas ;
+seul son stockage physique varie :
+- en clair        : le fichier .html lui-même ;
+- compressé       : <page>.html.gz ou <page>.html.zst ;
+- archive de crawl : <id crawl>.pages[.gz|.zst] dans le même dossier, suite de
+  pages compressées indépendamment (membres gzip / trames zstd), avec un index
+  <archive>.index.json {nom de la page: [position, longueur]}.
+
+ouvrir_page() retrouve le stockage d'une page et renvoie un flux binaire qui
+décompresse à la lecture, sans fichier intermédiaire.
+
+zstd nécessite le paquet optionnel zstandard (pip install zstandard).
+"""
+from pathlib import Path
+import gzip
+import io
+import json
+import os
+import shutil
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Compression -> extension ajoutée au nom du fichier ou de l'archive
+EXTENSIONS = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+SUFFIXE_ARCHIVE = '.pages'
+SUFFIXE_INDEX = '.index.json'
+
+# Index des archives déjà lus : chemin -> (mtime, index)
+_index_archives = {}
+
+
+def verifier_compression(compression):
+    if compression not in EXTENSIONS:
+        raise ValueError(f"Compression inconnue : {compression} (attendu : {', '.join(c for c in EXTENSIONS if c)})")
+    if compression == 'zstd' and zstandard is None:
+        raise RuntimeError('Compression zstd indisponible : pip install zstandard')
+
+
+def compresser(octets, compression):
+    if compression == 'gzip':
+        return gzip.compress(octets)
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor().compress(octets)
+    return octets
+
+
+def flux_decompresse(flux, compression):
+    """Enveloppe un flux binaire compressé dans un lecteur qui décompresse au fil de la lecture."""
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=flux, mode='rb')
+    if compression == 'zstd':
+        verifier_compression('zstd')
+        return zstandard.ZstdDecompressor().stream_reader(flux)
+    return flux
+
+
+def chemin_archive(chemin_cible, id_crawl, compression):
+    return Path(chemin_cible).parent / f'{id_crawl}{SUFFIXE_ARCHIVE}{EXTENSIONS[compression]}'
+
+
+#==============================================================================
+#-- Ecriture (landing zone)
+#==============================================================================
+def ecrire_page(chemin_source, chemin_cible, compression=None):
+    """
+    Copie une page vers la landing zone, compressée ou non.
+    Args:
+        chemin_source (str): Page d'origine.
+        chemin_cible (str): Chemin logique de la page dans la landing zone (.html).
+        compression (str | None): None, 'gzip' ou 'zstd'.
+    Returns:
+        dict: Stockage de la page (fichier_stockage).
+    """
+    verifier_compression(compression)
+    chemin_stockage = str(chemin_cible) + EXTENSIONS[compression]
+    if compression is None:
+        shutil.copy(chemin_source, chemin_stockage)
+    elif compression == 'gzip':
+        with open(chemin_source, 'rb') as src, gzip.open(chemin_stockage, 'wb') as dest:
+            shutil.copyfileobj(src, dest)
+    else:
+        with open(chemin_source, 'rb') as src, open(chemin_stockage, 'wb') as dest:
+            zstandard.ZstdCompressor().copy_stream(src, dest)
+    return {'fichier_stockage': chemin_stockage}
+
+
+def ajouter_a_archive(chemin_source, chemin_cible, id_crawl, compression=None, index_archives=None):
+    """
+    Ajoute une page à l'archive de son crawl (page compressée seule, ajoutée en fin d'archive).
+    Une page déjà présente est réécrite en fin d'archive et l'index pointe vers la nouvelle copie.
+    Args:
+        index_archives (dict | None): Index des archives d'un lot (chemin de l'index -> index), lus une
+            fois et écrits par ecrire_index_archives() en fin de lot ; None : index écrit à chaque page.
+    Returns:
+        dict: Stockage de la page (fichier_stockage, position, longueur).
+    """
+    verifier_compression(compression)
+    archive = chemin_archive(chemin_cible, id_crawl, compression)
+    chemin_index = archive.with_name(archive.name + SUFFIXE_INDEX)
+    lot = index_archives if index_archives is not None else {}
+    if chemin_index not in lot:
+        lot[chemin_index] = json.loads(chemin_index.read_text(encoding='utf-8')) if chemin_index.exists() else {}
+
+    with open(chemin_source, 'rb') as f:
+        contenu = compresser(f.read(), compression)
+    with open(archive, 'ab') as f:
+        position = f.tell()
+        f.write(contenu)
+    lot[chemin_index][Path(chemin_cible).name] = [position, len(contenu)]
+    if index_archives is None:
+        ecrire_index_archives(lot)
+    fichier_stockage = ('./' if str(chemin_cible).startswith('./') else '') + \
+        f'{Path(chemin_cible).parent.as_posix()}/{archive.name}'
+    return {'fichier_stockage': fichier_stockage, 'position': position, 'longueur': len(contenu)}
+
+
+def ecrire_index_archives(index_archives):
+    """Ecrit les index d'archives modifiés par un lot (fichier temporaire puis remplacement)."""
+    for chemin_index, index in index_archives.items():
+        chemin_tmp = chemin_index.with_name(chemin_index.name + '.tmp')
+        chemin_tmp.write_text(json.dumps(index, ensure_ascii=False), encoding='utf-8')
+        os.replace(chemin_tmp, chemin_index)
+
+
+#==============================================================================
+#-- Lecture (curated zone)
+#==============================================================================
+def _index_archive(chemin_index):
+    mtime = chemin_index.stat().st_mtime
+    en_cache = _index_archives.get(chemin_index)
+    if en_cache is None or en_cache[0] != mtime:
+        en_cache = (mtime, json.loads(chemin_index.read_text(encoding='utf-8')))
+        _index_archives[chemin_index] = en_cache
+    return en_cache[1]
+
+
+def localiser_page(chemin):
+    """
+    Retrouve le stockage physique d'une page d'après son chemin logique.
+    Returns:
+        tuple: (fichier, compression, position, longueur) ; position et longueur valent None hors archive
+    Raises:
+        FileNotFoundError: si la page n'est trouvée sous aucune forme.
+    """
+    chemin = Path(chemin)
+    if chemin.exists():
+        return chemin, None, None, None
+    for compression, extension in EXTENSIONS.items():
+        if compression and chemin.with_name(chemin.name + extension).exists():
+            return chemin.with_name(chemin.name + extension), compression, None, None
+
+    # archive du crawl : le nom de la page commence par l'identifiant du crawl
+    id_crawl = chemin.name.split('-', 1)[0]
+    for compression in EXTENSIONS:
+        archive = chemin_archive(chemin, id_crawl, compression)
+        chemin_index = archive.with_name(archive.name + SUFFIXE_INDEX)
+        if not chemin_index.exists():
+            continue
+        entree = _index_archive(chemin_index).get(chemin.name)
+        if entree is None:
+            continue
+        position, longueur = entree
+        return archive, compression, position, longueur
+    raise FileNotFoundError(f'Page introuvable dans la landing zone : {chemin}')
+
+
+def ouvrir_page(chemin):
+    """
+    Ouvre une page de la landing zone d'après son chemin logique, quel que soit son stockage.
+    Returns:
+        flux binaire (décompressé à la lecture)
+    Raises:
+        FileNotFoundError: si la page n'est trouvée sous aucune forme.
+    """
+    fichier, compression, position, longueur = localiser_page(chemin)
+    if position is None:
+        return flux_decompresse(open(fichier, 'rb'), compression)
+    with open(fichier, 'rb') as f:
+        f.seek(position)
+        contenu = f.read(longueur)
+    return flux_decompresse(io.BytesIO(contenu), compression)
+
+
+def taille_stockee(chemin):
+    """Octets stockés d'une page (fichier en clair ou compressé, ou entrée de son archive), lus pour l'ouvrir."""
+    fichier, _, position, longueur = localiser_page(chemin)
+    return os.path.getsize(fichier) if position is None else longueur
+
+
+def lire_octets_page(chemin):
+    with ouvrir_page(chemin) as flux:
+        return flux.read()
+
+
+def lire_texte_page(chemin, encoding='utf8'):
+    """Contenu texte d'une page (fins de ligne normalisées comme open(..., 'r'))."""
+    texte = lire_octets_page(chemin).decode(encoding)
+    return texte.replace('\r\n', '\n').replace('\r', '\n')
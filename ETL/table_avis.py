@@ -0,0 +1,82 @@
+"""
+Table des avis employés de la curated zone (DATALAKE/2_CURATED_ZONE/avis.csv).
+
+Une ligne par avis, colonnes typées, au lieu d'un objet JSON par employeur
+stocké dans une cellule de metadata_descriptives.csv. La table est
+rattachée aux métadonnées descriptives par id_objet (OBJECT_ID de l'objet
+GLASSDOOR_AVIS) et à l'employeur Glassdoor par id_source ; les valeurs
+absentes ('NULL' dans les pages) sont des cellules vides.
+
+Utilisation:
+  chemin = chemin_a_cote_de('./DATALAKE/00_METADATA/metadata_descriptives.csv')
+  ecrire_table_avis(df_avis, chemin)
+  df_avis = lire_table_avis(chemin)
+"""
+from pathlib import Path
+import pandas as pd
+
+NOM_DOSSIER = '2_CURATED_ZONE'
+NOM_FICHIER = 'avis.csv'
+
+# Colonnes et types de la table (ordre d'écriture)
+TYPES = {
+    'id_objet': 'Int64',
+    'id_source': 'string',
+    'rang_avis': 'Int64',
+    'date_avis': 'string',
+    'note_avis': 'Float64',
+    'emploi_auteur': 'string',
+    'ville_auteur': 'string',
+    'texte_avis': 'string',
+    'avantages': 'string',
+    'inconvenients': 'string',
+}
+COLONNES = list(TYPES)
+
+
+def chemin_a_cote_de(chemin_meta):
+    """Chemin de la table des avis pour un fichier DATALAKE/00_METADATA/metadata_descriptives.csv."""
+    return Path(chemin_meta).resolve().parents[1] / NOM_DOSSIER / NOM_FICHIER
+
+
+def valeur_avis(valeur):
+    """Valeur d'un champ d'avis extrait : guillemets d'encadrement retirés, 'NULL' -> None."""
+    if valeur is None:
+        return None
+    valeur = str(valeur)
+    if len(valeur) >= 2 and valeur.startswith('"') and valeur.endswith('"'):
+        valeur = valeur[1:-1]
+    return None if valeur in ('', 'NULL') else valeur
+
+
+def construire_table_avis(liste_avi, objets_avis):
+    """
+    Construit la table des avis à partir des enregistrements AVI de la curated zone.
+    Args:
+        liste_avi (list): Enregistrements AVI (avis : listes [rang, date, note, emploi, ville, texte, avantages, inconvénients]).
+        objets_avis (list): OBJECT_ID attribué à chaque enregistrement, dans le même ordre.
+    Returns:
+        pd.DataFrame: Une ligne par avis, colonnes COLONNES typées.
+    """
+    lignes = []
+    for avi, id_objet in zip(liste_avi, objets_avis):
+        for rang, avis in enumerate(avi['avis'], start=1):
+            champs = [valeur_avis(avis[i]) if len(avis) > i else None for i in range(1, 8)]
+            lignes.append([id_objet, avi.get('id_source'), rang] + champs)
+    df = pd.DataFrame(lignes, columns=COLONNES)
+    df['note_avis'] = pd.to_numeric(df['note_avis'], errors='coerce')
+    return df.astype(TYPES)
+
+
+def ecrire_table_avis(df, chemin):
+    chemin = Path(chemin)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    df[COLONNES].to_csv(chemin, index=False, encoding='utf-8')
+
+
+def lire_table_avis(chemin):
+    """Lit la table des avis en une lecture colonne par colonne typée (None si le fichier n'existe pas)."""
+    chemin = Path(chemin)
+    if not chemin.exists():
+        return None
+    return pd.read_csv(chemin, encoding='utf-8', dtype=TYPES)
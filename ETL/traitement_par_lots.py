@@ -0,0 +1,63 @@
+"""
+Traitement des tables de faits (F_avis, F_offres) par lots de taille fixe.
+
+Le CSV source est lu par blocs (read_csv chunksize), chaque bloc est transformé
+puis ajouté à un fichier temporaire à côté de la destination. En fin de
+traitement, l'ancienne destination est éventuellement conservée en sauvegarde
+par renommage, puis le fichier temporaire remplace la destination (os.replace,
+atomique). La mémoire utilisée dépend de la taille des lots et non du nombre
+total de lignes ; la source peut être la destination elle-même.
+"""
+from pathlib import Path
+import os
+import pandas as pd
+
+# Nombre de lignes lues et transformées à la fois
+TAILLE_LOT = 50_000
+
+
+def transformer_csv_par_lots(chemin_src, chemin_dest, transformation, taille_lot=TAILLE_LOT,
+                             sauvegarde=None, options_lecture=None, options_ecriture=None):
+    """
+    Applique `transformation` à chaque lot du CSV source et écrit le résultat au fil de l'eau.
+    Args:
+        chemin_src (Path): CSV à lire (lu en texte : dtype=str, keep_default_na=False).
+        chemin_dest (Path): CSV à produire (peut être égal à chemin_src).
+        transformation (callable): Fonction DataFrame -> DataFrame appliquée à chaque lot.
+        taille_lot (int): Nombre de lignes par lot.
+        sauvegarde (Path | None): Si précisé et que chemin_dest existe, il est renommé vers ce chemin.
+        options_lecture (dict): Arguments supplémentaires pour pd.read_csv.
+        options_ecriture (dict): Arguments supplémentaires pour DataFrame.to_csv.
+    Returns:
+        tuple: (nombre de lignes lues, nombre de lignes écrites)
+    """
+    chemin_src, chemin_dest = Path(chemin_src), Path(chemin_dest)
+    options_lecture = {'encoding': 'utf-8', **(options_lecture or {})}
+    options_ecriture = {'encoding': 'utf-8', **(options_ecriture or {})}
+    chemin_tmp = chemin_dest.with_name(chemin_dest.name + '.tmp')
+
+    nb_lus = 0
+    nb_ecrits = 0
+    premier_lot = True
+    try:
+        lecteur = pd.read_csv(chemin_src, dtype=str, keep_default_na=False, chunksize=taille_lot, **options_lecture)
+        with lecteur:
+            for lot in lecteur:
+                nb_lus += len(lot)
+                lot = transformation(lot)
+                lot.to_csv(chemin_tmp, index=False, mode='w' if premier_lot else 'a', header=premier_lot, **options_ecriture)
+                premier_lot = False
+                nb_ecrits += len(lot)
+        if premier_lot:
+            # source sans aucune ligne : on conserve l'en-tête transformé
+            vide = pd.read_csv(chemin_src, dtype=str, keep_default_na=False, nrows=0, **options_lecture)
+            transformation(vide).to_csv(chemin_tmp, index=False, **options_ecriture)
+    except BaseException:
+        if chemin_tmp.exists():
+            chemin_tmp.unlink()
+        raise
+
+    if sauvegarde is not None and chemin_dest.exists():
+        os.replace(chemin_dest, sauvegarde)
+    os.replace(chemin_tmp, chemin_dest)
+    return nb_lus, nb_ecrits
@@ -11,11 +11,14 @@ Le script utilise la librairie standard `difflib` (SequenceMatcher) pour le scor
 """
 from pathlib import Path
 import argparse
+import numpy as np
 import pandas as pd
 import difflib
 import re
 import csv
 
+import instrumentation
+
 
 def normaliser_chaine(s: str) -> str:
     """
@@ -42,22 +45,39 @@ def charger_entreprises(chemin_csv: Path) -> pd.DataFrame:
     if not chemin_csv.exists():
         raise FileNotFoundError(f"Fichier introuvable: {chemin_csv}")
     df = pd.read_csv(chemin_csv, dtype=str, encoding='utf-8', keep_default_na=False)
+    return preparer_entreprises(df)
+
+
+def preparer_entreprises(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Prépare un DataFrame d_entreprise déjà chargé (en texte) pour le matching fuzzy.
+    """
     if 'id_entreprise' not in df.columns or 'nom_entreprise' not in df.columns:
         raise RuntimeError('Le fichier doit contenir les colonnes id_entreprise et nom_entreprise')
     # garder toutes les colonnes pour calculer le nombre d'informations manquantes
     df = df.copy()
     df['nom_normalise'] = df['nom_entreprise'].map(normaliser_chaine)
-    # calculer un score d'information: nombre de colonnes non 'Inconnu' et non vides
-    def compte_inconnus(row):
-        vals = [str(v).strip() for v in row.tolist()]
-        # ignorer id et nom
-        vals = vals[2:]
-        return sum(1 for v in vals if (v == '' or v.lower() == 'inconnu' or v.lower() == 'none' or v.lower() == 'nan'))
-
-    df['nb_inconnu'] = df.apply(lambda r: compte_inconnus(r), axis=1)
+    # calculer un score d'information: nombre de colonnes 'Inconnu' ou vides
+    df['nb_inconnu'] = compter_inconnus(df)
     return df
 
 
+# Valeurs (en minuscules, sans espaces de bord) comptées comme information manquante
+VALEURS_INCONNUES = ['', 'inconnu', 'none', 'nan']
+
+
+def compter_inconnus(df: pd.DataFrame) -> pd.Series:
+    """
+    Nombre de valeurs manquantes ou 'Inconnu' par ligne, colonne par colonne (comparaisons vectorisées).
+    Les deux premières colonnes (identifiants) sont ignorées.
+    """
+    nb_inconnu = pd.Series(0, index=df.index, dtype='int64')
+    for colonne in df.columns[2:]:
+        valeurs = df[colonne].astype(str).str.strip().str.lower()
+        nb_inconnu += valeurs.isin(VALEURS_INCONNUES)
+    return nb_inconnu
+
+
 def trouver_paires_proches(df: pd.DataFrame, seuil: float = 0.85):
     """Retourne une liste de tuples (score, idx_i, idx_j) pour paires similaires (indices dans df)."""
     lignes = []
@@ -108,25 +128,32 @@ def regrouper_composantes(n_pairs, n):
     return clusters
 
 
-def choisir_representant(df: pd.DataFrame, indices: list):
-    """Choisir l'indice à garder: celui avec le plus d'infos (moins de 'Inconnu')."""
-    sous = df.iloc[indices].copy()
-    # nb_inconnu plus petit -> meilleur
-    min_inconnu = sous['nb_inconnu'].min()
-    candidats = sous[sous['nb_inconnu'] == min_inconnu]
-    if len(candidats) == 1:
-        return int(candidats.index[0])
-    # en cas d'égalité, choisir l'id_entreprise le plus petit (int)
-    def id_int(idx):
-        try:
-            return int(df.at[idx, 'id_entreprise'])
-        except Exception:
-            return float('inf')
-
-    best = min(candidats.index.tolist(), key=id_int)
-    return int(best)
-
-
+def choisir_representants(df: pd.DataFrame, clusters: list) -> list:
+    """
+    Choisit l'indice à garder de chaque cluster, en un seul groupby sur l'identifiant de cluster :
+    celui qui a le plus d'infos (moins de 'Inconnu'), puis en cas d'égalité l'id_entreprise
+    le plus petit (entier), puis le premier indice.
+    Returns:
+        list: Indice gardé de chaque cluster, dans l'ordre des clusters.
+    """
+    if not clusters:
+        return []
+    indices = np.fromiter((idx for comp in clusters for idx in comp), dtype=np.int64)
+    numeros = np.repeat(np.arange(len(clusters)), [len(comp) for comp in clusters])
+    # id non entier -> départagé en dernier
+    ids = df['id_entreprise'].astype(str).str.strip().iloc[indices]
+    ids_entiers = pd.to_numeric(ids.where(ids.str.fullmatch(r'[+-]?\d+')), errors='coerce')
+    membres = pd.DataFrame({
+        'cluster': numeros,
+        'nb_inconnu': df['nb_inconnu'].to_numpy()[indices],
+        'id_entier': ids_entiers.fillna(np.inf).to_numpy(),
+        'indice': df.index.to_numpy()[indices],
+    })
+    gardes = membres.sort_values(['nb_inconnu', 'id_entier', 'indice']).groupby('cluster', sort=True)['indice'].first()
+    return [int(idx) for idx in gardes.to_numpy()]
+
+
+@instrumentation.etape('trouver_entreprises_proches')
 def main():
     parser = argparse.ArgumentParser(description='Trouver entreprises aux noms proches (fuzzy)')
     parser.add_argument('--seuil', type=float, default=0.85, help='Seuil de similarité (0-1), défaut 0.85')
@@ -142,18 +169,18 @@ def main():
     print(f'Détection des paires avec seuil = {args.seuil}...')
     paires = trouver_paires_proches(df, seuil=args.seuil)
 
-    if not paires:
+    if paires:
+        print(f'Trouvé {len(paires)} paire(s) similaire(s) (seuil={args.seuil}).')
+        # regrouper en clusters
+        clusters = regrouper_composantes(paires, len(df))
+        print(f'Composantes détectées (clusters) : {len(clusters)}')
+    else:
+        # le fichier dédupliqué est écrit quand même (sortie toujours présente et à jour)
         print('Aucune paire similaire trouvée avec ce seuil.')
-        return
-
-    print(f'Trouvé {len(paires)} paire(s) similaire(s) (seuil={args.seuil}).')
-    # regrouper en clusters
-    clusters = regrouper_composantes(paires, len(df))
-    print(f'Composantes détectées (clusters) : {len(clusters)}')
+        clusters = []
 
     actions = []  # tuples (cluster_indices, kept_idx, removed_indices)
-    for comp in clusters:
-        kept = choisir_representant(df, comp)
+    for comp, kept in zip(clusters, choisir_representants(df, clusters) if clusters else []):
         removed = [i for i in comp if i != kept]
         actions.append((comp, kept, removed))
 
@@ -176,6 +203,7 @@ def main():
         chemin_sortie = chemin_sortie_defaut
 
     print(f'Nombre de lignes supprimées: {len(indices_a_supprimer)}')
+    instrumentation.compter_lignes(len(df_dedupe))
     print(f'Ecriture du fichier dédupliqué vers: {chemin_sortie}')
     # écrire toutes les colonnes d'origine sauf les lignes supprimées
     df_dedupe.to_csv(chemin_sortie, index=False, encoding='utf-8')
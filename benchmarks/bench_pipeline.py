@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Benchmark de bout en bout du pipeline sur un corpus synthétique.
+
+Génère un corpus (voir generer_corpus.py) dans un dossier de travail qui
+reproduit l'arborescence du data lake, puis chronomètre chaque étape :
+copie landing, extraction curated, generate_data_globale, scripts ETL et
+dédoublonnage fuzzy des entreprises. Chaque étape tourne dans un processus
+séparé afin de mesurer son pic de mémoire (RSS) propre.
+
+Les résultats (durée, débit, pic RSS par étape, commit git, paramètres) sont
+écrits dans un fichier JSON, pour comparer les commits entre eux.
+
+Usage:
+  python benchmarks/bench_pipeline.py --pages 2000
+  python benchmarks/bench_pipeline.py --pages 100000 --etapes landing,curated --garder
+"""
+from pathlib import Path
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+RACINE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(RACINE))
+sys.path.insert(0, str(RACINE / 'ETL'))
+
+import generer_corpus
+
+ETAPES_BENCH = ['landing', 'curated', 'generate_data_globale', 'etl_avis', 'clean_f_avis',
+                'etl_entreprise', 'etl_ville', 'etl_f_offres', 'dedup_entreprises']
+MARQUEUR_RESULTAT = '@@RESULTAT@@'
+
+
+#==============================================================================
+#-- Etapes (exécutées dans un processus enfant, cwd = dossier de travail)
+#==============================================================================
+def _lire_csv(chemin):
+    import pandas as pd
+    return pd.read_csv(chemin, dtype=str, encoding='utf-8', keep_default_na=False)
+
+
+def _taille(chemin):
+    return chemin.stat().st_size if chemin.exists() else 0
+
+
+def bench_landing(travail):
+    import ingestion_data_landing_zone
+    source = travail / 'DATALAKE' / '0_SOURCE_WEB'
+    fichiers = list(source.iterdir())
+    ingestion_data_landing_zone.main(str(source), str(travail / 'DATALAKE' / '1_LANDING_ZONE'),
+                                     str(travail / 'DATALAKE' / '00_METADATA' / 'metadata_technique.csv'))
+    return len(fichiers), len(fichiers), sum(f.stat().st_size for f in fichiers)
+
+
+def bench_curated(travail):
+    import ingestion_data_curated_zone as curated
+    meta_tech = travail / 'DATALAKE' / '00_METADATA' / 'metadata_technique.csv'
+    soc, avi, emp = curated.lister_fichiers_cibles(str(meta_tech))
+    fichiers = soc + avi + emp
+    curated.main(str(meta_tech), str(travail / 'DATALAKE' / '00_METADATA' / 'metadata_descriptives.csv'))
+    return len(fichiers), len(fichiers), sum(os.path.getsize(f) for f in fichiers)
+
+
+def bench_generate_data_globale(travail):
+    import generate_data_globale
+    chemin_meta = travail / 'DATALAKE' / '00_METADATA' / 'metadata_descriptives.csv'
+    df_meta = generate_data_globale.lire_metadata(chemin_meta)
+    tables = generate_data_globale.generer_tables(df_meta, generate_data_globale.lire_avis(chemin_meta))
+    generate_data_globale.ecrire_tables(tables, travail / 'data_globale')
+    return len(df_meta), sum(len(t) for t in tables.values()), _taille(chemin_meta)
+
+
+def _bench_transformation(entree, sortie, transformation):
+    df = _lire_csv(entree)
+    nb_entree = len(df)
+    df = transformation(df)
+    sortie.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(sortie, index=False, encoding='utf-8')
+    return nb_entree, len(df), _taille(entree)
+
+
+def bench_etl_avis(travail):
+    import etl_avis
+    return _bench_transformation(travail / 'data_globale' / 'F_avis.csv', travail / 'data_globale_etl' / 'F_avis.csv',
+                                 lambda df: etl_avis.filtrer_avis(df)[0])
+
+
+def bench_clean_f_avis(travail):
+    import clean_f_avis
+    chemin = travail / 'data_globale_etl' / 'F_avis.csv'
+    return _bench_transformation(chemin, chemin, clean_f_avis.nettoyer_avis)
+
+
+def bench_etl_entreprise(travail):
+    import etl_entreprise
+    resultat = _bench_transformation(travail / 'data_globale' / 'd_entreprise.csv', travail / 'data_globale_etl' / 'd_entreprise.csv',
+                                     lambda df: etl_entreprise.transformer_entreprise(df)[0])
+    df_secteur = etl_entreprise.transformer_secteur(_lire_csv(travail / 'data_globale' / 'd_secteur.csv'))
+    df_secteur.to_csv(travail / 'data_globale_etl' / 'd_secteur.csv', index=False, encoding='utf-8')
+    return resultat
+
+
+def bench_etl_ville(travail):
+    import etl_ville
+    return _bench_transformation(travail / 'data_globale' / 'd_ville.csv', travail / 'data_globale_etl' / 'd_ville.csv',
+                                 etl_ville.transformer_ville)
+
+
+def bench_etl_f_offres(travail):
+    import etl_f_offres
+    return _bench_transformation(travail / 'data_globale' / 'F_offres.csv', travail / 'data_globale_etl' / 'F_offres.csv',
+                                 etl_f_offres.nettoyer_offres)
+
+
+def bench_dedup_entreprises(travail):
+    import remplacer_ids_entreprises
+    chemin = travail / 'data_globale_etl' / 'd_entreprise.csv'
+    mapping, df = remplacer_ids_entreprises.construire_mapping(chemin)
+    for nom in ['F_avis', 'F_offres']:
+        remplacer_ids_entreprises.appliquer_mapping_sur_csv(travail / 'data_globale_etl' / f'{nom}.csv', 'id_entreprise', mapping)
+    return len(df), len(mapping), _taille(chemin)
+
+
+FONCTIONS_BENCH = {
+    'landing': bench_landing,
+    'curated': bench_curated,
+    'generate_data_globale': bench_generate_data_globale,
+    'etl_avis': bench_etl_avis,
+    'clean_f_avis': bench_clean_f_avis,
+    'etl_entreprise': bench_etl_entreprise,
+    'etl_ville': bench_etl_ville,
+    'etl_f_offres': bench_etl_f_offres,
+    'dedup_entreprises': bench_dedup_entreprises,
+}
+
+
+def pic_rss_mo():
+    """Pic de mémoire résidente du processus courant, en Mo (None si indisponible)."""
+    try:
+        import resource
+        pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss est en Ko sous Linux, en octets sous macOS
+        return pic / (1024 * 1024) if sys.platform == 'darwin' else pic / 1024
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except (ImportError, AttributeError):
+            return None
+
+
+def executer_etape_enfant(etape, travail):
+    """Point d'entrée du processus enfant : exécute une étape et imprime le résultat en JSON."""
+    os.chdir(travail)
+    # les métriques des étapes instrumentées restent dans le dossier de travail
+    os.environ['DATALAKE_METRIQUES'] = str(Path(travail) / 'DATALAKE' / '00_METADATA' / 'metriques.csv')
+    # imports lourds hors chronométrage
+    import pandas  # noqa: F401
+    import bs4  # noqa: F401
+    # les scripts impriment leur progression : on ne garde que la ligne de résultat
+    sortie_standard = sys.stdout
+    sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+    try:
+        debut = time.perf_counter()
+        nb_entrees, nb_sorties, octets_lus = FONCTIONS_BENCH[etape](Path(travail))
+        duree = time.perf_counter() - debut
+    finally:
+        sys.stdout.close()
+        sys.stdout = sortie_standard
+    resultat = {'etape': etape, 'duree_s': round(duree, 4), 'nb_entrees': nb_entrees, 'nb_sorties': nb_sorties,
+                'octets_lus': octets_lus, 'debit_entrees_par_s': round(nb_entrees / duree, 2) if duree > 0 else None,
+                'debit_mo_par_s': round(octets_lus / 1e6 / duree, 2) if duree > 0 else None, 'pic_rss_mo': pic_rss_mo()}
+    print(MARQUEUR_RESULTAT + json.dumps(resultat))
+
+
+#==============================================================================
+#-- Orchestration du benchmark
+#==============================================================================
+def preparer_dossier_travail(travail, pages, taille_page_ko, avis_par_page, graine):
+    for sous_dossier in ['DATALAKE/0_SOURCE_WEB', 'DATALAKE/00_METADATA', 'DATALAKE/1_LANDING_ZONE/LINKEDIN/EMP',
+                         'DATALAKE/1_LANDING_ZONE/GLASSDOOR/SOC', 'DATALAKE/1_LANDING_ZONE/GLASSDOOR/AVI']:
+        (travail / sous_dossier).mkdir(parents=True, exist_ok=True)
+    debut = time.perf_counter()
+    compteurs = generer_corpus.generer_corpus(travail / 'DATALAKE' / '0_SOURCE_WEB', pages, taille_page_ko, avis_par_page, graine)
+    compteurs['duree_generation_s'] = round(time.perf_counter() - debut, 2)
+    return compteurs
+
+
+def commit_git():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RACINE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executer_benchmark(pages=1000, etapes=ETAPES_BENCH, taille_page_ko=50, avis_par_page=10, graine=42,
+                       dossier_travail=None, garder=False):
+    """
+    Génère le corpus puis exécute les étapes demandées, chacune dans un processus séparé.
+    Returns:
+        dict: Résultats du benchmark (paramètres, corpus, mesures par étape).
+    """
+    travail = Path(dossier_travail) if dossier_travail else Path(tempfile.mkdtemp(prefix='bench_datalake_'))
+    resultats = {'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'commit': commit_git(), 'python': sys.version.split()[0],
+                 'parametres': {'pages': pages, 'taille_page_ko': taille_page_ko, 'avis_par_page': avis_par_page, 'graine': graine},
+                 'etapes': []}
+    try:
+        print(f'Génération du corpus ({pages} pages) dans {travail}...')
+        resultats['corpus'] = preparer_dossier_travail(travail, pages, taille_page_ko, avis_par_page, graine)
+        for etape in etapes:
+            processus = subprocess.run([sys.executable, __file__, '--enfant', etape, '--travail', str(travail)],
+                                       capture_output=True, text=True, encoding='utf-8', errors='replace')
+            lignes = [l for l in processus.stdout.splitlines() if l.startswith(MARQUEUR_RESULTAT)]
+            if processus.returncode != 0 or not lignes:
+                print(f'  {etape:<24} ÉCHEC')
+                print(processus.stderr[-2000:])
+                resultats['etapes'].append({'etape': etape, 'erreur': processus.stderr[-2000:]})
+                break
+            mesure = json.loads(lignes[-1][len(MARQUEUR_RESULTAT):])
+            resultats['etapes'].append(mesure)
+            pic = f"{mesure['pic_rss_mo']:.0f} Mo" if mesure['pic_rss_mo'] is not None else '?'
+            print(f"  {etape:<24} {mesure['duree_s']:9.2f}s  {mesure['debit_entrees_par_s'] or 0:10.1f} entrées/s  pic RSS {pic}")
+    finally:
+        if not garder and not dossier_travail:
+            shutil.rmtree(travail, ignore_errors=True)
+    return resultats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du pipeline sur un corpus synthétique')
+    parser.add_argument('--pages', type=int, default=1000, help='Nombre total de pages générées')
+    parser.add_argument('--etapes', type=str, default=','.join(ETAPES_BENCH), help='Etapes à mesurer, séparées par des virgules')
+    parser.add_argument('--taille-page-ko', type=int, default=50, help='Taille approximative d\'une page (Ko)')
+    parser.add_argument('--avis-par-page', type=int, default=10, help='Nombre d\'avis par page AVIS-SOC')
+    parser.add_argument('--graine', type=int, default=42, help='Graine aléatoire du générateur')
+    parser.add_argument('--travail', type=str, default='', help='Dossier de travail (temporaire par défaut)')
+    parser.add_argument('--garder', action='store_true', help='Ne pas supprimer le dossier de travail temporaire')
+    parser.add_argument('--resultats', type=str, default='', help='Fichier JSON de résultats (défaut: benchmarks/resultats/)')
+    parser.add_argument('--enfant', type=str, default='', choices=[''] + ETAPES_BENCH, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.enfant:
+        executer_etape_enfant(args.enfant, args.travail)
+        return
+
+    etapes = [e.strip() for e in args.etapes.split(',') if e.strip()]
+    inconnues = [e for e in etapes if e not in FONCTIONS_BENCH]
+    if inconnues:
+        parser.error(f'Etapes inconnues: {inconnues} (disponibles: {ETAPES_BENCH})')
+
+    resultats = executer_benchmark(args.pages, etapes, args.taille_page_ko, args.avis_par_page, args.graine,
+                                   args.travail or None, args.garder)
+
+    chemin = Path(args.resultats) if args.resultats else \
+        RACINE / 'benchmarks' / 'resultats' / f"bench_{resultats['commit'] or 'local'}_{args.pages}p_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump(resultats, f, ensure_ascii=False, indent=2)
+    print(f'Résultats écrits dans {chemin}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Génère un corpus synthétique de pages HTML LinkedIn (INFO-EMP) et Glassdoor
+(INFO-SOC, AVIS-SOC) qui respecte les sélecteurs utilisés par les fonctions
+extraire_* de ingestion_data_curated_zone.py.
+
+Les noms de fichiers suivent ceux du crawl réel :
+  <crawl>-INFO-EMP-LINKEDIN-FR-<id_offre>.html
+  <crawl>-INFO-SOC-GLASSDOOR-E<id_employeur>_P1.html
+  <crawl>-AVIS-SOC-GLASSDOOR-E<id_employeur>_P<page>.html
+
+Usage:
+  python benchmarks/generer_corpus.py --pages 10000 --sortie /tmp/corpus
+
+La répartition par type de page reprend celle du corpus réel (environ 42 %
+d'offres, 23 % de pages société, 35 % de pages d'avis dont une moitié sur
+deux pages). Le générateur est déterministe pour une graine donnée.
+"""
+from pathlib import Path
+import argparse
+import html
+import json
+import random
+
+# Répartition observée dans DATALAKE/0_SOURCE_WEB (254 EMP, 140 SOC, 209 AVIS)
+PART_EMP = 0.42
+PART_SOC = 0.23
+
+NOMS_BASE = ['Devoteam', 'Atos', 'Capgemini', 'Sopra Steria', 'Orange', 'Thales', 'Altran', 'Accenture',
+             'Business & Decision', 'Micropole', 'Keyrus', 'Talan', 'Alten', 'Akka Technologies', 'CGI',
+             'Inetum', 'Wavestone', 'Societe Generale', 'BNP Paribas', 'Airbus', 'Safran', 'Renault',
+             'Decathlon', 'Leroy Merlin', 'Michelin', 'Dassault Systemes', 'Ubisoft', 'Criteo']
+SUFFIXES = ['', '', '', ' France', ' SA', ' SAS', ' Group', ' Consulting']
+VILLES = ['Paris', 'Lyon', 'Toulouse', 'Nantes', 'Lille', 'Bordeaux', 'Marseille', 'Levallois-Perret',
+          'Bezons', 'Sesto Calende (Italie)', 'Genève (Suisse)', 'Montréal (Canada)']
+TAILLES = ['De 1 à 50 employés', 'De 51 à 200 employés', 'Entre 201 et 500 employés',
+           'De 501 à 1 000 employés', 'De 1 001 à 5 000 employés', 'De 5 001 à 10 000 employés',
+           'Plus de 10 000 employés']
+SECTEURS = ['Services informatiques', 'Conseil', 'Banque et gestion d\'actifs', 'Aérospatiale et défense',
+            'Fabrication d\'appareils électriques et électroniques', 'Télécommunications', 'Commerce de détail']
+POSTES = ['Data Engineer', 'Data Analyst', 'Consultant BI', 'Ingénieur Big Data', 'Data Scientist',
+          'Développeur ETL Talend', 'Chef de projet décisionnel', 'Architecte Data']
+NIVEAUX = ['Premier emploi', 'Confirmé', 'Stage', 'Non applicable', 'Cadre']
+MOTS = ('données pipeline client projet équipe mission analyse qualité reporting cloud sql python '
+        'spark entrepôt modélisation ambiance salaire management formation télétravail évolution').split()
+
+
+def phrase(rng, n_min=6, n_max=30):
+    return ' '.join(rng.choice(MOTS) for _ in range(rng.randint(n_min, n_max))).capitalize() + '.'
+
+
+def remplissage(rng, taille_octets):
+    """Balises de navigation, scripts et styles sans intérêt pour l'extraction, pour atteindre une taille de page réaliste."""
+    blocs = []
+    total = 0
+    while total < taille_octets:
+        bloc = (f'<div class="nav-item"><a href="/lien/{rng.randint(1, 10**6)}?trk=nav">{phrase(rng, 2, 5)}</a></div>'
+                f'<script>window.__ctx_{rng.randint(1, 10**6)} = {{"a": {rng.random()}}};</script>')
+        blocs.append(bloc)
+        total += len(bloc)
+    return ''.join(blocs)
+
+
+def page_emp(rng, nom_entreprise, taille_remplissage):
+    titre = f'{rng.choice(POSTES)} (H/F)'
+    ville = rng.choice(VILLES[:8])
+    description = ' '.join(phrase(rng) for _ in range(rng.randint(5, 20)))
+    date = f'20{rng.randint(18, 20)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00.000Z'
+    json_ld = {
+        '@context': 'http://schema.org', '@type': 'JobPosting', 'datePosted': date,
+        'description': description, 'employmentType': rng.choice(['FULL_TIME', 'CONTRACTOR', 'OTHER']),
+        'hiringOrganization': {'@type': 'Organization', 'name': nom_entreprise},
+        'jobLocation': {'@type': 'Place', 'address': {'@type': 'PostalAddress', 'addressLocality': ville,
+                                                      'addressCountry': 'FR'}},
+        'title': titre,
+    }
+    criteres = ''.join(f'<li class="job-criteria__item"><span class="job-criteria__text job-criteria__text--criteria">{c}</span></li>'
+                       for c in [rng.choice(NIVEAUX), 'Temps plein', 'Ingénierie'])
+    return (f'<!DOCTYPE html><html><head><title>{html.escape(titre)}</title>'
+            f'<script type="application/ld+json">{json.dumps(json_ld, ensure_ascii=False)}</script></head><body>'
+            f'{remplissage(rng, taille_remplissage // 2)}'
+            f'<section class="topcard"><h1 class="topcard__title">{html.escape(titre)}</h1>'
+            f'<h3><span class="topcard__flavor"><a class="topcard__org-name-link" href="#">{html.escape(nom_entreprise)}</a></span>'
+            f'<span class="topcard__flavor topcard__flavor--bullet">{ville}, FR</span></h3></section>'
+            f'<div class="description__text description__text--rich">{html.escape(description)}</div>'
+            f'<ul class="job-criteria__list">{criteres}</ul>'
+            f'{remplissage(rng, taille_remplissage // 2)}</body></html>')
+
+
+def page_soc(rng, entreprise, taille_remplissage):
+    nom = html.escape(entreprise['nom'])
+    infos = [('Site Web', '<span class="value website"><a href="#">https://www.exemple.fr</a></span>'),
+             ('Siège social', f'<span class="value">{entreprise["ville"]}</span>'),
+             ('Taille', f'<span class="value">{entreprise["taille"]}</span>'),
+             ('Fondé en', f'<span class="value"> {rng.randint(1900, 2015)}</span>'),
+             ('Type', '<span class="value"> Entreprise cotée en bourse</span>'),
+             ('Secteur', f'<span class="value"> {html.escape(entreprise["secteur"])}</span>'),
+             ('Revenu', '<span class="value"> Entre 100 et 500 millions € (EUR) par an</span>')]
+    blocs = ''.join(f'<div class="infoEntity"><label>{l}</label>{v}</div>' for l, v in infos)
+    return (f'<!DOCTYPE html><html><head><title>{nom}</title></head><body>'
+            f'{remplissage(rng, taille_remplissage // 2)}'
+            f'<h1 class="strong tightAll" data-company="{nom}" title=""><span id="DivisionsDropdownComponent">{nom}</span></h1>'
+            f'<div class="info flexbox row col-hh">{blocs}</div>'
+            f'{remplissage(rng, taille_remplissage // 2)}</body></html>')
+
+
+def avis_html(rng, numero):
+    note = f'{rng.randint(1, 5)}.0'
+    mois = rng.choice(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
+    date = f'{mois} {rng.randint(1, 28)}, 20{rng.randint(15, 20)}'
+    return (f'<li class="empReview cf" id="empReview_{numero}"><div class="hreview">'
+            f'<time class="date subtle small" datetime="">{date}</time>'
+            f'<span class="rating"><span class="value-title" title="{note}"></span></span>'
+            f'<div class="author minor"><span class="authorInfo"><span class="authorJobTitle middle reviewer">'
+            f'{rng.choice(["Employé actuel", "Ancien employé"])} - {rng.choice(POSTES)}</span> '
+            f'<span class="authorLocation">{rng.choice(VILLES[:8])}</span></span></div>'
+            f'<p class="mainText mb-0">{phrase(rng)}</p>'
+            f'<div class="mt-md common__EiReviewTextStyles__allowLineBreaks"><p class="strong">Avantages</p><p>{phrase(rng)}</p></div>'
+            f'<div class="mt-md common__EiReviewTextStyles__allowLineBreaks"><p class="strong">Inconvénients</p><p>{phrase(rng)}</p></div>'
+            f'</div></li>')
+
+
+def page_avis(rng, entreprise, avis_par_page, taille_remplissage):
+    nom = html.escape(entreprise['nom'])
+    liste = ''.join(avis_html(rng, rng.randint(10**6, 10**8)) for _ in range(avis_par_page))
+    return (f'<!DOCTYPE html><html><head><title>Avis {nom}</title></head><body>'
+            f'<span id="DivisionsDropdownComponent">{nom}</span>'
+            f'<div class="v2__EIReviewsRatingsStylesV2__ratingNum v2__EIReviewsRatingsStylesV2__large">{entreprise["note"]}</div>'
+            f'{remplissage(rng, taille_remplissage // 2)}'
+            f'<ol class="empReviews">{liste}</ol>'
+            f'{remplissage(rng, taille_remplissage // 2)}</body></html>')
+
+
+def generer_corpus(dossier_sortie, pages=1000, taille_page_ko=50, avis_par_page=10, graine=42):
+    """
+    Ecrit un corpus synthétique dans dossier_sortie.
+    Args:
+        dossier_sortie (Path): Dossier cible (équivalent de DATALAKE/0_SOURCE_WEB).
+        pages (int): Nombre total de pages à générer.
+        taille_page_ko (int): Taille approximative de chaque page en Ko.
+        avis_par_page (int): Nombre d'avis par page AVIS-SOC.
+        graine (int): Graine du générateur aléatoire.
+    Returns:
+        dict: Nombre de pages générées par type et nombre d'octets écrits.
+    """
+    rng = random.Random(graine)
+    dossier_sortie = Path(dossier_sortie)
+    dossier_sortie.mkdir(parents=True, exist_ok=True)
+    taille_remplissage = taille_page_ko * 1024
+
+    nb_emp = int(pages * PART_EMP)
+    nb_soc = max(1, int(pages * PART_SOC))
+    nb_avis = pages - nb_emp - nb_soc
+
+    # Entreprises : noms de base déclinés avec des variantes proches pour le dédoublonnage fuzzy
+    entreprises = []
+    for i in range(nb_soc):
+        base = NOMS_BASE[i % len(NOMS_BASE)]
+        nom = base + rng.choice(SUFFIXES) + (f' {i // len(NOMS_BASE)}' if i >= len(NOMS_BASE) * 4 else '')
+        entreprises.append({'id': 1000 + i, 'crawl': 20000 + i, 'nom': nom, 'ville': rng.choice(VILLES), 'taille': rng.choice(TAILLES),
+                            'secteur': rng.choice(SECTEURS), 'note': f'{rng.uniform(2.5, 4.8):.1f}'})
+
+    compteurs = {'INFO-EMP': 0, 'INFO-SOC': 0, 'AVIS-SOC': 0, 'octets': 0}
+
+    def ecrire(nom_fichier, contenu, type_page):
+        donnees = contenu.encode('utf-8')
+        (dossier_sortie / nom_fichier).write_bytes(donnees)
+        compteurs[type_page] += 1
+        compteurs['octets'] += len(donnees)
+
+    for entreprise in entreprises:
+        ecrire(f'{entreprise["crawl"]}-INFO-SOC-GLASSDOOR-E{entreprise["id"]}_P1.html', page_soc(rng, entreprise, taille_remplissage), 'INFO-SOC')
+
+    # Pages d'avis : P1 pour chaque employeur puis P2, P3... tant qu'il reste des pages
+    numero_page = 1
+    restantes = nb_avis
+    while restantes > 0:
+        for entreprise in entreprises:
+            if restantes == 0:
+                break
+            ecrire(f'{entreprise["crawl"]}-AVIS-SOC-GLASSDOOR-E{entreprise["id"]}_P{numero_page}.html',
+                   page_avis(rng, entreprise, avis_par_page, taille_remplissage), 'AVIS-SOC')
+            restantes -= 1
+        numero_page += 1
+
+    crawl = 20000 + nb_soc
+    for i in range(nb_emp):
+        crawl += 1
+        entreprise = rng.choice(entreprises)
+        ecrire(f'{crawl}-INFO-EMP-LINKEDIN-FR-{1500000000 + i}.html', page_emp(rng, entreprise['nom'], taille_remplissage), 'INFO-EMP')
+
+    return compteurs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Générer un corpus HTML synthétique LinkedIn / Glassdoor')
+    parser.add_argument('--pages', type=int, default=1000, help='Nombre total de pages')
+    parser.add_argument('--sortie', type=str, required=True, help='Dossier de sortie')
+    parser.add_argument('--taille-page-ko', type=int, default=50, help='Taille approximative d\'une page (Ko)')
+    parser.add_argument('--avis-par-page', type=int, default=10, help='Nombre d\'avis par page AVIS-SOC')
+    parser.add_argument('--graine', type=int, default=42, help='Graine aléatoire')
+    args = parser.parse_args()
+
+    compteurs = generer_corpus(args.sortie, args.pages, args.taille_page_ko, args.avis_par_page, args.graine)
+    print(f"Corpus généré dans {args.sortie}: {compteurs['INFO-EMP']} INFO-EMP, {compteurs['INFO-SOC']} INFO-SOC, "
+          f"{compteurs['AVIS-SOC']} AVIS-SOC ({compteurs['octets'] / 1e6:.1f} Mo)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Ingestion continue : surveille DATALAKE/0_SOURCE_WEB et fait passer chaque
+nouvelle page par la landing zone (copie, métadonnées techniques) puis par la
+curated zone dès son arrivée, sans attendre une réexécution complète.
+
+- Surveillance : inotify (paquet optionnel inotify_simple, fichiers complets
+  signalés par CLOSE_WRITE / MOVED_TO) ; à défaut, scrutation du dossier toutes
+  les `scrutation` secondes (fichier pris quand il n'a pas été modifié depuis
+  `stabilite` secondes). Au démarrage, les pages déjà présentes mais jamais
+  ingérées (absentes des fichier_source des métadonnées) sont rattrapées.
+- Micro-lots : les pages détectées sont regroupées (au plus `taille_lot` pages
+  ou `delai_lot` secondes après la première) ; chaque lot est écrit dans la
+  base de métadonnées en une transaction, puis seules ses pages passent par
+  la curated zone : leurs objets sont ajoutés aux métadonnées descriptives et
+  les employeurs dont le lot apporte une page d'avis sont refusionnés (leurs
+  autres pages sont relues depuis le cache d'extraction). La curated zone est
+  republiée en entier une seule fois, au démarrage.
+- Contre-pression : la file entre la surveillance et le traitement est bornée
+  (`file_max`). Quand elle est pleine, la surveillance attend ; les pages
+  arrivées entre-temps sont retrouvées par la scrutation ou par un rescan
+  (débordement de la file inotify). L'état de l'ingestion (pages en attente,
+  file saturée, latence des derniers lots) est écrit après chaque lot dans
+  DATALAKE/00_METADATA/ingestion_continue.json.
+
+metadata_technique.csv, metadata_descriptives.csv et la table des avis sont
+réexportés au plus toutes les `intervalle_export` secondes et à l'arrêt
+(SIGINT / SIGTERM : les pages en file sont traitées avant de quitter).
+
+Usage:
+  python ingestion_continue.py
+  python ingestion_continue.py --taille-lot 200 --delai-lot 2 --file-max 5000
+  python ingestion_continue.py --une-fois     # rattrapage des pages présentes puis arrêt
+"""
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import os
+import queue
+import signal
+import threading
+import time
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+from ETL.instrumentation import etape, compter_lignes
+from ETL.table_avis import lire_table_avis, chemin_a_cote_de as chemin_table_avis
+import ingestion_data_landing_zone as landing
+import ingestion_data_curated_zone as curated
+
+DOSSIER_SOURCE = "./DATALAKE/0_SOURCE_WEB"
+DOSSIER_LANDING = "./DATALAKE/1_LANDING_ZONE"
+NOM_ETAT = 'ingestion_continue.json'
+
+TAILLE_LOT = 100
+DELAI_LOT = 1.0
+FILE_MAX = 2000
+SCRUTATION = 1.0
+STABILITE = 1.0
+INTERVALLE_EXPORT = 60.0
+
+
+#==============================================================================
+#-- Surveillance du dossier source
+#==============================================================================
+class SurveillanceSource(threading.Thread):
+    """Détecte les nouvelles pages du dossier source et les place dans la file (nom, instant de détection)."""
+
+    def __init__(self, dossier, file_pages, connus, arret, scrutation=SCRUTATION, stabilite=STABILITE, inotify=True):
+        super().__init__(name='surveillance-source', daemon=True)
+        self.dossier = dossier
+        self.file_pages = file_pages
+        self.connus = set(connus)
+        self.arret = arret
+        self.scrutation = scrutation
+        self.stabilite = stabilite
+        self.mode = 'inotify' if inotify and INotify is not None else 'scrutation'
+        self.rattrapage_termine = threading.Event()
+        self.saturee = False
+        self.nb_saturations = 0
+
+    def run(self):
+        if self.mode == 'inotify':
+            self._surveiller_inotify()
+        else:
+            self._surveiller_scrutation()
+
+    def _surveiller_inotify(self):
+        with INotify() as notifications:
+            # surveillance posée avant le rattrapage : aucune page ne passe entre les deux
+            notifications.add_watch(self.dossier, flags.CLOSE_WRITE | flags.MOVED_TO)
+            self.rescanner(stables_seulement=False)
+            self.rattrapage_termine.set()
+            while not self.arret.is_set():
+                for evenement in notifications.read(timeout=int(self.scrutation * 1000)):
+                    if evenement.mask & flags.Q_OVERFLOW:
+                        print('File inotify débordée : rescan du dossier source')
+                        self.rescanner(stables_seulement=False)
+                    elif evenement.name:
+                        self.signaler(evenement.name)
+
+    def _surveiller_scrutation(self):
+        self.rescanner(stables_seulement=False)
+        self.rattrapage_termine.set()
+        while not self.arret.wait(self.scrutation):
+            self.rescanner()
+
+    def rescanner(self, stables_seulement=True):
+        """Signale les pages du dossier source encore inconnues (stables_seulement : non modifiées depuis `stabilite` s)."""
+        limite = time.time() - self.stabilite
+        with os.scandir(self.dossier) as entrees:
+            for entree in entrees:
+                if self.arret.is_set():
+                    return
+                if entree.name in self.connus or not entree.is_file():
+                    continue
+                if stables_seulement and entree.stat().st_mtime > limite:
+                    continue
+                self.signaler(entree.name)
+
+    def signaler(self, nom):
+        """Place une page dans la file ; attend tant que la file est pleine (contre-pression)."""
+        if nom in self.connus:
+            return
+        self.connus.add(nom)
+        if landing.dossier_destination(nom, '') is None:
+            # fichier sans destination dans la landing zone (fichier temporaire du crawler...)
+            return
+        detection = time.monotonic()
+        while not self.arret.is_set():
+            try:
+                self.file_pages.put((nom, detection), timeout=0.5)
+                self.saturee = False
+                return
+            except queue.Full:
+                if not self.saturee:
+                    self.saturee = True
+                    self.nb_saturations += 1
+                    print(f'File pleine ({self.file_pages.maxsize} pages en attente) : surveillance en pause')
+        # arrêt demandé avant la mise en file : la page sera rattrapée au prochain démarrage
+        self.connus.discard(nom)
+
+
+#==============================================================================
+#-- Traitement par micro-lots
+#==============================================================================
+def prendre_lot(file_pages, taille_lot=TAILLE_LOT, delai_lot=DELAI_LOT, attente=0.5):
+    """
+    Retire un lot de la file : la première page est attendue au plus `attente` s, les suivantes
+    jusqu'à `taille_lot` pages ou `delai_lot` s après la première.
+    Returns:
+        list: Couples (nom, instant de détection), vide si aucune page n'est arrivée.
+    """
+    try:
+        lot = [file_pages.get(timeout=attente)]
+    except queue.Empty:
+        return []
+    limite = time.monotonic() + delai_lot
+    while len(lot) < taille_lot:
+        restant = limite - time.monotonic()
+        try:
+            lot.append(file_pages.get(timeout=restant) if restant > 0 else file_pages.get_nowait())
+        except queue.Empty:
+            break
+    return lot
+
+
+def ecrire_etat(chemin, etat):
+    """Ecrit l'état de l'ingestion (fichier remplacé d'un bloc, lisible à tout moment)."""
+    temporaire = chemin.with_name(chemin.name + '.tmp')
+    with open(temporaire, 'w', encoding='utf-8') as f:
+        json.dump(etat, f, ensure_ascii=False, indent=1)
+    os.replace(temporaire, chemin)
+
+
+def executer(dossier_source=DOSSIER_SOURCE, dossier_landing=DOSSIER_LANDING,
+             path_file_metadata=landing.PATH_FILE_METADATA, chemin_descriptives=curated.METADONNEES_DESCRIPTIVES,
+             taille_lot=TAILLE_LOT, delai_lot=DELAI_LOT, file_max=FILE_MAX, scrutation=SCRUTATION,
+             stabilite=STABILITE, intervalle_export=INTERVALLE_EXPORT, compression=None, archives=False,
+             empreinte='normalisee', inotify=True, une_fois=False):
+    """
+    Boucle d'ingestion continue (jusqu'à SIGINT / SIGTERM, ou fin du rattrapage avec une_fois).
+    Returns:
+        dict: Etat final de l'ingestion.
+    """
+    for _, myDossier in landing.DESTINATIONS:
+        os.makedirs(dossier_landing + myDossier, exist_ok=True)
+    base_metadata = landing.ouvrir_base_metadata(path_file_metadata)
+    connus = {os.path.basename(fichier) for fichier in base_metadata.fichiers_sources()}
+    # curated zone alignée sur la landing zone (pages ingérées hors de l'ingestion continue), puis mise à jour lot par lot
+    table_avis = None
+    if base_metadata.nb_lignes('metadata_technique') > 0:
+        curated.main(path_file_metadata, chemin_descriptives)
+        table_avis = lire_table_avis(chemin_table_avis(chemin_descriptives))
+
+    arret = threading.Event()
+    file_pages = queue.Queue(maxsize=file_max)
+    surveillance = SurveillanceSource(dossier_source, file_pages, connus, arret, scrutation, stabilite, inotify)
+    for signal_arret in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_arret, lambda *_: arret.set())
+
+    chemin_etat = Path(path_file_metadata).with_name(NOM_ETAT)
+    etat = {'mode': surveillance.mode, 'demarrage': datetime.now().isoformat(timespec='seconds'), 'nb_lots': 0,
+            'nb_pages': 0, 'nb_alias': 0, 'latence_dernier_lot_s': None, 'latence_max_s': 0.0}
+    print(f"Ingestion continue de {dossier_source} ({surveillance.mode}, lots de {taille_lot} pages max, file de {file_max})")
+    surveillance.start()
+    dernier_export = time.monotonic()
+    try:
+        while True:
+            if arret.is_set() and file_pages.empty():
+                break
+            if une_fois and surveillance.rattrapage_termine.is_set() and file_pages.empty():
+                break
+            lot = prendre_lot(file_pages, taille_lot, delai_lot)
+            if not lot:
+                continue
+
+            fichiers = [(dossier_source + "/" + nom, landing.dossier_destination(nom, dossier_landing) + "/" + nom)
+                        for nom, _ in lot]
+            premier_objet = base_metadata.prochain_object_id()
+            with etape('landing_continu'):
+                nb_alias = landing.ingerer_fichiers(base_metadata, fichiers, compression, archives, empreinte)
+                compter_lignes(len(fichiers))
+            with etape('curated_continu'):
+                table_avis, nb_lignes = curated.publier_lot(base_metadata, premier_objet, table_avis, chemin_descriptives)
+                compter_lignes(nb_lignes)
+
+            latence = time.monotonic() - min(detection for _, detection in lot)
+            etat.update({
+                'horodatage': datetime.now().isoformat(timespec='seconds'),
+                'nb_lots': etat['nb_lots'] + 1,
+                'nb_pages': etat['nb_pages'] + len(lot),
+                'nb_alias': etat['nb_alias'] + nb_alias,
+                'en_attente': file_pages.qsize(),
+                'file_max': file_max,
+                'file_saturee': surveillance.saturee,
+                'nb_saturations': surveillance.nb_saturations,
+                'latence_dernier_lot_s': round(latence, 2),
+                'latence_max_s': round(max(etat['latence_max_s'], latence), 2),
+            })
+            ecrire_etat(chemin_etat, etat)
+            print(f"Lot {etat['nb_lots']} : {len(lot)} page(s) ingérée(s) ({nb_alias} alias), "
+                  f"latence {latence:.1f}s, {etat['en_attente']} en attente")
+
+            if time.monotonic() - dernier_export >= intervalle_export:
+                base_metadata.exporter_csv_technique(path_file_metadata)
+                curated.exporter_lot(base_metadata, table_avis, chemin_descriptives)
+                dernier_export = time.monotonic()
+    finally:
+        arret.set()
+        surveillance.join(timeout=5)
+        base_metadata.exporter_csv_technique(path_file_metadata)
+        curated.exporter_lot(base_metadata, table_avis, chemin_descriptives)
+        base_metadata.fermer()
+    print(f"Ingestion continue arrêtée : {etat['nb_pages']} page(s) en {etat['nb_lots']} lot(s)")
+    return etat
+
+
+def lire_arguments():
+    parser = argparse.ArgumentParser(description='Ingestion continue des pages crawlées (landing puis curated zone)')
+    parser.add_argument('--source', default=DOSSIER_SOURCE, help='Dossier surveillé')
+    parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT, help='Nombre maximal de pages par lot')
+    parser.add_argument('--delai-lot', type=float, default=DELAI_LOT, help='Attente maximale (s) pour compléter un lot')
+    parser.add_argument('--file-max', type=int, default=FILE_MAX, help='Pages en attente au-delà desquelles la surveillance attend')
+    parser.add_argument('--scrutation', type=float, default=SCRUTATION, help='Période (s) de scrutation du dossier sans inotify')
+    parser.add_argument('--stabilite', type=float, default=STABILITE,
+                        help='Ancienneté minimale (s) de la dernière écriture d\'une page détectée par scrutation')
+    parser.add_argument('--intervalle-export', type=float, default=INTERVALLE_EXPORT,
+                        help='Période (s) de réexport de metadata_technique.csv')
+    parser.add_argument('--compression', choices=['aucune', 'gzip', 'zstd'], default='aucune',
+                        help='Compression des pages stockées (zstd : paquet zstandard requis)')
+    parser.add_argument('--archives', action='store_true', help='Regrouper les pages de chaque crawl dans une archive')
+    parser.add_argument('--empreinte', choices=['normalisee', 'brute', 'aucune'], default='normalisee',
+                        help='Dédoublonnage des pages : contenu sans balisage volatil, octets bruts, ou aucun')
+    parser.add_argument('--sans-inotify', action='store_true', help='Forcer la scrutation du dossier')
+    parser.add_argument('--une-fois', action='store_true', help='Ingérer les pages présentes puis s\'arrêter')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = lire_arguments()
+    executer(arguments.source, taille_lot=arguments.taille_lot, delai_lot=arguments.delai_lot,
+             file_max=arguments.file_max, scrutation=arguments.scrutation, stabilite=arguments.stabilite,
+             intervalle_export=arguments.intervalle_export,
+             compression=None if arguments.compression == 'aucune' else arguments.compression,
+             archives=arguments.archives, empreinte=arguments.empreinte, inotify=not arguments.sans_inotify,
+             une_fois=arguments.une_fois)
@@ -2,17 +2,37 @@
 # 02-PHASE-2_Extraction_des_donnéees_descriptives_de_la_LANDINGZONE_vers_la_CURATED-ZONE_v0.01.py
 #======================================================================================
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.filter import ElementFilter
 import csv
 import pandas as pd
 import fnmatch
 import os
 import re
 import json
+import html
+
+try:
+    import orjson
+    charger_json = orjson.loads
+except ImportError:  # décodeur de la bibliothèque standard à défaut
+    charger_json = json.loads
+
+from ETL.instrumentation import instrumenter, etape, compter_lignes, definir_taille_lue
+from ETL.base_metadata import BaseMetadata, analyser_nom_fichier
+from ETL.cache_extraction import CacheExtraction
+from ETL.stockage_pages import ouvrir_page, lire_octets_page, lire_texte_page, taille_stockee
+from ETL.reprise_extraction import JournalReprise
+from ETL.table_avis import construire_table_avis, ecrire_table_avis, chemin_a_cote_de as chemin_table_avis
+
+# Les extracteurs reçoivent le chemin logique .html : les octets lus sont ceux de son stockage
+# (page compressée ou entrée d'archive), comme pour un fichier en clair
+definir_taille_lue(taille_stockee)
 
 #==============================================================================
 #-- GLASSDOOR (AVIS) : Fonction renvoyant <Nom_entreprise>
 #==============================================================================
+@instrumenter
 def extraire_nom_entreprise_AVI(objet_html: BeautifulSoup):
     """
     Extrait le nom de l'entreprise depuis la page d'avis Glassdoor
@@ -34,6 +54,7 @@ def extraire_nom_entreprise_AVI(objet_html: BeautifulSoup):
 #==============================================================================
 #-- GLASSDOOR (AVIS) : Fonction renvoyant <Note_moy_entreprise>
 #==============================================================================
+@instrumenter
 def extraire_note_moy_entreprise_AVI(objet_html):
     """
     Extrait la note moyenne de l'entreprise depuis la page d'avis Glassdoor
@@ -79,6 +100,7 @@ def extraire_note_moy_entreprise_AVI(objet_html):
 #                      des employés contenu dans la page web des avis société
 #==============================================================================
 
+@instrumenter
 def extraire_liste_avis_employes_sur_entreprise_AVI(objet_parser_html):
     #------------------------------------------------------------------------------
     # Traitement de sortie si pas de page trouvee à l’URL
@@ -100,7 +122,7 @@ def extraire_liste_avis_employes_sur_entreprise_AVI(objet_parser_html):
             else:
                 liste_de_page_web.append(['"'+str(x)+'"'])
 
-            objet_html_2 = BeautifulSoup(str(texte_tmp[x]), 'html.parser')
+            objet_html_2 = texte_tmp[x]
 
             #----------------------------------------------------------------------
             #-- 2 - Date de l’avis
@@ -176,13 +198,51 @@ def extraire_liste_avis_employes_sur_entreprise_AVI(objet_parser_html):
             else:
                 liste_de_page_web[x].append('NULL')
 
+            # Fiche traitée : son sous-arbre est libéré immédiatement
+            objet_html_2.decompose()
+
     return liste_de_page_web
 
 
+#==============================================================================
+#-- GLASSDOOR (AVIS) : Analyse limitée aux régions utiles de la page
+#==============================================================================
+class FiltreRegionsAvis(ElementFilter):
+    """
+    Filtre d'analyse (parse_only) des pages d'avis Glassdoor : seules sont créées
+    les balises lues par les extracteurs AVI, avec tout leur contenu :
+    - le nom de l'entreprise (span#DivisionsDropdownComponent) ;
+    - les blocs de note (div / span dont une classe contient « rating ») ;
+    - les fiches d'avis (li.empReview).
+    Navigation, scripts, publicités et JSON embarqués ne sont pas construits.
+    """
+    @property
+    def includes_everything(self):
+        return False
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        attrs = attrs or {}
+        classes = attrs.get('class') or ''
+        if not isinstance(classes, str):
+            classes = ' '.join(classes)
+        if name == 'span' and attrs.get('id') == 'DivisionsDropdownComponent':
+            return True
+        if name in ('div', 'span') and 'rating' in classes:
+            return True
+        return name == 'li' and 'empReview' in classes.split()
+
+    def allow_string_creation(self, string):
+        # texte hors des balises retenues
+        return False
+
+FILTRE_REGIONS_AVIS = FiltreRegionsAvis()
+
+
 #======================================================================================
 #-- GLASSDOOR (SOC) : Fonctions renvoyant nom de l'entreprise, ville, taille, secteur
 #======================================================================================
 
+@instrumenter
 def extraire_nom_entreprise_SOC(objet_html):
     """
     Extrait le nom de l'entreprise depuis la page d'informations Glassdoor
@@ -200,6 +260,7 @@ def extraire_nom_entreprise_SOC(objet_html):
         r'\2', texte_tmp)
     return(resultat)
 
+@instrumenter
 def extraire_ville_entreprise_SOC(objet_html):
     """
     Extrait la ville de l'entreprise depuis la page d'informations Glassdoor
@@ -218,6 +279,7 @@ def extraire_ville_entreprise_SOC(objet_html):
         resultat = texte_tmp_1
     return(resultat)
 
+@instrumenter
 def extraire_taille_entreprise_SOC(objet_html):
     """
     Extrait la taille de l'entreprise depuis la page d'informations Glassdoor
@@ -236,6 +298,7 @@ def extraire_taille_entreprise_SOC(objet_html):
         resultat = texte_tmp_1
     return(resultat)
 
+@instrumenter
 def extraire_secteur_entreprise_SOC(objet_html):
     """
     Extrait le secteur de l'entreprise depuis la page d'informations Glassdoor
@@ -254,9 +317,38 @@ def extraire_secteur_entreprise_SOC(objet_html):
         resultat = texte_tmp_1
     return(resultat)
 
+# Parsing limité au titre (h1) et aux blocs infoEntity de la page INFO-SOC
+FILTRE_INFOS_SOC = SoupStrainer(['h1', 'div'], class_=re.compile(r'(^|\s)(tightAll|infoEntity)(\s|$)'))
+
+@instrumenter
+def extraire_infos_entreprise_SOC(texte_html):
+    """
+    Extrait en une seule passe le nom de l'entreprise et tous les blocs infoEntity
+    (Site Web, Siège social, Taille, Fondé en, Type, Secteur, Revenu...) d'une page
+    d'informations Glassdoor, indexés par leur libellé plutôt que par leur position
+    Args:
+        texte_html (str): Contenu HTML de la page
+    Returns:
+        dict: {'nom_entreprise': nom, <libellé>: valeur, ...} ('NULL' si le nom n'est pas trouvé)
+    """
+    soup = BeautifulSoup(texte_html, 'html.parser', parse_only=FILTRE_INFOS_SOC)
+    infos = {'nom_entreprise': 'NULL'}
+    titre = soup.find('h1', attrs={'class': "strong tightAll"})
+    if titre is not None and titre.span is not None and titre.span.contents:
+        infos['nom_entreprise'] = str(titre.span.contents[0])
+    for bloc in soup.find_all('div', attrs={'class': "infoEntity"}):
+        libelle = bloc.find('label')
+        valeur = bloc.find('span')
+        if libelle is None:
+            continue
+        infos[libelle.get_text(strip=True)] = str(valeur.contents[0]) if valeur is not None and valeur.contents else 'NULL'
+    soup.decompose()
+    return infos
+
 #==============================================================================
 #-- LINKEDIN (EMP) : Fonctions renvoyant nom de l'entreprise, ville, taille
 #==============================================================================
+@instrumenter
 def extraire_libelle_emploi_EMP(objet_html):
     """
     Extrait le libellé de l'offre d'emploi depuis la page LinkedIn
@@ -275,6 +367,7 @@ def extraire_libelle_emploi_EMP(objet_html):
             resultat = texte_tmp
     return(resultat)
 
+@instrumenter
 def extraire_nom_entreprise_EMP(objet_html):
     """
     Extrait le nom de l'entreprise depuis la page LinkedIn
@@ -295,6 +388,7 @@ def extraire_nom_entreprise_EMP(objet_html):
             resultat = texte_tmp
     return(resultat)
 
+@instrumenter
 def extraire_ville_emploi_EMP (objet_html):
     """
     Extrait la ville de l'offre d'emploi depuis la page LinkedIn
@@ -314,6 +408,7 @@ def extraire_ville_emploi_EMP (objet_html):
             resultat = texte_tmp
     return(resultat)
 
+@instrumenter
 def extraire_texte_emploi_EMP (objet_html):
     """
     Extrait le texte de l'offre d'emploi depuis la page LinkedIn
@@ -333,6 +428,7 @@ def extraire_texte_emploi_EMP (objet_html):
             resultat = texte_tmp
     return(resultat)
 
+@instrumenter
 def extraire_niveau_hierarchique_emploi_EMP (objet_html):
     """
     Extrait le niveau hiérarchique de l'offre d'emploi depuis la page LinkedIn
@@ -352,6 +448,7 @@ def extraire_niveau_hierarchique_emploi_EMP (objet_html):
             resultat = texte_tmp
     return(resultat)
 
+@instrumenter
 def extraire_date_posted_EMP(soup):
     try:
         # Trouver la balise <script> contenant le JSON-LD
@@ -368,243 +465,582 @@ def extraire_date_posted_EMP(soup):
         return 'NULL'
 
 
-############################################################################
-# Utilisation des fonctions d'extraction pour lire les fichiers HTML dans la curated zone
-############################################################################
-
-# Lecture des métadonnées techniques pour obtenir la liste des fichiers cibles
-metadonnees_techniques = "./DATALAKE/00_METADATA/metadata_technique.csv"
-
-# Chargement des métadonnées techniques dans un DataFrame pandas pour récupérer les fichiers cibles
-df_metadata_techniques= pd.read_csv(metadonnees_techniques, sep=';', encoding='utf-8')
-df_metadata_techniques = df_metadata_techniques[df_metadata_techniques['colonne']=='fichier_cible']
-
-# Initialisation des listes pour stocker les chemins des fichiers HTML
-fichiers_glassdoor_societe_info = []
-fichiers_linkedin_emp_info = []
-fichiers_glassdoor_societe_avis = []
-
-#Pour chaque fichier cible listé dans les métadonnées techniques lire le contenu HTML
-for index, row in df_metadata_techniques.iterrows():
-    chemin_du_fichier_html = row['valeur']
+#==============================================================================
+#-- LINKEDIN (EMP) : lecture directe du bloc JSON-LD JobPosting
+#==============================================================================
+DEBUT_JSONLD = b'<script type="application/ld+json">'
+FIN_JSONLD = b'</script>'
+
+# Champs d'une offre et extracteur DOM utilisé quand le JSON-LD ne les fournit pas
+EXTRACTEURS_DOM_EMP = {
+    'libelle_emploi': extraire_libelle_emploi_EMP,
+    'entreprise': extraire_nom_entreprise_EMP,
+    'ville': extraire_ville_emploi_EMP,
+    'texte': extraire_texte_emploi_EMP,
+    'niveau_hierarchique': extraire_niveau_hierarchique_emploi_EMP,
+    'date_posted': extraire_date_posted_EMP,
+}
+
+@instrumenter
+def lire_octets_html(chemin_du_fichier_html):
+    """
+    Lit le contenu brut (octets) d'un fichier HTML de la landing zone, décompressé
+    à la lecture si la page est stockée compressée (ETL/stockage_pages.py)
+    Args:
+        chemin_du_fichier_html (str): Chemin du fichier HTML
+    Returns:
+        bytes: Contenu de la page
+    """
+    return lire_octets_page(chemin_du_fichier_html)
 
-    # CONSTRUIRE 3 listes en fonction du type des fichiers INFO-SOC, AVIS-SOC, INFO-EMP
-    if fnmatch.fnmatch(chemin_du_fichier_html, "*INFO-SOC-GLASSDOOR*.html"):
-        fichiers_glassdoor_societe_info.append(chemin_du_fichier_html)
-    elif fnmatch.fnmatch(chemin_du_fichier_html, "*AVIS-SOC-GLASSDOOR*.html"):
-        fichiers_glassdoor_societe_avis.append(chemin_du_fichier_html)
-    elif fnmatch.fnmatch(chemin_du_fichier_html, "*INFO-EMP-LINKEDIN*.html"):
-        fichiers_linkedin_emp_info.append(chemin_du_fichier_html)
+@instrumenter
+def extraire_jsonld_EMP(octets_html):
+    """
+    Découpe le bloc <script type="application/ld+json"> dans les octets de la page,
+    sans construire de DOM, et le décode
+    Args:
+        octets_html (bytes): Contenu brut de la page LinkedIn
+    Returns:
+        dict: Objet JobPosting ({} si le bloc est absent ou illisible)
+    """
+    debut = octets_html.find(DEBUT_JSONLD)
+    if debut < 0:
+        return {}
+    debut += len(DEBUT_JSONLD)
+    fin = octets_html.find(FIN_JSONLD, debut)
+    if fin < 0:
+        return {}
+    try:
+        donnees = charger_json(octets_html[debut:fin])
+    except ValueError as e:
+        print("Erreur lors de la lecture du JSON-LD :", e)
+        return {}
+    return donnees if isinstance(donnees, dict) else {}
 
-    objet_fichier_html = open(chemin_du_fichier_html, "r", encoding="utf8")
-    texte_source_html = objet_fichier_html.read()
-    objet_fichier_html.close()
+def texte_depuis_html(fragment):
+    """Texte brut d'un fragment HTML (description du JSON-LD) : balises retirées, entités décodées"""
+    return html.unescape(re.sub(r'<[^>]+>', '', fragment))
 
+def champs_jsonld_EMP(donnees):
+    """
+    Champs d'une offre fournis par le JSON-LD JobPosting ; les champs absents ou vides valent None
+    Args:
+        donnees (dict): Objet JobPosting décodé
+    Returns:
+        dict: libelle_emploi, entreprise, ville, texte, niveau_hierarchique, date_posted, type_contrat
+    """
+    organisation = donnees.get('hiringOrganization')
+    lieu = donnees.get('jobLocation')
+    if isinstance(lieu, list):
+        lieu = lieu[0] if lieu else None
+    adresse = lieu.get('address') if isinstance(lieu, dict) else None
+    ville = None
+    if isinstance(adresse, dict) and adresse.get('addressLocality'):
+        ville = ', '.join(v for v in (adresse.get('addressLocality'), adresse.get('addressCountry')) if v)
+    description = donnees.get('description')
+
+    champs = {
+        'libelle_emploi': donnees.get('title'),
+        'entreprise': organisation.get('name') if isinstance(organisation, dict) else None,
+        'ville': ville,
+        'texte': texte_depuis_html(description) if isinstance(description, str) else None,
+        'niveau_hierarchique': donnees.get('experienceRequirements'),
+        'date_posted': donnees.get('datePosted'),
+        'type_contrat': donnees.get('employmentType'),
+    }
+    return {cle: valeur if isinstance(valeur, str) and valeur.strip() else None for cle, valeur in champs.items()}
 
 
 ############################################################################
-# Parcours des fichiers HTML d'informations sur les sociétés sur Glassdoor
+# Utilisation des fonctions d'extraction pour lire les fichiers HTML dans la curated zone
 ############################################################################
 
-liste_entreprise = []
-liste_ville_entreprise = []
-liste_taille_entreprise = []
-liste_secteur_entreprise = []
-
-
-for fichier_html in fichiers_glassdoor_societe_info:
-    # Ouvrir le fichier HTML
-    objet_fichier_html = open(fichier_html, "r", encoding="utf8")
-    texte_source_html = objet_fichier_html.read()
-    objet_fichier_html.close()
+# Chemins des fichiers de métadonnées
+METADONNEES_TECHNIQUES = "./DATALAKE/00_METADATA/metadata_technique.csv"
+METADONNEES_DESCRIPTIVES = './DATALAKE/00_METADATA/metadata_descriptives.csv'
 
-    # Lire les fichiers HTML
-    soup = BeautifulSoup(texte_source_html, 'html.parser')
-
-    # Extraction des noms des entreprises
-    nom_entreprise = extraire_nom_entreprise_SOC(soup)
-    liste_entreprise.append(nom_entreprise)
-
-    #extraction des villes des entreprises
-    ville_entreprise = extraire_ville_entreprise_SOC(soup)
-    liste_ville_entreprise.append(ville_entreprise)
-
-    #extraction des tailles des entreprises
-    taille_entreprise = extraire_taille_entreprise_SOC(soup)
-    liste_taille_entreprise.append(taille_entreprise)
+@instrumenter
+def lire_fichier_html(chemin_du_fichier_html):
+    """
+    Lit un fichier HTML de la landing zone et le parse avec BeautifulSoup
+    Args:
+        chemin_du_fichier_html (str): Chemin du fichier HTML
+    Returns:
+        BeautifulSoup: Objet BeautifulSoup de la page
+    """
+    return BeautifulSoup(lire_texte_html(chemin_du_fichier_html), 'html.parser')
 
-    #extraction des secteurs des entreprises
-    secteur_entreprise = extraire_secteur_entreprise_SOC(soup)
-    liste_secteur_entreprise.append(secteur_entreprise)
+@instrumenter
+def lire_texte_html(chemin_du_fichier_html):
+    """
+    Lit le contenu texte d'un fichier HTML de la landing zone, décompressé à la
+    lecture si la page est stockée compressée (ETL/stockage_pages.py)
+    Args:
+        chemin_du_fichier_html (str): Chemin du fichier HTML
+    Returns:
+        str: Contenu HTML de la page
+    """
+    return lire_texte_page(chemin_du_fichier_html)
 
-    
+def lister_fichiers_cibles(metadonnees_techniques=METADONNEES_TECHNIQUES):
+    """
+    Construit les listes de fichiers INFO-SOC, AVIS-SOC et INFO-EMP à partir des métadonnées techniques
+    (un fichier par contenu distinct : les alias sont exclus)
+    Args:
+        metadonnees_techniques (str): Chemin du fichier de métadonnées techniques
+    Returns:
+        tuple: (fichiers INFO-SOC, fichiers AVIS-SOC, fichiers INFO-EMP)
+    """
+    # Lecture indexée dans la base de métadonnées quand elle existe
+    if BaseMetadata.existe_a_cote_de(metadonnees_techniques):
+        with BaseMetadata.a_cote_de(metadonnees_techniques) as base_metadata:
+            if base_metadata.nb_lignes('metadata_technique') > 0:
+                return (base_metadata.fichiers_cibles('GLASSDOOR_SOC'), base_metadata.fichiers_cibles('GLASSDOOR_AVIS'),
+                        base_metadata.fichiers_cibles('LINKEDIN_EMP'))
+
+    # Chargement des métadonnées techniques dans un DataFrame pandas pour récupérer les fichiers cibles
+    df_metadata_techniques= pd.read_csv(metadonnees_techniques, sep=';', encoding='utf-8')
+    # Les alias (contenu déjà stocké sous un autre fichier) ne sont pas réanalysés
+    objets_alias = df_metadata_techniques.loc[df_metadata_techniques['colonne']=='alias_de', 'object_id']
+    df_metadata_techniques = df_metadata_techniques[(df_metadata_techniques['colonne']=='fichier_cible')
+                                                    & ~df_metadata_techniques['object_id'].isin(objets_alias)]
+
+    # Initialisation des listes pour stocker les chemins des fichiers HTML
+    fichiers_glassdoor_societe_info = []
+    fichiers_linkedin_emp_info = []
+    fichiers_glassdoor_societe_avis = []
+
+    #Pour chaque fichier cible listé dans les métadonnées techniques
+    for chemin_du_fichier_html in df_metadata_techniques['valeur']:
+        # CONSTRUIRE 3 listes en fonction du type des fichiers INFO-SOC, AVIS-SOC, INFO-EMP
+        if fnmatch.fnmatch(chemin_du_fichier_html, "*INFO-SOC-GLASSDOOR*.html"):
+            fichiers_glassdoor_societe_info.append(chemin_du_fichier_html)
+        elif fnmatch.fnmatch(chemin_du_fichier_html, "*AVIS-SOC-GLASSDOOR*.html"):
+            fichiers_glassdoor_societe_avis.append(chemin_du_fichier_html)
+        elif fnmatch.fnmatch(chemin_du_fichier_html, "*INFO-EMP-LINKEDIN*.html"):
+            fichiers_linkedin_emp_info.append(chemin_du_fichier_html)
+
+    return fichiers_glassdoor_societe_info, fichiers_glassdoor_societe_avis, fichiers_linkedin_emp_info
 
-#print("Nom de l'entreprise extraite : ", liste_entreprise)
-#print("Ville de l'entreprise extraite : ", liste_ville_entreprise)
-#print("Taille de l'entreprise extraite : ", liste_taille_entreprise)
-#print("Secteur de l'entreprise extraite : ", liste_secteur_entreprise)
 
+############################################################################
+# Parcours des fichiers HTML d'informations sur les sociétés sur Glassdoor
+############################################################################
+@instrumenter
+def extraire_fichier_SOC(fichier_html):
+    infos = extraire_infos_entreprise_SOC(lire_texte_html(fichier_html))
+    return {
+        'nom_entreprise': infos['nom_entreprise'],
+        'ville': infos.get('Siège social', 'NULL'),
+        'taille': infos.get('Taille', 'NULL'),
+        'secteur': infos.get('Secteur', 'NULL'),
+    }
 
 ############################################################################
 # Parcours des fichiers HTML d'informations sur les avis sur Glassdoor
 ############################################################################
-liste_entreprise_avis = []
-liste_note_moy_entreprise = []
-liste_avis = []
-
-for fichier_html in fichiers_glassdoor_societe_avis:
-    # Ouvrir le fichier HTML
-    objet_fichier_html = open(fichier_html, "r", encoding="utf8")
-    texte_source_html = objet_fichier_html.read()
-    objet_fichier_html.close()
-
-    # Lire les fichiers HTML
-    soup = BeautifulSoup(texte_source_html, 'html.parser')
-
-    # Extraction des noms des entreprises
-    nom_entreprise_avi = extraire_nom_entreprise_AVI(soup)
-    liste_entreprise_avis.append(nom_entreprise_avi)
-    note_moy_entreprise_avi = extraire_note_moy_entreprise_AVI(soup)
-    liste_note_moy_entreprise.append(note_moy_entreprise_avi)
-
-    # Extraction des avis des employés sur l'entreprise
-    avis_employes = extraire_liste_avis_employes_sur_entreprise_AVI(soup)
-    liste_avis.append(avis_employes)
+# 'regions' : seules l'en-tête (nom, note) et les fiches li.empReview sont analysées
+# 'complet' : la page entière est analysée
+MODE_AVI = 'regions'
+
+@instrumenter
+def extraire_fichier_AVI(fichier_html, mode=MODE_AVI):
+    if mode == 'complet':
+        soup = lire_fichier_html(fichier_html)
+    else:
+        soup = BeautifulSoup(lire_texte_html(fichier_html), 'html.parser', parse_only=FILTRE_REGIONS_AVIS)
+    avi = {
+        'nom_entreprise': extraire_nom_entreprise_AVI(soup),
+        'note_moy_entreprise': extraire_note_moy_entreprise_AVI(soup),
+        # Extraction des avis des employés sur l'entreprise
+        'avis': extraire_liste_avis_employes_sur_entreprise_AVI(soup),
+    }
+    soup.decompose()
+    return avi
+
+# Pages suivantes d'un employeur : seules les fiches d'avis sont analysées
+FILTRE_FICHES_AVIS = SoupStrainer('li', class_=re.compile(r'(^|\s)empReview(\s|$)'))
+
+@instrumenter
+def extraire_avis_page_AVI(fichier_html, mode=MODE_AVI):
+    """
+    Extrait les avis d'une page suivante (P2, P3...) : le nom et la note moyenne de
+    l'entreprise sont lus une seule fois, sur la première page de l'employeur
+    Args:
+        fichier_html (str): Chemin de la page d'avis
+        mode (str): 'regions' ou 'complet'
+    Returns:
+        dict: {'avis': liste des avis de la page}
+    """
+    if mode == 'complet':
+        soup = lire_fichier_html(fichier_html)
+    else:
+        soup = BeautifulSoup(lire_texte_html(fichier_html), 'html.parser', parse_only=FILTRE_FICHES_AVIS)
+    avi = {'avis': extraire_liste_avis_employes_sur_entreprise_AVI(soup)}
+    soup.decompose()
+    return avi
 
-#print("Nom de l'entreprise extraite (AVIS) : ", liste_entreprise_avis)
-#print("Note moyenne de l'entreprise extraite (AVIS) : ", liste_note_moy_entreprise)
-#print("Liste des avis des employés sur l'entreprise extraite (AVIS) : ", liste_avis)
+def regrouper_pages_AVI(fichiers_avi):
+    """
+    Regroupe les pages d'avis par identifiant employeur (nom du fichier), triées par
+    numéro de page puis par crawl
+    Args:
+        fichiers_avi (list): Chemins des pages AVIS-SOC
+    Returns:
+        tuple: (première page de chaque employeur, pages suivantes)
+    """
+    groupes = {}
+    for fichier_html in fichiers_avi:
+        champs = analyser_nom_fichier(fichier_html)
+        if champs is None:
+            # nom hors format : la page forme son propre groupe
+            groupes[fichier_html] = [((0, 0), fichier_html)]
+            continue
+        groupes.setdefault(champs['id_source'], []).append(((champs['page'] or 0, champs['id_crawl']), fichier_html))
+
+    premieres_pages, pages_suivantes = [], []
+    for pages in groupes.values():
+        pages.sort(key=lambda page: page[0])
+        premieres_pages.append(pages[0][1])
+        pages_suivantes.extend(fichier_html for _, fichier_html in pages[1:])
+    return premieres_pages, pages_suivantes
+
+def fusionner_avis_par_employeur(liste_premieres, liste_suivantes):
+    """
+    Construit un enregistrement par employeur : en-tête de sa première page et avis de
+    toutes ses pages, dans l'ordre des pages. Un avis déjà lu dans un autre crawl du même
+    employeur n'est gardé qu'une fois ; deux avis identiques d'un même crawl (avis anonymes
+    sans texte de la même date, par exemple) sont tous gardés
+    Args:
+        liste_premieres (list): Enregistrements des premières pages (nom, note, avis, id_source, id_crawl)
+        liste_suivantes (list): Enregistrements des pages suivantes (avis, id_source, id_crawl)
+    Returns:
+        list: Enregistrements AVI, un par employeur, avec nb_pages
+    """
+    par_employeur = {}
+    employeurs = []
+    for avi in liste_premieres:
+        fusion = {**avi, 'avis': [], 'nb_pages': 0}
+        fusion.pop('page', None)
+        fusion.pop('id_crawl', None)
+        cle = avi.get('id_source') or id(fusion)
+        par_employeur[cle] = (fusion, {})
+        employeurs.append(fusion)
+        ajouter_avis_page(fusion, par_employeur[cle][1], avi['avis'], avi.get('id_crawl'))
+
+    for avi in liste_suivantes:
+        cle = avi.get('id_source')
+        if cle not in par_employeur:
+            # première page en quarantaine : l'en-tête reste inconnu
+            fusion = {'nom_entreprise': 'NULL', 'note_moy_entreprise': 'NULL', 'avis': [], 'id_source': cle, 'nb_pages': 0}
+            par_employeur[cle] = (fusion, {})
+            employeurs.append(fusion)
+        fusion, deja_vus = par_employeur[cle]
+        ajouter_avis_page(fusion, deja_vus, avi['avis'], avi.get('id_crawl'))
+
+    for fusion in employeurs:
+        fusion['nb_pages'] = str(fusion['nb_pages'])
+    return employeurs
+
+def ajouter_avis_page(fusion, deja_vus, avis_page, id_crawl):
+    """
+    Ajoute les avis d'une page à l'enregistrement de l'employeur. Le rang de l'avis dans la
+    page est ignoré pour les doublons ; un avis n'est écarté que s'il a déjà été lu autant
+    de fois dans un autre crawl (les avis identiques d'un même crawl sont distincts)
+    Args:
+        fusion (dict): Enregistrement de l'employeur en cours de construction
+        deja_vus (dict): Signature de l'avis -> {id_crawl: nombre d'occurrences lues}
+        avis_page (list): Avis de la page
+        id_crawl (str | None): Crawl de la page
+    """
+    fusion['nb_pages'] += 1
+    for avis in avis_page:
+        par_crawl = deja_vus.setdefault(tuple(avis[1:]), {})
+        par_crawl[id_crawl] = par_crawl.get(id_crawl, 0) + 1
+        autres_crawls = max((nb for crawl, nb in par_crawl.items() if crawl != id_crawl), default=0)
+        if par_crawl[id_crawl] > autres_crawls:
+            fusion['avis'].append(avis)
 
 #############################################################################
 # Parcours des fichiers HTML d'informations sur les offres d'emplois LinkedIn
 #############################################################################
-liste_libelle_emploi = []
-liste_entreprise_emp = []
-liste_ville_emploi = []
-liste_texte_emploi = []
-liste_niveau_hierarchique_emploi = []
-liste_date_posted = []
-
-for fichier_html in fichiers_linkedin_emp_info:
-    # Ouvrir le fichier HTML
-    objet_fichier_html = open(fichier_html, "r", encoding="utf8")
-    texte_source_html = objet_fichier_html.read()
-    objet_fichier_html.close()
-
-    # Lire les fichiers HTML
-    soup = BeautifulSoup(texte_source_html, 'html.parser')
-
-    # Extraction des libellés des emplois
-    libelle_emploi = extraire_libelle_emploi_EMP(soup)
-    liste_libelle_emploi.append(libelle_emploi)
+# 'jsonld' : champs lus dans le bloc JSON-LD, DOM construit seulement pour les champs manquants
+# 'dom'    : extraction historique, tous les champs lus dans l'arbre BeautifulSoup
+MODE_EMP = 'jsonld'
+
+@instrumenter
+def extraire_fichier_EMP(fichier_html, mode=MODE_EMP):
+    if mode == 'dom':
+        soup = lire_fichier_html(fichier_html)
+        emp = {champ: extracteur(soup) for champ, extracteur in EXTRACTEURS_DOM_EMP.items()}
+        emp['type_contrat'] = 'NULL'
+        soup.decompose()
+        return emp
+
+    octets_html = lire_octets_html(fichier_html)
+    emp = champs_jsonld_EMP(extraire_jsonld_EMP(octets_html))
+    manquants = [champ for champ in EXTRACTEURS_DOM_EMP if emp[champ] is None]
+    if manquants:
+        soup = BeautifulSoup(octets_html.decode('utf8'), 'html.parser')
+        for champ in manquants:
+            emp[champ] = EXTRACTEURS_DOM_EMP[champ](soup)
+        soup.decompose()
+    if emp['type_contrat'] is None:
+        emp['type_contrat'] = 'NULL'
+    return emp
 
-    # Extraction des noms des entreprises
-    nom_entreprise_emp = extraire_nom_entreprise_EMP(soup)
-    liste_entreprise_emp.append(nom_entreprise_emp)
 
-    # Extraction des villes des emplois
-    ville_emploi = extraire_ville_emploi_EMP(soup)
-    liste_ville_emploi.append(ville_emploi)
-
-    # Extraction des textes des emplois
-    texte_emploi = extraire_texte_emploi_EMP(soup)
-    liste_texte_emploi.append(texte_emploi)
-
-    # Extraction des niveaux hiérarchiques des emplois
-    niveau_hierarchique_emploi = extraire_niveau_hierarchique_emploi_EMP(soup)
-    liste_niveau_hierarchique_emploi.append(niveau_hierarchique_emploi)
-
-    #extraction des dates posted des emplois
-    date_posted = extraire_date_posted_EMP(soup)
-    liste_date_posted.append(date_posted)
+#======================================================================================
+#-- Cache des enregistrements extraits
+#======================================================================================
+# Version de chaque extracteur : à incrémenter quand ce qu'il produit change,
+# pour que les enregistrements déjà en cache soient recalculés
+VERSIONS_EXTRACTEURS = {'SOC': 1, 'AVI': 1, 'AVI_SUITE': 1, 'EMP': 1}
 
-#print("Libellé des emplois extraits : ", liste_libelle_emploi)
-#print("Nom de l'entreprise extraite (EMP) : ", liste_entreprise_emp)
-#print("Ville des emplois extraits : ", liste_ville_emploi)
-#print("Texte des emplois extraits : ", liste_texte_emploi)
-#print("Niveau hiérarchique des emplois extraits : ", liste_niveau_hierarchique_emploi)
+def extraire_avec_cache(cache, type_page, extracteur, fichier_html, mode=None):
+    """
+    Renvoie l'enregistrement d'une page depuis le cache, ou l'extrait et le met en cache
+    Args:
+        cache (CacheExtraction | None): Cache à utiliser (None : extraction directe)
+        type_page (str): 'SOC', 'AVI' ou 'EMP'
+        extracteur (callable): extraire_fichier_SOC / _AVI / _EMP
+        fichier_html (str): Chemin de la page
+        mode (str | None): Mode d'extraction passé à l'extracteur (fait partie de la version)
+    Returns:
+        dict: Enregistrement extrait
+    """
+    arguments = (fichier_html,) if mode is None else (fichier_html, mode)
+    if cache is None:
+        return extracteur(*arguments)
+    version = f'{type_page}-v{VERSIONS_EXTRACTEURS[type_page]}' + (f'-{mode}' if mode else '')
+    empreinte = cache.empreinte_flux(ouvrir_page(fichier_html))
+    enregistrement = cache.lire(empreinte, version)
+    if enregistrement is None:
+        enregistrement = extracteur(*arguments)
+        cache.ecrire(empreinte, version, enregistrement)
+    return enregistrement
+
+
+def identifiants_fichier(fichier_html):
+    """
+    Identifiants stables portés par le nom de la page : id_source (employeur Glassdoor E12966,
+    offre LinkedIn FR-1599984246), crawl et numéro de page ({} si le nom ne suit pas le format)
+    """
+    champs = analyser_nom_fichier(fichier_html)
+    if champs is None:
+        return {}
+    identifiants = {'id_source': champs['id_source'], 'id_crawl': str(champs['id_crawl'])}
+    if champs['page'] is not None:
+        identifiants['page'] = str(champs['page'])
+    return identifiants
+
+def extraire_pages(type_page, fichiers, extracteur, journal, cache=None, mode=None):
+    """
+    Extrait une liste de pages en journalisant chaque page traitée (point de reprise).
+    Les pages déjà présentes dans le journal ne sont pas retraitées ; une page en erreur
+    est mise en quarantaine et ne bloque pas les suivantes
+    Args:
+        type_page (str): 'SOC', 'AVI' ou 'EMP'
+        fichiers (list): Chemins des pages
+        extracteur (callable): extraire_fichier_SOC / _AVI / _EMP
+        journal (JournalReprise): Journal de reprise de l'exécution
+        cache (CacheExtraction | None): Cache des enregistrements extraits
+        mode (str | None): Mode d'extraction passé à l'extracteur
+    Returns:
+        list: Enregistrements extraits, dans l'ordre des fichiers (pages en quarantaine exclues)
+    """
+    enregistrements = []
+    for fichier_html in fichiers:
+        if not journal.deja_traite(type_page, fichier_html):
+            try:
+                journal.ajouter(type_page, fichier_html, extraire_avec_cache(cache, type_page, extracteur, fichier_html, mode))
+            except Exception as e:
+                journal.mettre_en_quarantaine(type_page, fichier_html, e)
+        enregistrement = journal.enregistrement(type_page, fichier_html)
+        if enregistrement is not None:
+            enregistrements.append({**enregistrement, **identifiants_fichier(fichier_html)})
+    return enregistrements
 
 
 #======================================================================================
 #-- Création du fichier de métadonnées descriptives
 #======================================================================================
+def lignes_identifiants(objet_id, type_fichier, enregistrement):
+    """Lignes id_source / page d'un enregistrement (identifiants tirés du nom de la page)"""
+    return [{'OBJECT_ID': objet_id, 'TYPE_FICHIER': type_fichier, 'colonne': colonne, 'valeur': enregistrement[colonne]}
+            for colonne in ['id_source', 'page', 'nb_pages'] if colonne in enregistrement]
 
-donnees_finales = []
-objet_id = 1
-
-# ======================================================================
-# GLASSDOOR SOC (informations sur les sociétés)
-# ======================================================================
-for i in range(len(liste_entreprise)):
-    donnees_finales.extend([
-        {'OBJECT_ID': objet_id, 'TYPE_FICHIER': 'GLASSDOOR_SOC', 'colonne': 'nom_entreprise', 'valeur': liste_entreprise[i]},
-        {'OBJECT_ID': objet_id, 'TYPE_FICHIER': 'GLASSDOOR_SOC', 'colonne': 'ville', 'valeur': liste_ville_entreprise[i]},
-        {'OBJECT_ID': objet_id, 'TYPE_FICHIER': 'GLASSDOOR_SOC', 'colonne': 'taille', 'valeur': liste_taille_entreprise[i]},
-        {'OBJECT_ID': objet_id, 'TYPE_FICHIER': 'GLASSDOOR_SOC', 'colonne': 'secteur', 'valeur': liste_secteur_entreprise[i]},
-    ])
-    objet_id += 1
-
-
-# ======================================================================
-# LINKEDIN EMP (offres d'emploi)
-# ======================================================================
-for i in range(len(liste_libelle_emploi)):
-    donnees_finales.extend([
-        {'OBJECT_ID': objet_id, 'TYPE_FICHIER': 'LINKEDIN_EMP', 'colonne': 'libelle_emploi', 'valeur': liste_libelle_emploi[i]},
-        {'OBJECT_ID': objet_id, 'TYPE_FICHIER': 'LINKEDIN_EMP', 'colonne': 'entreprise', 'valeur': liste_entreprise_emp[i]},
-        {'OBJECT_ID': objet_id, 'TYPE_FICHIER': 'LINKEDIN_EMP', 'colonne': 'ville', 'valeur': liste_ville_emploi[i]},
-        {'OBJECT_ID': objet_id, 'TYPE_FICHIER': 'LINKEDIN_EMP', 'colonne': 'texte', 'valeur': liste_texte_emploi[i]},
-        {'OBJECT_ID': objet_id, 'TYPE_FICHIER': 'LINKEDIN_EMP', 'colonne': 'niveau_hierarchique', 'valeur': liste_niveau_hierarchique_emploi[i]},
-        {'OBJECT_ID': objet_id, 'TYPE_FICHIER': 'LINKEDIN_EMP', 'colonne': 'date_posted', 'valeur': liste_date_posted[i]},
-
-    ])
-    objet_id += 1
-
-
-# ======================================================================
-# GLASSDOOR AVIS (avis employés)
-# ======================================================================
-for i in range(len(liste_entreprise_avis)):
-    nom = liste_entreprise_avis[i]
-    note = liste_note_moy_entreprise[i]
-    avis_list = liste_avis[i]
-
-    avis_json = {}
-    if avis_list:
-        for j, avis in enumerate(avis_list, start=1):
-            date_avis = avis[1] if len(avis) > 1 else 'NULL'
-            note_avis = avis[2] if len(avis) > 2 else 'NULL'
-            texte_avis = avis[5] if len(avis) > 5 else 'NULL'
-            avantages = avis[6] if len(avis) > 6 else 'NULL'
-            inconvenients = avis[7] if len(avis) > 7 else 'NULL'
-
-            avis_json[f'avis_{j}'] = {
-                'date_avis': date_avis.replace('"', ''),
-                'note_avis': note_avis.replace('"', ''),
-                'texte_avis': texte_avis.replace('"', ''),
-                'avantages': avantages.replace('"', ''),
-                'inconvenients': inconvenients.replace('"', '')
-            }
-
-    avis_json_str = json.dumps(avis_json, ensure_ascii=False)
-
-    donnees_finales.append({'OBJECT_ID': objet_id, 'TYPE_FICHIER': 'GLASSDOOR_AVIS', 'colonne': 'nom_entreprise', 'valeur': nom})
-    donnees_finales.append({'OBJECT_ID': objet_id, 'TYPE_FICHIER': 'GLASSDOOR_AVIS', 'colonne': 'note_moy_entreprise', 'valeur': note})
-    donnees_finales.append({'OBJECT_ID': objet_id, 'TYPE_FICHIER': 'GLASSDOOR_AVIS', 'colonne': 'avis', 'valeur': avis_json_str})
-
-    objet_id += 1
-
-df_final = pd.DataFrame(donnees_finales, columns=['OBJECT_ID', 'TYPE_FICHIER', 'colonne', 'valeur'])
-
-# Sauvegarde du DataFrame dans un fichier CSV
-df_final.to_csv(
-    './DATALAKE/00_METADATA/metadata_descriptives.csv',
-    sep=';',
-    index=False,
-    encoding='utf-8',
-    quoting=csv.QUOTE_NONE,
-    escapechar='\\'  
-)
-
-print("✅ Fichier de métadonnées descriptives créé")
-
+def construire_metadata_descriptives(liste_soc, liste_emp, liste_avi, premier_objet_id=1, objets_avi=None):
+    """
+    Construit le DataFrame des métadonnées descriptives (OBJECT_ID, TYPE_FICHIER, colonne, valeur)
+    Args:
+        liste_soc (list): Enregistrements extraits des pages INFO-SOC
+        liste_emp (list): Enregistrements extraits des pages INFO-EMP
+        liste_avi (list): Enregistrements extraits des pages AVIS-SOC
+        premier_objet_id (int): OBJECT_ID du premier nouvel objet
+        objets_avi (list | None): OBJECT_ID déjà attribué à chaque enregistrement AVI (None : nouvel objet)
+    Returns:
+        pd.DataFrame: Métadonnées descriptives
+    """
+    donnees_finales = []
+    objet_id = premier_objet_id
+
+    # ======================================================================
+    # GLASSDOOR SOC (informations sur les sociétés)
+    # ======================================================================
+    for soc in liste_soc:
+        for colonne in ['nom_entreprise', 'ville', 'taille', 'secteur']:
+            donnees_finales.append({'OBJECT_ID': objet_id, 'TYPE_FICHIER': 'GLASSDOOR_SOC', 'colonne': colonne, 'valeur': soc[colonne]})
+        donnees_finales.extend(lignes_identifiants(objet_id, 'GLASSDOOR_SOC', soc))
+        objet_id += 1
+
+    # ======================================================================
+    # LINKEDIN EMP (offres d'emploi)
+    # ======================================================================
+    for emp in liste_emp:
+        for colonne in ['libelle_emploi', 'entreprise', 'ville', 'texte', 'niveau_hierarchique', 'date_posted', 'type_contrat']:
+            donnees_finales.append({'OBJECT_ID': objet_id, 'TYPE_FICHIER': 'LINKEDIN_EMP', 'colonne': colonne, 'valeur': emp[colonne]})
+        donnees_finales.extend(lignes_identifiants(objet_id, 'LINKEDIN_EMP', emp))
+        objet_id += 1
+
+    # ======================================================================
+    # GLASSDOOR AVIS (avis employés)
+    # ======================================================================
+    # Les avis eux-mêmes sont écrits dans la table des avis de la curated zone (ETL/table_avis.py),
+    # une ligne par avis rattachée à l'OBJECT_ID ; seul leur nombre figure ici
+    for rang, avi in enumerate(liste_avi):
+        nom = avi['nom_entreprise']
+        note = avi['note_moy_entreprise']
+        id_avi = objets_avi[rang] if objets_avi is not None and objets_avi[rang] is not None else objet_id
+
+        donnees_finales.append({'OBJECT_ID': id_avi, 'TYPE_FICHIER': 'GLASSDOOR_AVIS', 'colonne': 'nom_entreprise', 'valeur': nom})
+        donnees_finales.append({'OBJECT_ID': id_avi, 'TYPE_FICHIER': 'GLASSDOOR_AVIS', 'colonne': 'note_moy_entreprise', 'valeur': note})
+        donnees_finales.append({'OBJECT_ID': id_avi, 'TYPE_FICHIER': 'GLASSDOOR_AVIS', 'colonne': 'nb_avis', 'valeur': str(len(avi['avis']))})
+        donnees_finales.extend(lignes_identifiants(id_avi, 'GLASSDOOR_AVIS', avi))
+
+        if id_avi == objet_id:
+            objet_id += 1
+
+    return pd.DataFrame(donnees_finales, columns=['OBJECT_ID', 'TYPE_FICHIER', 'colonne', 'valeur'])
+
+def ecrire_metadata_descriptives(df_final, chemin_sortie=METADONNEES_DESCRIPTIVES):
+    # Sauvegarde du DataFrame dans un fichier CSV
+    df_final.to_csv(
+        chemin_sortie,
+        sep=';',
+        index=False,
+        encoding='utf-8',
+        quoting=csv.QUOTE_NONE,
+        escapechar='\\'
+    )
+
+def extraire_corpus(fichiers_soc, fichiers_avi, fichiers_emp, chemin_sortie=METADONNEES_DESCRIPTIVES, mode_emp=MODE_EMP,
+                    mode_avi=MODE_AVI, utiliser_cache=True):
+    """
+    Extrait les pages INFO-SOC, AVIS-SOC et INFO-EMP (cache d'extraction, journal de reprise et quarantaine
+    situés à côté de chemin_sortie)
+    Returns:
+        tuple: (enregistrements SOC, enregistrements AVI fusionnés par employeur, enregistrements EMP,
+        journal de reprise, à terminer une fois la sortie écrite)
+    """
+    # Les pages déjà extraites (même contenu, même version d'extracteur) sont relues depuis le cache ;
+    # le journal de reprise permet de reprendre une exécution interrompue là où elle s'est arrêtée
+    cache = CacheExtraction.a_cote_de(chemin_sortie) if utiliser_cache else None
+    journal = JournalReprise.a_cote_de(chemin_sortie)
+    if journal.nb_repris:
+        print(f"Reprise de l'exécution précédente : {journal.nb_repris} page(s) déjà traitée(s)")
+    try:
+        liste_soc = extraire_pages('SOC', fichiers_soc, extraire_fichier_SOC, journal, cache)
+        # avis : en-tête lu sur la première page de chaque employeur, avis de toutes ses pages regroupés
+        premieres_pages, pages_suivantes = regrouper_pages_AVI(fichiers_avi)
+        liste_avi = fusionner_avis_par_employeur(
+            extraire_pages('AVI', premieres_pages, extraire_fichier_AVI, journal, cache, mode_avi),
+            extraire_pages('AVI_SUITE', pages_suivantes, extraire_avis_page_AVI, journal, cache, mode_avi))
+        liste_emp = extraire_pages('EMP', fichiers_emp, extraire_fichier_EMP, journal, cache, mode_emp)
+    finally:
+        journal.fermer()
+        if cache is not None:
+            cache.fermer()
+    if cache is not None:
+        print(f"Cache d'extraction : {cache.nb_trouves} page(s) relue(s), {cache.nb_manquants} page(s) analysée(s)")
+    if journal.nb_quarantaine:
+        print(f"{journal.nb_quarantaine} page(s) mise(s) en quarantaine : voir {journal.chemin_quarantaine}")
+    return liste_soc, liste_avi, liste_emp, journal
+
+def objets_avis(df_descriptives):
+    """OBJECT_ID des objets GLASSDOOR_AVIS, dans l'ordre des enregistrements AVI"""
+    return df_descriptives.loc[(df_descriptives['TYPE_FICHIER'] == 'GLASSDOOR_AVIS')
+                               & (df_descriptives['colonne'] == 'nom_entreprise'), 'OBJECT_ID'].tolist()
+
+@etape('curated')
+def main(metadonnees_techniques=METADONNEES_TECHNIQUES, chemin_sortie=METADONNEES_DESCRIPTIVES, mode_emp=MODE_EMP, mode_avi=MODE_AVI,
+         utiliser_cache=True):
+    fichiers_soc, fichiers_avi, fichiers_emp = lister_fichiers_cibles(metadonnees_techniques)
+    liste_soc, liste_avi, liste_emp, journal = extraire_corpus(fichiers_soc, fichiers_avi, fichiers_emp, chemin_sortie,
+                                                               mode_emp, mode_avi, utiliser_cache)
+
+    df_final = construire_metadata_descriptives(liste_soc, liste_emp, liste_avi)
+    ecrire_metadata_descriptives(df_final, chemin_sortie)
+
+    # Table des avis (une ligne par avis), rattachée aux objets GLASSDOOR_AVIS par leur OBJECT_ID
+    df_avis = construire_table_avis(liste_avi, objets_avis(df_final))
+    ecrire_table_avis(df_avis, chemin_table_avis(chemin_sortie))
+    print(f"Table des avis : {len(df_avis)} avis écrits dans {chemin_table_avis(chemin_sortie)}")
+    with BaseMetadata.a_cote_de(chemin_sortie) as base_metadata:
+        base_metadata.remplacer_descriptives(df_final)
+    journal.terminer()
+    compter_lignes(len(df_final))
+    print("✅ Fichier de métadonnées descriptives créé")
+
+def publier_lot(base_metadata, depuis_object_id, table_avis, chemin_sortie=METADONNEES_DESCRIPTIVES, mode_emp=MODE_EMP,
+                mode_avi=MODE_AVI, utiliser_cache=True):
+    """
+    Met à jour la curated zone pour un lot de l'ingestion continue sans réextraire le corpus : seules
+    les pages du lot sont analysées. Leurs objets SOC et EMP sont ajoutés à la base de métadonnées ;
+    chaque employeur dont le lot apporte une page d'avis est refusionné à partir de toutes ses pages
+    (les anciennes sont relues depuis le cache) et remplace son objet GLASSDOOR_AVIS, qui garde son
+    OBJECT_ID, ainsi que ses lignes de la table des avis.
+    metadata_descriptives.csv et avis.csv ne sont pas réécrits ici (voir exporter_lot)
+    Args:
+        base_metadata (BaseMetadata): Base de métadonnées, où le lot vient d'être ingéré
+        depuis_object_id (int): Premier object_id technique attribué au lot par la landing zone
+        table_avis (pd.DataFrame | None): Table des avis avant le lot
+        chemin_sortie (str): Chemin de metadata_descriptives.csv (cache, journal et quarantaine à côté)
+    Returns:
+        tuple: (table des avis après le lot, nombre de lignes descriptives écrites)
+    """
+    fichiers_soc = base_metadata.fichiers_cibles('GLASSDOOR_SOC', depuis_object_id=depuis_object_id)
+    fichiers_emp = base_metadata.fichiers_cibles('LINKEDIN_EMP', depuis_object_id=depuis_object_id)
+    fichiers_avi = []
+    employeurs = set()
+    for fichier_html in base_metadata.fichiers_cibles('GLASSDOOR_AVIS', depuis_object_id=depuis_object_id):
+        champs = analyser_nom_fichier(fichier_html)
+        if champs is None:
+            fichiers_avi.append(fichier_html)
+        else:
+            employeurs.add(champs['id_source'])
+    fichiers_avi = base_metadata.fichiers_employeurs(employeurs) + fichiers_avi
+
+    liste_soc, liste_avi, liste_emp, journal = extraire_corpus(fichiers_soc, fichiers_avi, fichiers_emp, chemin_sortie,
+                                                               mode_emp, mode_avi, utiliser_cache)
+    objets_existants = base_metadata.objets_par_id_source('GLASSDOOR_AVIS', [avi.get('id_source') for avi in liste_avi])
+    df_lot = construire_metadata_descriptives(liste_soc, liste_emp, liste_avi,
+                                              base_metadata.prochain_object_id('metadata_descriptives'),
+                                              [objets_existants.get(avi.get('id_source')) for avi in liste_avi])
+    base_metadata.remplacer_descriptives(df_lot, objets_existants.values())
+    journal.terminer()
+
+    df_avis_lot = construire_table_avis(liste_avi, objets_avis(df_lot))
+    if table_avis is not None:
+        table_avis = table_avis[~table_avis['id_objet'].isin(list(objets_existants.values()))]
+        df_avis_lot = pd.concat([table_avis, df_avis_lot], ignore_index=True)
+    return df_avis_lot, len(df_lot)
+
+def exporter_lot(base_metadata, table_avis, chemin_sortie=METADONNEES_DESCRIPTIVES):
+    """Réécrit metadata_descriptives.csv et avis.csv après des lots publiés par publier_lot"""
+    base_metadata.exporter_csv_descriptives(chemin_sortie)
+    if table_avis is not None:
+        ecrire_table_avis(table_avis, chemin_table_avis(chemin_sortie))
+
+if __name__ == "__main__":
+    main()
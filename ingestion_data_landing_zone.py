@@ -3,17 +3,117 @@ Ce script permet d'ingérer des fichiers depuis un répertoire source vers un r
 en filtrant les fichiers selon un pattern donné. Il enregistre également des métadonnées techniques dans un fichier CSV.
 
 Cela représente la première étape du processus d'ingestion des données dans un data lake.
+
+Les pages peuvent être stockées compressées (--compression gzip|zstd) et regroupées
+par crawl dans des archives (--archives) ; la compression et l'emplacement physique
+de chaque page sont enregistrés dans les métadonnées techniques.
+
+Chaque contenu distinct n'est stocké qu'une fois : une page dont l'empreinte de contenu
+(ETL/empreinte_pages.py, balisage volatil retiré) est déjà connue est enregistrée comme
+alias du fichier qui la stocke (colonne alias_de), sans nouvelle copie.
+--empreinte brute compare les octets bruts, --empreinte aucune désactive le dédoublonnage.
 """
 from datetime import datetime
+import argparse
 import os, fnmatch
-import shutil
-import csv
+
+from ETL.instrumentation import etape, compter_lignes
+from ETL.base_metadata import BaseMetadata
+from ETL.stockage_pages import ecrire_page, ajouter_a_archive, ecrire_index_archives, verifier_compression
+from ETL.empreinte_pages import empreinte_page
 
 def Get_datetime():
     Result = str(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
     return(Result)
 
-def copy_files_from_source_to_cible(myPathSource, myPattern, myPathCible):
+PATH_FILE_METADATA = "./DATALAKE/00_METADATA/metadata_technique.csv"
+
+# Pattern des fichiers sources -> dossier de la landing zone (relatif à myPathLanding)
+DESTINATIONS = [
+    ("*INFO-EMP*.html", "/LINKEDIN/EMP"),
+    ("*INFO-SOC*.html", "/GLASSDOOR/SOC"),
+    ("*AVIS-SOC*.html", "/GLASSDOOR/AVI"),
+]
+
+def dossier_destination(myFileName, myPathLanding):
+    """Dossier de la landing zone d'un fichier source selon son nom (None si aucun pattern ne correspond)."""
+    for myPattern, myDossier in DESTINATIONS:
+        if fnmatch.fnmatch(myFileName, myPattern):
+            return myPathLanding + myDossier
+    return None
+
+def ingerer_fichiers(base_metadata, fichiers, compression=None, archives=False, empreinte='normalisee'):
+    """
+    Copie des fichiers dans la landing zone et enregistre leurs metadonnees techniques
+    (un lot, une transaction)
+    Args:
+        base_metadata (BaseMetadata): Base de metadonnees ouverte
+        fichiers (list): Couples (chemin source, chemin cible)
+        compression (str | None): None, 'gzip' ou 'zstd'
+        archives (bool): Regrouper les pages d'un même crawl dans une archive
+        empreinte (str): 'normalisee', 'brute' (octets bruts) ou 'aucune' (pas de dédoublonnage)
+    Returns:
+        int: Nombre de pages enregistrées comme alias d'un contenu déjà stocké
+    """
+    verifier_compression(compression)
+
+    # Récupère le prochain object_id à utiliser
+    object_id = base_metadata.prochain_object_id()
+    # Contenus déjà stockés : empreinte -> fichier cible qui les contient
+    contenus = base_metadata.contenus_pages() if empreinte != 'aucune' else {}
+
+    lignes_metadata = []
+    lignes_contenus = []
+    # index des archives de crawl, lus une fois et écrits en fin de lot
+    index_archives = {}
+    nb_alias = 0
+    for myPathFileNameSource, myPathFileNameCible in fichiers:
+        lignes_metadata.append([object_id,"fichier_source",myPathFileNameSource])
+        lignes_metadata.append([object_id,"fichier_cible",myPathFileNameCible])
+        lignes_metadata.append([object_id,"date_ingestion",Get_datetime()])
+
+        # Contenu déjà stocké : la page est enregistrée comme alias, sans nouvelle copie
+        if empreinte != 'aucune':
+            with open(myPathFileNameSource, 'rb') as f:
+                empreinte_contenu = empreinte_page(f.read(), normaliser=(empreinte == 'normalisee'))
+            lignes_metadata.append([object_id,"empreinte_contenu",empreinte_contenu])
+            if empreinte_contenu in contenus:
+                lignes_metadata.append([object_id,"alias_de",contenus[empreinte_contenu]])
+                nb_alias += 1
+                object_id += 1
+                continue
+            contenus[empreinte_contenu] = myPathFileNameCible
+            lignes_contenus.append([empreinte_contenu, object_id, myPathFileNameCible])
+
+        if archives:
+            id_crawl = os.path.basename(myPathFileNameCible).split("-", 1)[0]
+            stockage = ajouter_a_archive(myPathFileNameSource, myPathFileNameCible, id_crawl, compression, index_archives)
+        else:
+            stockage = ecrire_page(myPathFileNameSource, myPathFileNameCible, compression)
+        # Stockage physique, quand il diffère du fichier cible
+        if compression or archives:
+            lignes_metadata.append([object_id,"compression",compression or "aucune"])
+            for colonne in ["fichier_stockage", "position", "longueur"]:
+                if colonne in stockage:
+                    lignes_metadata.append([object_id,colonne,str(stockage[colonne])])
+        object_id += 1
+
+    ecrire_index_archives(index_archives)
+    # Ecriture des metadonnees par lot
+    base_metadata.ajouter_technique(lignes_metadata)
+    base_metadata.ajouter_contenus(lignes_contenus)
+    return nb_alias
+
+def ouvrir_base_metadata(path_file_metadata=PATH_FILE_METADATA):
+    """Ouvre la base de metadonnees (initialisee depuis le CSV existant au premier usage)."""
+    base_metadata = BaseMetadata.a_cote_de(path_file_metadata)
+    base_metadata.importer_csv_technique(path_file_metadata)
+    # Index des noms de fichiers (crawl, type de document, source, id employeur/offre, page)
+    base_metadata.indexer_fichiers()
+    return base_metadata
+
+def copy_files_from_source_to_cible(myPathSource, myPattern, myPathCible, path_file_metadata=PATH_FILE_METADATA,
+                                    compression=None, archives=False, empreinte='normalisee'):
     """
     Fonction d'ingestion des fichiers d'un repertoire source vers un repertoire cible
     en filtrant les fichiers selon un pattern (filtre) donné
@@ -21,29 +121,13 @@ def copy_files_from_source_to_cible(myPathSource, myPattern, myPathCible):
         myPathSource (str): Repertoire source
         myPattern (str): Pattern de filtrage des fichiers
         myPathCible (str): Repertoire cible
+        path_file_metadata (str): Fichier de metadonnees techniques
+        compression (str | None): None, 'gzip' ou 'zstd'
+        archives (bool): Regrouper les pages d'un même crawl dans une archive
+        empreinte (str): 'normalisee', 'brute' (octets bruts) ou 'aucune' (pas de dédoublonnage)
     """
-
-    # Creation ou ouverture du fichier de metadonnees techniques
-    path_file_metadata = "./DATALAKE/00_METADATA/metadata_technique.csv"
-    
-    # Vérifie si le fichier existe déjà
-    file_exists = os.path.isfile(path_file_metadata)
-    
-    # Ouverture et écriture dans le fichier de métadonnées
-    file_metadata = open(path_file_metadata, 'a', encoding="utf-8", errors="ignore", newline='')
-    writer_metadata = csv.writer(file_metadata, delimiter=';', quotechar='"', quoting=csv.QUOTE_ALL, lineterminator='\n')
-    
-    # Écrit l'en-tête seulement si le fichier n'existe pas
-    if not file_exists:
-        writer_metadata.writerow(["object_id","colonne","valeur"])
-
-    # Récupère le dernier object_id utilisé si le fichier existe
-    if file_exists:
-        with open(path_file_metadata, 'r', encoding="utf-8", errors="ignore") as f:
-            last_id = max((int(row[0]) for row in csv.reader(f, delimiter=';') if row[0].isdigit()), default=0)
-        object_id = last_id + 1
-    else:
-        object_id = 1
+    verifier_compression(compression)
+    base_metadata = ouvrir_base_metadata(path_file_metadata)
 
     myListOfFileSourceTmp = os.listdir(myPathSource)
     myListOfFileSource = []
@@ -51,18 +135,35 @@ def copy_files_from_source_to_cible(myPathSource, myPattern, myPathCible):
         if fnmatch.fnmatch(myFileNameTmp, myPattern)==True:
             myListOfFileSource.append(myFileNameTmp)
 
-    for myFileNameToCopy in myListOfFileSource: 
-        myPathFileNameSource = myPathSource + "/" + myFileNameToCopy
-        myPathFileNameCible = myPathCible + "/" + myFileNameToCopy
-        shutil.copy(myPathFileNameSource, myPathFileNameCible)
-        writer_metadata.writerow([object_id,"fichier_source",myPathFileNameSource])
-        writer_metadata.writerow([object_id,"fichier_cible",myPathFileNameCible])
-        writer_metadata.writerow([object_id,"date_ingestion",Get_datetime()])
-        object_id += 1
-    file_metadata.close()
+    fichiers = [(myPathSource + "/" + myFileNameToCopy, myPathCible + "/" + myFileNameToCopy)
+                for myFileNameToCopy in myListOfFileSource]
+    nb_alias = ingerer_fichiers(base_metadata, fichiers, compression, archives, empreinte)
+
+    # Export du CSV pour compatibilite
+    base_metadata.exporter_csv_technique(path_file_metadata)
+    base_metadata.fermer()
+    compter_lignes(len(myListOfFileSource))
+    if nb_alias:
+        print(nb_alias, " page(s) au contenu déjà stocké enregistrée(s) comme alias")
     print("Ingestion des fichiers de type ", myPattern, " effectuée dans la landing zone ", myPathCible, "\n")
 
-# Ingestion des fichiers dans la landing zone
-copy_files_from_source_to_cible("./DATALAKE/0_SOURCE_WEB", "*INFO-EMP*.html", "./DATALAKE/1_LANDING_ZONE/LINKEDIN/EMP")
-copy_files_from_source_to_cible("./DATALAKE/0_SOURCE_WEB", "*INFO-SOC*.html", "./DATALAKE/1_LANDING_ZONE/GLASSDOOR/SOC")
-copy_files_from_source_to_cible("./DATALAKE/0_SOURCE_WEB", "*AVIS-SOC*.html", "./DATALAKE/1_LANDING_ZONE/GLASSDOOR/AVI")
\ No newline at end of file
+@etape('landing')
+def main(myPathSource="./DATALAKE/0_SOURCE_WEB", myPathLanding="./DATALAKE/1_LANDING_ZONE", path_file_metadata=PATH_FILE_METADATA,
+         compression=None, archives=False, empreinte='normalisee'):
+    # Ingestion des fichiers dans la landing zone
+    for myPattern, myDossier in DESTINATIONS:
+        copy_files_from_source_to_cible(myPathSource, myPattern, myPathLanding + myDossier, path_file_metadata, compression, archives, empreinte)
+
+def lire_arguments():
+    parser = argparse.ArgumentParser(description='Ingestion des pages sources dans la landing zone')
+    parser.add_argument('--compression', choices=['aucune', 'gzip', 'zstd'], default='aucune',
+                        help='Compression des pages stockées (zstd : paquet zstandard requis)')
+    parser.add_argument('--archives', action='store_true', help='Regrouper les pages de chaque crawl dans une archive')
+    parser.add_argument('--empreinte', choices=['normalisee', 'brute', 'aucune'], default='normalisee',
+                        help='Dédoublonnage des pages : contenu sans balisage volatil, octets bruts, ou aucun')
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    arguments = lire_arguments()
+    main(compression=None if arguments.compression == 'aucune' else arguments.compression, archives=arguments.archives,
+         empreinte=arguments.empreinte)